@@ -1,6 +1,15 @@
 import streamlit as st
 import pandas as pd
 
+from trinetx_toolkit.store import (
+    clear_outcome_store,
+    get_outcome_store,
+    parse_outcome_uploads,
+    replace_stored_outcomes,
+    set_outcome_label,
+    stored_outcomes,
+)
+
 st.set_page_config(
     page_title="TriNetX Publication Toolkit",
     page_icon="📚",
@@ -22,6 +31,58 @@ st.info(
     "clear outcome labels, and formatting appropriate for tables, figures, posters, supplements, and manuscript drafts."
 )
 
+st.header("Load outcome exports once")
+
+st.markdown("""
+Upload Measures of Association and Kaplan-Meier CSVs here to parse them once for the whole session. The Forest Plot,
+Outcomes Table, Two-Cohort Bar Graphs, Power, and Multiple Comparisons tools will offer these files instead of asking
+for another upload, and outcome labels edited below carry over to each of them.
+""")
+
+# Clearing the store also empties the uploader by giving it a fresh key;
+# otherwise the files still in it would be parsed back in on the rerun.
+upload_round = st.session_state.setdefault("home_upload_round", 0)
+shared_uploads = st.file_uploader(
+    "Upload TriNetX MOA or Kaplan-Meier CSV files",
+    type=["csv", "txt"],
+    accept_multiple_files=True,
+    key=f"home_outcome_uploads_{upload_round}",
+)
+if shared_uploads:
+    loaded_outcomes, load_errors = parse_outcome_uploads(shared_uploads)
+    previous_labels = {key: parsed.default_outcome for key, parsed in get_outcome_store().items()}
+    for parsed in loaded_outcomes:
+        parsed.default_outcome = previous_labels.get(parsed.source_key, parsed.default_outcome)
+    replace_stored_outcomes(loaded_outcomes)
+    for error in load_errors:
+        st.error(error)
+
+loaded = stored_outcomes()
+if loaded:
+    label_df = pd.DataFrame(
+        [
+            {
+                "Source File": parsed.source_file,
+                "Export Type": parsed.export_type,
+                "Outcome": parsed.default_outcome,
+            }
+            for parsed in loaded
+        ]
+    )
+    edited_labels = st.data_editor(
+        label_df,
+        hide_index=True,
+        use_container_width=True,
+        disabled=["Source File", "Export Type"],
+        key="home_outcome_labels",
+    )
+    for parsed, label in zip(loaded, edited_labels["Outcome"]):
+        set_outcome_label(parsed.source_key, str(label).strip())
+    if st.button("Clear loaded files"):
+        clear_outcome_store()
+        st.session_state["home_upload_round"] = upload_round + 1
+        st.rerun()
+
 st.header("Quick tool chooser")
 
 chooser = pd.DataFrame(
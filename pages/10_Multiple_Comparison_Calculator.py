@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-import csv
 import io
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import streamlit as st
-from statsmodels.stats.multitest import multipletests
+
+from trinetx_toolkit.cache import format_cache_stats
+from trinetx_toolkit.ingest import ParseJob, cached_parse_many
+from trinetx_toolkit.lazy import lazy_import
+from trinetx_toolkit.multiple_comparisons import parse_moa_bytes, safe_float
+from trinetx_toolkit.outcomes import EXPORT_MOA, ParsedOutcome
+from trinetx_toolkit.store import stored_outcomes, use_stored_outcomes
+
+# Loaded once p-values are adjusted or plotted, not on page load.
+multitest = lazy_import("statsmodels.stats.multitest")
+px = lazy_import("plotly.express")
 
 
 st.set_page_config(
@@ -18,14 +26,6 @@ st.set_page_config(
     layout="wide",
 )
 
-SECTION_NAMES = {
-    "Cohort Statistics",
-    "Risk Difference",
-    "Risk Ratio",
-    "Odds Ratio",
-    "Hazard Ratio",
-}
-
 METHOD_SPECS = {
     "Bonferroni": {
         "code": "bonferroni",
@@ -50,47 +50,6 @@ METHOD_SPECS = {
 }
 
 
-def clean_row(row: List[str]) -> List[str]:
-    return [str(cell).strip().replace("\ufeff", "") for cell in row]
-
-
-def nonempty_rows_from_text(text: str) -> List[List[str]]:
-    rows: List[List[str]] = []
-    for raw_line in text.splitlines():
-        parsed = next(csv.reader([raw_line]))
-        cleaned = clean_row(parsed)
-        if any(cell not in {"", '" "', " "} for cell in cleaned):
-            rows.append(cleaned)
-    return rows
-
-
-def get_section(rows: List[List[str]], section_name: str) -> List[List[str]]:
-    for i, row in enumerate(rows):
-        if len(row) == 1 and row[0] == section_name:
-            collected: List[List[str]] = []
-            j = i + 1
-            while j < len(rows):
-                current = rows[j]
-                if len(current) == 1 and current[0] in SECTION_NAMES:
-                    break
-                collected.append(current)
-                j += 1
-            return collected
-    return []
-
-
-def safe_float(value) -> float:
-    try:
-        if value is None:
-            return np.nan
-        text = str(value).strip().replace(",", "")
-        if text == "":
-            return np.nan
-        return float(text)
-    except Exception:
-        return np.nan
-
-
 def normalize_columns(df: pd.DataFrame) -> Dict[str, str]:
     return {
         col: str(col).strip().lower().replace("-", " ").replace("_", " ")
@@ -111,71 +70,6 @@ def find_column(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
     return None
 
 
-@st.cache_data(show_spinner=False)
-def parse_trinetx_moa_text(text: str, source_name: str) -> Dict[str, object]:
-    rows = nonempty_rows_from_text(text)
-    if not rows:
-        raise ValueError("File appears empty.")
-
-    title = rows[0][0]
-    if "Measures of Association Table" not in title:
-        raise ValueError("This does not look like a TriNetX Measures of Association export.")
-
-    result: Dict[str, object] = {
-        "source_file": source_name,
-        "title": title,
-        "outcome": Path(source_name).stem,
-    }
-
-    cohort_stats = get_section(rows, "Cohort Statistics")
-    if len(cohort_stats) >= 3:
-        header = cohort_stats[0]
-        header_index = {h: idx for idx, h in enumerate(header)}
-        for cohort_num, data_row in ((1, cohort_stats[1]), (2, cohort_stats[2])):
-            if len(data_row) >= len(header):
-                result[f"cohort_{cohort_num}_name"] = data_row[header_index.get("Cohort Name", 1)]
-                result[f"cohort_{cohort_num}_patients"] = safe_float(data_row[header_index.get("Patients in Cohort", 2)])
-                result[f"cohort_{cohort_num}_with_outcome"] = safe_float(data_row[header_index.get("Patients with Outcome", 3)])
-                result[f"cohort_{cohort_num}_risk"] = safe_float(data_row[header_index.get("Risk", 4)])
-
-    risk_difference = get_section(rows, "Risk Difference")
-    if len(risk_difference) >= 2:
-        header, data = risk_difference[0], risk_difference[1]
-        header_index = {h: idx for idx, h in enumerate(header)}
-        result["risk_difference"] = safe_float(data[header_index.get("Risk Difference", 0)])
-        result["risk_difference_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
-        result["risk_difference_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
-        result["z_value"] = safe_float(data[header_index.get("z", 3)])
-        result["p_raw"] = safe_float(data[header_index.get("p", 4)])
-
-    risk_ratio = get_section(rows, "Risk Ratio")
-    if len(risk_ratio) >= 2:
-        header, data = risk_ratio[0], risk_ratio[1]
-        header_index = {h: idx for idx, h in enumerate(header)}
-        result["risk_ratio"] = safe_float(data[header_index.get("Risk Ratio", 0)])
-        result["risk_ratio_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
-        result["risk_ratio_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
-
-    odds_ratio = get_section(rows, "Odds Ratio")
-    if len(odds_ratio) >= 2:
-        header, data = odds_ratio[0], odds_ratio[1]
-        header_index = {h: idx for idx, h in enumerate(header)}
-        result["odds_ratio"] = safe_float(data[header_index.get("Odds Ratio", 0)])
-        result["odds_ratio_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
-        result["odds_ratio_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
-
-    rr = result.get("risk_ratio")
-    if rr is not None and pd.notna(rr):
-        if float(rr) < 1:
-            result["direction"] = "Lower in Cohort 1"
-        elif float(rr) > 1:
-            result["direction"] = "Higher in Cohort 1"
-        else:
-            result["direction"] = "No difference"
-
-    return result
-
-
 @st.cache_data(show_spinner=False)
 def read_tabular_file(file_name: str, raw_bytes: bytes) -> pd.DataFrame:
     suffix = Path(file_name).suffix.lower()
@@ -193,16 +87,71 @@ def read_tabular_file(file_name: str, raw_bytes: bytes) -> pd.DataFrame:
     raise ValueError(f"Could not read {file_name} as CSV, TSV, or Excel.")
 
 
-@st.cache_data(show_spinner=False)
 def parse_uploaded_trinetx_files(file_payloads: List[Tuple[str, bytes]]) -> Tuple[pd.DataFrame, List[str]]:
+    jobs = [ParseJob(raw_bytes, (file_name,), (file_name,)) for file_name, raw_bytes in file_payloads]
+    records: List[Dict[str, object]] = []
+    errors: List[str] = []
+    for (file_name, _), (record, error) in zip(file_payloads, cached_parse_many(jobs, "multiple-comparisons-moa", parse_moa_bytes)):
+        if error is None:
+            records.append(record)
+        else:
+            errors.append(f"{file_name}: {error}")
+    return pd.DataFrame(records), errors
+
+
+def record_from_parsed_outcome(parsed: ParsedOutcome) -> Dict[str, object]:
+    """Build the parse_trinetx_moa_text() record from a Home page outcome store entry."""
+    if parsed.export_type != EXPORT_MOA:
+        raise ValueError("This does not look like a TriNetX Measures of Association export.")
+
+    def value(number: Optional[float]) -> float:
+        return np.nan if number is None else number
+
+    result: Dict[str, object] = {
+        "source_file": parsed.source_file,
+        "title": parsed.title,
+        "outcome": parsed.default_outcome,
+        "cohort_1_name": parsed.cohort1_raw,
+        "cohort_1_patients": value(parsed.patients1),
+        "cohort_1_with_outcome": value(parsed.events1),
+        "cohort_1_risk": value(parsed.risk1),
+        "cohort_2_name": parsed.cohort2_raw,
+        "cohort_2_patients": value(parsed.patients2),
+        "cohort_2_with_outcome": value(parsed.events2),
+        "cohort_2_risk": value(parsed.risk2),
+        "risk_difference": value(parsed.risk_difference),
+        "risk_difference_ci_lower": value(parsed.risk_difference_lower),
+        "risk_difference_ci_upper": value(parsed.risk_difference_upper),
+        "z_value": value(parsed.z_value),
+        "p_raw": value(parsed.p_value),
+        "risk_ratio": value(parsed.risk_ratio),
+        "risk_ratio_ci_lower": value(parsed.risk_ratio_lower),
+        "risk_ratio_ci_upper": value(parsed.risk_ratio_upper),
+        "odds_ratio": value(parsed.odds_ratio),
+        "odds_ratio_ci_lower": value(parsed.odds_ratio_lower),
+        "odds_ratio_ci_upper": value(parsed.odds_ratio_upper),
+    }
+
+    rr = parsed.risk_ratio
+    if rr is not None:
+        if rr < 1:
+            result["direction"] = "Lower in Cohort 1"
+        elif rr > 1:
+            result["direction"] = "Higher in Cohort 1"
+        else:
+            result["direction"] = "No difference"
+
+    return result
+
+
+def records_from_stored_outcomes(parsed_outcomes: List[ParsedOutcome]) -> Tuple[pd.DataFrame, List[str]]:
     records: List[Dict[str, object]] = []
     errors: List[str] = []
-    for file_name, raw_bytes in file_payloads:
+    for parsed in parsed_outcomes:
         try:
-            text = raw_bytes.decode("utf-8-sig", errors="ignore")
-            records.append(parse_trinetx_moa_text(text, file_name))
+            records.append(record_from_parsed_outcome(parsed))
         except Exception as exc:
-            errors.append(f"{file_name}: {exc}")
+            errors.append(f"{parsed.source_file}: {exc}")
     return pd.DataFrame(records), errors
 
 
@@ -230,7 +179,7 @@ def add_corrections(df: pd.DataFrame, alpha: float) -> Tuple[pd.DataFrame, pd.Da
 
     summary_rows = []
     for display_name, spec in METHOD_SPECS.items():
-        reject, adjusted, _, _ = multipletests(work["p_raw"].to_numpy(), alpha=alpha, method=spec["code"])
+        reject, adjusted, _, _ = multitest.multipletests(work["p_raw"].to_numpy(), alpha=alpha, method=spec["code"])
         method_key = display_name.lower().replace("–", "-").replace(" ", "_")
         work[f"adjusted_p__{method_key}"] = adjusted
         work[f"significant__{method_key}"] = reject
@@ -321,15 +270,22 @@ source_df: Optional[pd.DataFrame] = None
 parse_errors: List[str] = []
 
 if input_mode == "TriNetX MOA files":
-    uploads = st.file_uploader(
-        "Upload one or more TriNetX Measures of Association CSV files",
-        type=["csv", "txt"],
-        accept_multiple_files=True,
-    )
+    use_store = use_stored_outcomes(key="multiple_comparisons_use_store")
+    uploads = None
+    if not use_store:
+        uploads = st.file_uploader(
+            "Upload one or more TriNetX Measures of Association CSV files",
+            type=["csv", "txt"],
+            accept_multiple_files=True,
+        )
 
-    if uploads:
-        payloads = [(uploaded.name, uploaded.getvalue()) for uploaded in uploads]
-        source_df, parse_errors = parse_uploaded_trinetx_files(payloads)
+    if use_store or uploads:
+        if use_store:
+            source_df, parse_errors = records_from_stored_outcomes(stored_outcomes())
+        else:
+            payloads = [(uploaded.name, uploaded.getvalue()) for uploaded in uploads]
+            source_df, parse_errors = parse_uploaded_trinetx_files(payloads)
+            st.caption(format_cache_stats())
         if source_df is not None and not source_df.empty:
             source_df["include"] = True
             edit_cols = [
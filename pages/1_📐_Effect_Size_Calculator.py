@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import streamlit.components.v1 as components
 import io
 
+from trinetx_toolkit.effect_size import nonpositive_ratios, ratio_to_cohens_d
+from trinetx_toolkit.html_tables import escape_cell, escape_column, render_template, table_rows
+
 st.set_page_config(layout="wide")
 st.title("Novak's TriNetX Effect Size Calculator and Forest Plot Generator")
 st.markdown("Calculate effect sizes from Risk Ratios, Odds Ratios, or Hazard Ratios (TriNetX outcomes), add p-values, confidence intervals, and create publication-quality forest plots—all in one app.")
@@ -66,13 +68,13 @@ edited_df = st.data_editor(df, num_rows="dynamic", key="input_table", use_contai
 results_df = edited_df.copy()
 results_df = results_df[results_df['Outcome'].astype(str).str.strip() != ""]
 results_df[ratio_type] = pd.to_numeric(results_df[ratio_type], errors='coerce')
-results_df['Effect Size'] = np.log(np.abs(results_df[ratio_type])) * (np.sqrt(3) / np.pi) * np.sign(results_df[ratio_type])
+results_df['Effect Size'] = ratio_to_cohens_d(results_df[ratio_type])
 
 if add_ci:
     results_df['Lower CI (Ratio)'] = pd.to_numeric(results_df['Lower CI (Ratio)'], errors='coerce')
     results_df['Upper CI (Ratio)'] = pd.to_numeric(results_df['Upper CI (Ratio)'], errors='coerce')
-    results_df['Lower CI (Effect Size)'] = np.log(np.abs(results_df['Lower CI (Ratio)'])) * (np.sqrt(3) / np.pi) * np.sign(results_df['Lower CI (Ratio)'])
-    results_df['Upper CI (Effect Size)'] = np.log(np.abs(results_df['Upper CI (Ratio)'])) * (np.sqrt(3) / np.pi) * np.sign(results_df['Upper CI (Ratio)'])
+    results_df['Lower CI (Effect Size)'] = ratio_to_cohens_d(results_df['Lower CI (Ratio)'])
+    results_df['Upper CI (Effect Size)'] = ratio_to_cohens_d(results_df['Upper CI (Ratio)'])
 
 if add_p:
     results_df['p-value'] = pd.to_numeric(results_df['p-value'], errors='coerce')
@@ -80,40 +82,24 @@ if add_p:
 def ama_table_html(df, ratio_label="Risk Ratio", ci=False, pval=False):
     if df.empty:
         return ""
-    html = f"""
-    <style>
-    .ama-table {{ border-collapse:collapse; font-family:Arial,sans-serif; font-size:14px; }}
-    .ama-table th, .ama-table td {{ border:1px solid #222; padding:6px 12px; }}
-    .ama-table th {{ background:#f8f8f8; font-weight:bold; text-align:center; }}
-    .ama-table td {{ text-align:right; }}
-    .ama-table td.left {{ text-align:left; }}
-    </style>
-    <table class="ama-table">
-        <tr>
-            <th>Outcome</th>
-            <th>{ratio_label}</th>"""
+    columns = ["Outcome", ratio_label]
     if ci:
-        html += "<th>Lower CI (Ratio)</th><th>Upper CI (Ratio)</th>"
-    html += "<th>Effect Size</th>"
+        columns += ["Lower CI (Ratio)", "Upper CI (Ratio)"]
+    columns.append("Effect Size")
     if ci:
-        html += "<th>Lower CI (Effect Size)</th><th>Upper CI (Effect Size)</th>"
+        columns += ["Lower CI (Effect Size)", "Upper CI (Effect Size)"]
     if pval:
-        html += "<th>p-value</th>"
-    html += "</tr>"
-    for _, row in df.iterrows():
-        html += f"<tr><td class='left'>{row['Outcome']}</td><td>{row[ratio_label]}</td>"
-        if ci:
-            html += f"<td>{row.get('Lower CI (Ratio)','')}</td><td>{row.get('Upper CI (Ratio)','')}</td>"
-        html += f"<td>{row['Effect Size']}</td>"
-        if ci:
-            html += f"<td>{row.get('Lower CI (Effect Size)','')}</td><td>{row.get('Upper CI (Effect Size)','')}</td>"
-        if pval:
-            html += f"<td>{row.get('p-value','')}</td>"
-        html += "</tr>"
-    html += "</table>"
-    return html
+        columns.append("p-value")
+    return render_template(
+        "effect_size.html",
+        headers=[escape_cell(c) for c in columns],
+        rows=table_rows([escape_column(df, c) for c in columns]),
+    )
 
 st.markdown("### Calculated Effect Sizes Table")
+ratio_columns = [c for c in [ratio_type, 'Lower CI (Ratio)', 'Upper CI (Ratio)'] if c in results_df.columns]
+if any(nonpositive_ratios(results_df[c]).any() for c in ratio_columns):
+    st.warning("Ratios must be greater than zero; effect sizes for zero or negative ratios are left blank.")
 if not results_df.empty:
     components.html(ama_table_html(results_df.round(6), ratio_label=ratio_type, ci=add_ci, pval=add_p), height=350, scrolling=True)
 else:
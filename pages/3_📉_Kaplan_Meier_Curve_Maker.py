@@ -1,35 +1,57 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
-import io
-import base64
 import re
-from PIL import Image
-import numpy as np
-from lifelines import CoxPHFitter, KaplanMeierFitter
-from lifelines.statistics import logrank_test
+from functools import partial
+
+import pandas as pd
+
+from trinetx_toolkit.cache import cached_parse, format_cache_stats
+from trinetx_toolkit.figures import (
+    LazyFigure,
+    figure_download_button,
+    figure_params_key,
+    format_figure_cache_stats,
+    show_preview,
+)
+from trinetx_toolkit.km import (
+    DEFAULT_AT_RISK_INTERVAL,
+    DEFAULT_LANDMARKS,
+    at_risk_times,
+    km_plot_points,
+    load_km_curve_csv,
+    plot_km_curves,
+    plot_km_overlay,
+    summarize_km_curve,
+)
 
 # Title and Instructions
 st.title("Novak's TriNetX Kaplan-Meier Survival Curve Viewer")
-st.markdown("Upload your Kaplan-Meier CSV output. Customize the visualization and download a publication-ready figure.")
+st.markdown(
+    "Upload your Kaplan-Meier CSV output. Customize the visualization and download a publication-ready figure. "
+    "Upload several exports to overlay them on one plot."
+)
+
+
+def parse_landmarks(text):
+    """Comma-separated landmark days; ignores anything that is not a whole number."""
+    days = []
+    for part in text.split(","):
+        part = part.strip()
+        if part.isdigit():
+            days.append(int(part))
+    return tuple(sorted(set(days)))
+
 
 # Step 1: File Upload
-uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
-if uploaded_file:
-    lines = uploaded_file.getvalue().decode("utf-8").splitlines()
-    header_keywords = ["Time (Days)", "Cohort 1: Survival Probability"]
-    header_row_idx = next(i for i, line in enumerate(lines) if all(k in line for k in header_keywords))
-    df = pd.read_csv(uploaded_file, skiprows=header_row_idx)
-
-    # Clean data
-    df.columns = df.columns.str.strip()
-    df.sort_values('Time (Days)', inplace=True)
-    df[['Cohort 1: Survival Probability', 'Cohort 2: Survival Probability',
-       'Cohort 1: Survival Probability 95 % CI Lower', 'Cohort 1: Survival Probability 95 % CI Upper',
-       'Cohort 2: Survival Probability 95 % CI Lower', 'Cohort 2: Survival Probability 95 % CI Upper']] = \
-    df[['Cohort 1: Survival Probability', 'Cohort 2: Survival Probability',
-        'Cohort 1: Survival Probability 95 % CI Lower', 'Cohort 1: Survival Probability 95 % CI Upper',
-        'Cohort 2: Survival Probability 95 % CI Lower', 'Cohort 2: Survival Probability 95 % CI Upper']].ffill()
+uploaded_files = st.file_uploader("Upload CSV file(s)", type=["csv"], accept_multiple_files=True)
+if uploaded_files:
+    datasets = []
+    for uploaded_file in uploaded_files:
+        file_bytes = uploaded_file.getvalue()
+        name = uploaded_file.name.rsplit(".", 1)[0]
+        datasets.append((name, file_bytes, cached_parse(file_bytes, "km-curve", lambda: load_km_curve_csv(file_bytes))))
+    df = datasets[0][2]
+    last_day = int(max(data['Time (Days)'].max() for _, _, data in datasets))
+    st.caption(format_cache_stats())
 
     # Step 2: User Parameters
     st.sidebar.header("Customize Plot")
@@ -61,56 +83,103 @@ if uploaded_file:
     tick_fontsize = st.sidebar.slider("Tick Label Font Size", 8, 16, 10)
     legend_fontsize = st.sidebar.slider("Legend Font Size", 8, 16, 12)
 
-    max_days = st.sidebar.number_input("Maximum Days to Display", min_value=0, max_value=int(df['Time (Days)'].max()), value=int(df['Time (Days)'].max()))
+    max_days = st.sidebar.number_input("Maximum Days to Display", min_value=0, max_value=last_day, value=last_day)
+
+    decimate = st.sidebar.checkbox(
+        "Drop flat curve points",
+        True,
+        help="Plots only the points where survival or a CI bound steps, plus the point before each step. The drawn curves are unchanged; exports are smaller and faster.",
+    )
+    if decimate:
+        kept = total = 0
+        for _, _, data in datasets:
+            plot_points = km_plot_points(data, max_days, decimate=True)
+            kept += sum(len(points["time"]) for points in plot_points.values())
+            total += 2 * int((data['Time (Days)'] <= max_days).sum())
+        st.sidebar.caption(f"Plotting {kept:,} of {total:,} points ({kept / max(total, 1):.1%}).")
+
+    st.sidebar.header("Summary Statistics")
+    at_risk_interval = st.sidebar.number_input("Number-at-risk interval (days)", min_value=1, max_value=max(last_day, 1), value=min(DEFAULT_AT_RISK_INTERVAL, max(last_day, 1)))
+    landmarks = parse_landmarks(st.sidebar.text_input("Landmark days (comma-separated)", ", ".join(str(d) for d in DEFAULT_LANDMARKS)))
+    rmst_tau = st.sidebar.number_input("RMST horizon (days)", min_value=1, max_value=max(last_day, 1), value=max(min(int(max_days), last_day), 1))
 
     # Step 3: Generate Plot
     if st.button("Generate Plot"):
-        df_limited = df[df['Time (Days)'] <= max_days]
-        time = df_limited['Time (Days)']
-
-        fig, ax = plt.subplots(figsize=(fig_width, fig_height))
-
-        if style == 'Black & White':
-            color1_use, color2_use = 'black', 'gray'
+        figure_kwargs = dict(
+            plot_title=plot_title,
+            label1=label1,
+            label2=label2,
+            x_label=x_label,
+            y_label=y_label,
+            style=style,
+            color1=color1,
+            color2=color2,
+            line_width=line_width,
+            show_ci=show_ci,
+            ci_alpha=ci_alpha,
+            show_grid=show_grid,
+            fig_width=fig_width,
+            fig_height=fig_height,
+            y_min=y_min,
+            y_max=y_max,
+            title_fontsize=title_fontsize,
+            label_fontsize=label_fontsize,
+            tick_fontsize=tick_fontsize,
+            legend_fontsize=legend_fontsize,
+            max_days=max_days,
+            decimate=decimate,
+        )
+        if len(datasets) == 1:
+            figure = LazyFigure(partial(plot_km_curves, df, **figure_kwargs), figure_params_key(df, **figure_kwargs))
         else:
-            color1_use, color2_use = color1, color2
-
-        ax.plot(time, df_limited['Cohort 1: Survival Probability'], label=label1, color=color1_use, linewidth=line_width)
-        if show_ci and 'Cohort 1: Survival Probability 95 % CI Lower' in df.columns:
-            ax.fill_between(time,
-                            df_limited['Cohort 1: Survival Probability 95 % CI Lower'],
-                            df_limited['Cohort 1: Survival Probability 95 % CI Upper'],
-                            color=color1_use, alpha=ci_alpha)
-
-        ax.plot(time, df_limited['Cohort 2: Survival Probability'], label=label2, color=color2_use, linewidth=line_width)
-        if show_ci and 'Cohort 2: Survival Probability 95 % CI Lower' in df.columns:
-            ax.fill_between(time,
-                            df_limited['Cohort 2: Survival Probability 95 % CI Lower'],
-                            df_limited['Cohort 2: Survival Probability 95 % CI Upper'],
-                            color=color2_use, alpha=ci_alpha)
-
-        ax.set_title(plot_title, fontsize=title_fontsize)
-        ax.set_xlabel(x_label, fontsize=label_fontsize)
-        ax.set_ylabel(y_label, fontsize=label_fontsize)
-        ax.set_ylim(y_min, y_max)
-        ax.tick_params(axis='both', labelsize=tick_fontsize)
-        ax.legend(fontsize=legend_fontsize)
-        if show_grid:
-            ax.grid(True)
-
-        st.pyplot(fig)
-
-        # Step 5: PNG Download with Button
-        cleaned_title = re.sub(r'[^\w\-_. ]', '', plot_title).strip().replace(" ", "_")
-        filename = f"{cleaned_title or 'kaplan_meier_curve'}.png"
+            overlay = [(name, data) for name, _, data in datasets]
+            figure = LazyFigure(
+                partial(plot_km_overlay, overlay, **figure_kwargs),
+                figure_params_key([name for name, _ in overlay], *[data for _, data in overlay], **figure_kwargs),
+            )
 
-        img_bytes = io.BytesIO()
-        fig.savefig(img_bytes, format='png', dpi=300, bbox_inches='tight')
-        img_bytes.seek(0)
+        show_preview(figure)
+        st.caption(format_figure_cache_stats())
 
-        st.download_button(
-            label="Download Plot",
-            data=img_bytes,
-            file_name=filename,
-            mime="image/png"
+        # Step 5: Downloads, rendered at full resolution only when requested
+        cleaned_title = re.sub(r'[^\w\-_. ]', '', plot_title).strip().replace(" ", "_")
+        file_stem = cleaned_title or 'kaplan_meier_curve'
+        figure_download_button("Download Plot", figure, file_name=f"{file_stem}.png")
+        figure_download_button("Download Plot (SVG)", figure, file_name=f"{file_stem}.svg", fmt="svg")
+
+    # Step 6: Number at risk, landmark survival, and RMST, computed once per file and setting
+    st.subheader("Summary Statistics")
+    labels = {"Cohort 1": label1, "Cohort 2": label2}
+    at_risk_tables, landmark_tables, rmst_tables = [], [], []
+    for name, file_bytes, data in datasets:
+        times = tuple(at_risk_times(data, at_risk_interval, max_days))
+        summary = cached_parse(
+            file_bytes, "km-summary", lambda: summarize_km_curve(data, times, landmarks, rmst_tau),
+            times, landmarks, rmst_tau,
         )
+        prefix = f"{name}: " if len(datasets) > 1 else ""
+        at_risk = summary["number_at_risk"].rename(index=lambda c: prefix + labels.get(c, c))
+        at_risk_tables.append(at_risk)
+        for table, bucket in ((summary["landmarks"], landmark_tables), (summary["rmst"], rmst_tables)):
+            table = table.copy()
+            table["Cohort"] = [prefix + labels.get(c, c) for c in table["Cohort"]]
+            bucket.append(table)
+
+    st.markdown("**Number at risk**")
+    at_risk_table = pd.concat(at_risk_tables)
+    if at_risk_table.empty:
+        st.caption("This export has no number-at-risk columns, so the number-at-risk table is not shown.")
+    else:
+        st.dataframe(at_risk_table, use_container_width=True)
+
+    st.markdown("**Survival at landmarks**")
+    st.dataframe(pd.concat(landmark_tables, ignore_index=True).style.format(precision=4), hide_index=True, use_container_width=True)
+
+    st.markdown("**Restricted mean survival time**")
+    rmst_table = pd.concat(rmst_tables, ignore_index=True)
+    st.dataframe(rmst_table.style.format(precision=1), hide_index=True, use_container_width=True)
+    for name, _, _ in datasets:
+        rows = rmst_table[rmst_table["Cohort"].str.startswith(f"{name}: ")] if len(datasets) > 1 else rmst_table
+        if len(rows) == 2 and rows["RMST (Days)"].notna().all():
+            difference = rows["RMST (Days)"].iloc[0] - rows["RMST (Days)"].iloc[1]
+            st.caption(f"{name}: RMST difference ({label1} − {label2}) = {difference:.1f} days up to day {rmst_tau}.")
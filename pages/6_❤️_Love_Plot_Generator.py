@@ -11,7 +11,7 @@ Usage:
 """
 
 import math
-from io import StringIO, BytesIO
+from functools import partial
 
 import numpy as np
 import pandas as pd
@@ -21,422 +21,29 @@ import matplotlib
 matplotlib.use("Agg")  # headless backend for Streamlit / servers
 import matplotlib.pyplot as plt
 
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-
-
-# ------------------------- Parsing helpers ------------------------- #
-
-def load_trinetx_baseline(uploaded_file) -> pd.DataFrame:
-    """
-    Load a TriNetX 'Baseline Patient Characteristics' CSV.
-    """
-    raw_bytes = uploaded_file.getvalue()
-    text = raw_bytes.decode("utf-8", errors="ignore")
-
-    lines = text.splitlines()
-    header_idx = None
-    for i, line in enumerate(lines):
-        if line.strip().startswith("Characteristic ID"):
-            header_idx = i
-            break
-
-    if header_idx is not None:
-        data_str = "\n".join(lines[header_idx:])
-        df = pd.read_csv(StringIO(data_str))
-    else:
-        df = pd.read_csv(StringIO(text))
-
-    return df
-
-
-def find_smd_columns(df: pd.DataFrame):
-    """
-    Identify the 'Before' and 'After' standardized mean difference columns
-    in a TriNetX baseline table.
-    """
-    before_col = None
-    after_col = None
-
-    for col in df.columns:
-        cname = col.lower()
-        if "standardized mean difference" in cname and "before" in cname:
-            before_col = col
-        if "standardized mean difference" in cname and "after" in cname:
-            after_col = col
-
-    return before_col, after_col
-
-
-def prepare_love_data(
-    df: pd.DataFrame,
-    before_col: str,
-    after_col: str,
-    include_categories: bool = True,
-) -> pd.DataFrame:
-    """
-    Create a tidy dataframe suitable for Love plotting.
-    """
-    mask = df[before_col].notna() | df[after_col].notna()
-    df = df.loc[mask].copy()
-
-    if "Characteristic Name" not in df.columns:
-        raise ValueError("Expected a 'Characteristic Name' column in the baseline table.")
-
-    df["label"] = df["Characteristic Name"].fillna("").astype(str)
-
-    if include_categories and "Category" in df.columns:
-        cat = df["Category"].fillna("").astype(str)
-        df["label"] = np.where(
-            cat.str.strip() != "",
-            df["label"] + " (" + cat + ")",
-            df["label"],
-        )
-
-    df[before_col] = pd.to_numeric(df[before_col], errors="coerce")
-    df[after_col] = pd.to_numeric(df[after_col], errors="coerce")
-
-    df["abs_before"] = df[before_col].abs()
-    df["abs_after"] = df[after_col].abs()
-
-    love_df = df[["label", before_col, after_col, "abs_before", "abs_after"]].copy()
-    love_df = love_df.sort_values("abs_before", ascending=True).reset_index(drop=True)
-
-    return love_df
-
-
-# ------------------------- Metrics & plotting ------------------------- #
-
-def compute_love_metrics(
-    df: pd.DataFrame,
-    before_col: str,
-    after_col: str,
-    threshold: float = 0.1,
-) -> dict:
-    """
-    Compute summary balance metrics for 'before' and 'after' SMDs.
-    Header rows (is_header=True) should be excluded before calling this.
-    """
-    out = {}
-    for label, col in [("Before", before_col), ("After", after_col)]:
-        s = pd.to_numeric(df[col], errors="coerce").abs().dropna()
-        if s.empty:
-            stats = {
-                "N covariates": 0,
-                "Mean |SMD|": float("nan"),
-                "Median |SMD|": float("nan"),
-                "Max |SMD|": float("nan"),
-                f"N(|SMD| > {threshold})": 0,
-                f"Prop(|SMD| > {threshold})": float("nan"),
-            }
-        else:
-            stats = {
-                "N covariates": int(s.count()),
-                "Mean |SMD|": s.mean(),
-                "Median |SMD|": s.median(),
-                "Max |SMD|": s.max(),
-                f"N(|SMD| > {threshold})": int((s > threshold).sum()),
-                f"Prop(|SMD| > {threshold})": float((s > threshold).mean()),
-            }
-        out[label] = stats
-
-    b = out["Before"]["Mean |SMD|"]
-    a = out["After"]["Mean |SMD|"]
-    if not math.isnan(b) and not math.isnan(a) and b != 0:
-        out["Overall"] = {
-            "Percent reduction in mean |SMD|": 100.0 * (1.0 - a / b)
-        }
-
-    return out
-
-
-def compute_sample_retention_from_baseline(df: pd.DataFrame):
-    """
-    Compute sample retention and matching ratio from the baseline table.
-
-    Uses max patient counts across rows as an approximation of the full cohort
-    sizes before/after matching.
-    """
-    cols = [
-        "Cohort 1 Before: Patient Count",
-        "Cohort 2 Before: Patient Count",
-        "Cohort 1 After: Patient Count",
-        "Cohort 2 After: Patient Count",
-    ]
-    for c in cols:
-        if c not in df.columns:
-            return None
-
-    n1b = pd.to_numeric(df["Cohort 1 Before: Patient Count"], errors="coerce").max()
-    n2b = pd.to_numeric(df["Cohort 2 Before: Patient Count"], errors="coerce").max()
-    n1a = pd.to_numeric(df["Cohort 1 After: Patient Count"], errors="coerce").max()
-    n2a = pd.to_numeric(df["Cohort 2 After: Patient Count"], errors="coerce").max()
-
-    if any(pd.isna(x) for x in [n1b, n2b, n1a, n2a]) or (n1b == 0) or (n2b == 0) or (n1a == 0) or (n2a == 0):
-        return None
-
-    retain1 = n1a / n1b
-    retain2 = n2a / n2b
-    overall_before = n1b + n2b
-    overall_after = n1a + n2a
-    retain_overall = overall_after / overall_before if overall_before > 0 else None
-    ratio_after = n1a / n2a if n2a > 0 else None
-
-    return {
-        "N1_before": int(n1b),
-        "N2_before": int(n2b),
-        "N1_after": int(n1a),
-        "N2_after": int(n2a),
-        "retain1": retain1,
-        "retain2": retain2,
-        "retain_overall": retain_overall,
-        "ratio_after": ratio_after,
-    }
-
-
-def compute_variance_ratio_metrics(df: pd.DataFrame):
-    """
-    Compute variance ratio diagnostics for continuous covariates.
-
-    VR_before = var1_before / var2_before
-    VR_after  = var1_after  / var2_after
-
-    Reports:
-    - N continuous covariates
-    - mean |VR-1| before/after
-    - max VR before/after
-    - counts outside [0.5, 2.0] before/after
-    """
-    needed = [
-        "Cohort 1 Before: SD",
-        "Cohort 2 Before: SD",
-        "Cohort 1 After: SD",
-        "Cohort 2 After: SD",
-    ]
-    for c in needed:
-        if c not in df.columns:
-            return None
-
-    tmp = df.copy()
-    for c in needed:
-        tmp[c] = pd.to_numeric(tmp[c], errors="coerce")
-
-    mask = (
-        tmp["Cohort 1 Before: SD"].notna()
-        & tmp["Cohort 2 Before: SD"].notna()
-        & tmp["Cohort 1 After: SD"].notna()
-        & tmp["Cohort 2 After: SD"].notna()
-    )
-    cont = tmp.loc[mask].copy()
-    if cont.empty:
-        return None
-
-    var1b = cont["Cohort 1 Before: SD"] ** 2
-    var2b = cont["Cohort 2 Before: SD"] ** 2
-    var1a = cont["Cohort 1 After: SD"] ** 2
-    var2a = cont["Cohort 2 After: SD"] ** 2
-
-    vr_before = var1b / var2b
-    vr_after = var1a / var2a
-
-    lower, upper = 0.5, 2.0
-    outside_before = ((vr_before < lower) | (vr_before > upper))
-    outside_after = ((vr_after < lower) | (vr_after > upper))
-
-    return {
-        "N_continuous": int(len(cont)),
-        "Mean_abs_VR_minus_1_before": float(np.abs(vr_before - 1).mean()),
-        "Mean_abs_VR_minus_1_after": float(np.abs(vr_after - 1).mean()),
-        "Max_VR_before": float(vr_before.max()),
-        "Max_VR_after": float(vr_after.max()),
-        "N_outside_range_before": int(outside_before.sum()),
-        "N_outside_range_after": int(outside_after.sum()),
-        "range_lower": lower,
-        "range_upper": upper,
-    }
-
-
-def compute_group_balance_metrics(
-    metric_df: pd.DataFrame,
-    before_col: str,
-    after_col: str,
-    threshold: float,
-):
-    """
-    Compute group-level balance metrics based on the user-defined 'Group' column.
-
-    Expects metric_df to be covariate rows only (no header rows).
-    """
-    if metric_df is None or metric_df.empty:
-        return None
-
-    df = metric_df.copy()
-
-    if "Group" not in df.columns:
-        df["Group"] = ""
-
-    df["Group_display"] = df["Group"].replace("", "Ungrouped").fillna("Ungrouped")
-    df[before_col] = pd.to_numeric(df[before_col], errors="coerce")
-    df[after_col] = pd.to_numeric(df[after_col], errors="coerce")
-    df["abs_before"] = df[before_col].abs()
-    df["abs_after"] = df[after_col].abs()
-
-    records = []
-    for grp, g in df.groupby("Group_display"):
-        s_before = g["abs_before"].dropna()
-        s_after = g["abs_after"].dropna()
-        if s_before.empty and s_after.empty:
-            continue
-
-        n = max(len(s_before), len(s_after))
-        rec = {
-            "Group": grp,
-            "N covariates": n,
-            "Mean |SMD| Before": float(s_before.mean()) if len(s_before) > 0 else float("nan"),
-            "Mean |SMD| After": float(s_after.mean()) if len(s_after) > 0 else float("nan"),
-            f"% > {threshold:.2f} Before": float((s_before > threshold).mean() * 100) if len(s_before) > 0 else float("nan"),
-            f"% > {threshold:.2f} After": float((s_after > threshold).mean() * 100) if len(s_after) > 0 else float("nan"),
-        }
-        records.append(rec)
-
-    if not records:
-        return None
-
-    group_df = pd.DataFrame(records)
-    group_df = group_df.sort_values("Group")
-    return group_df
-
-
-def make_love_plot(
-    love_df: pd.DataFrame,
-    before_col: str,
-    after_col: str,
-    before_label: str = "Before matching",
-    after_label: str = "After matching",
-    threshold: float = 0.1,
-    before_color: str = "C0",
-    after_color: str = "C1",
-    x_min=None,
-    x_max=None,
-    show_legend: bool = True,
-    legend_position: str = "Right outside",
-    legend_fontsize: float = 10.0,
-    fig_width: float = 8.0,
-    height_per_row: float = 0.3,
-    y_tick_fontsize: float = 10.0,
-    x_tick_fontsize: float = 10.0,
-    x_label_fontsize: float = 12.0,
-    shade_band: bool = False,
-):
-    """
-    Generate the Love plot matplotlib Figure.
-    """
-    if love_df.empty:
-        return None
-
-    fig_height = max(4.0, len(love_df) * height_per_row)
-    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
-
-    y = np.arange(len(love_df))
-
-    if "is_header" in love_df.columns:
-        is_header = love_df["is_header"].fillna(False).to_numpy(dtype=bool)
-    else:
-        is_header = np.zeros(len(love_df), dtype=bool)
-
-    x_before = pd.to_numeric(love_df[before_col], errors="coerce").to_numpy()
-    x_after = pd.to_numeric(love_df[after_col], errors="coerce").to_numpy()
-
-    mask_before = (~is_header) & ~np.isnan(x_before)
-    mask_after = (~is_header) & ~np.isnan(x_after)
-
-    ax.scatter(
-        x_before[mask_before],
-        y[mask_before],
-        label=before_label,
-        marker="o",
-        color=before_color,
-    )
-    ax.scatter(
-        x_after[mask_after],
-        y[mask_after],
-        label=after_label,
-        marker="s",
-        color=after_color,
-    )
-
-    if shade_band:
-        ax.axvspan(-threshold, threshold, alpha=0.05)
-
-    ax.axvline(0, linestyle="-", linewidth=1)
-    for thr in [threshold, 2 * threshold]:
-        ax.axvline(thr, linestyle="--", linewidth=0.7)
-        ax.axvline(-thr, linestyle="--", linewidth=0.7)
-
-    if (x_min is not None) and (x_max is not None):
-        if x_min >= x_max:
-            x_min, x_max = min(x_min, x_max), max(x_min, x_max)
-        ax.set_xlim(x_min, x_max)
-
-    ax.set_yticks(list(y))
-    ax.set_yticklabels(love_df["label"])
-
-    for text, header_flag in zip(ax.get_yticklabels(), is_header):
-        text.set_fontsize(y_tick_fontsize)
-        if header_flag:
-            text.set_fontweight("bold")
-
-    ax.set_xlabel("Standardized mean difference")
-    ax.xaxis.label.set_size(x_label_fontsize)
-    ax.tick_params(axis="x", labelsize=x_tick_fontsize)
-
-    # Legend: always outside, with space carved out
-    if show_legend:
-        box = ax.get_position()
-
-        if legend_position == "Right outside":
-            ax.set_position([box.x0, box.y0, box.width * 0.78, box.height])
-            leg = ax.legend(
-                loc="center left",
-                bbox_to_anchor=(1.02, 0.5),
-                borderaxespad=0.0,
-            )
-        elif legend_position == "Left outside":
-            ax.set_position([box.x0 + box.width * 0.22, box.y0, box.width * 0.78, box.height])
-            leg = ax.legend(
-                loc="center right",
-                bbox_to_anchor=(-0.02, 0.5),
-                borderaxespad=0.0,
-            )
-        elif legend_position == "Top outside":
-            ax.set_position([box.x0, box.y0, box.width, box.height * 0.82])
-            leg = ax.legend(
-                loc="lower center",
-                bbox_to_anchor=(0.5, 1.03),
-                borderaxespad=0.5,
-            )
-        elif legend_position == "Bottom outside":
-            ax.set_position([box.x0, box.y0 + box.height * 0.18, box.width, box.height * 0.82])
-            leg = ax.legend(
-                loc="upper center",
-                bbox_to_anchor=(0.5, -0.03),
-                borderaxespad=0.5,
-            )
-        else:
-            ax.set_position([box.x0, box.y0, box.width * 0.78, box.height])
-            leg = ax.legend(
-                loc="center left",
-                bbox_to_anchor=(1.02, 0.5),
-                borderaxespad=0.0,
-            )
-
-        for txt in leg.get_texts():
-            txt.set_fontsize(legend_fontsize)
-    else:
-        fig.tight_layout()
-
-    ax.invert_yaxis()
-
-    return fig
+from trinetx_toolkit.cache import cached_parse, format_cache_stats
+from trinetx_toolkit.figures import (
+    LazyFigure,
+    figure_download_button,
+    figure_params_key,
+    format_figure_cache_stats,
+    show_preview,
+)
+from trinetx_toolkit.lazy import lazy_import
+from trinetx_toolkit.love_plot import (
+    compute_group_balance_metrics,
+    compute_love_metrics,
+    compute_sample_retention_from_baseline,
+    compute_variance_ratio_metrics,
+    find_smd_columns,
+    limit_covariates,
+    load_trinetx_baseline,
+    make_love_plot,
+    prepare_love_data,
+)
+
+# The grid component is only needed once a baseline file is loaded.
+st_aggrid = lazy_import("st_aggrid")
 
 
 # ------------------------- Streamlit UI ------------------------- #
@@ -459,7 +66,12 @@ def main():
         st.info("Waiting for a TriNetX baseline CSV upload.")
         return
 
-    df = load_trinetx_baseline(uploaded_file)
+    df = cached_parse(
+        uploaded_file.getvalue(),
+        "baseline-characteristics",
+        lambda: load_trinetx_baseline(uploaded_file),
+    )
+    st.caption(format_cache_stats())
 
     before_col, after_col = find_smd_columns(df)
     if before_col is None or after_col is None:
@@ -701,7 +313,7 @@ def main():
     )
 
     with st.expander("Edit covariate table (drag rows to reorder)", expanded=False):
-        gb = GridOptionsBuilder.from_dataframe(edit_display_df)
+        gb = st_aggrid.GridOptionsBuilder.from_dataframe(edit_display_df)
 
         gb.configure_default_column(editable=True, resizable=True, filter=True, sortable=True)
         gb.configure_column("Include", headerCheckboxSelection=False)
@@ -717,10 +329,10 @@ def main():
         grid_options["rowDragEntireRow"] = True
         grid_options["rowDragMultiRow"] = True
 
-        grid_response = AgGrid(
+        grid_response = st_aggrid.AgGrid(
             edit_display_df,
             gridOptions=grid_options,
-            update_mode=GridUpdateMode.MODEL_CHANGED,
+            update_mode=st_aggrid.GridUpdateMode.MODEL_CHANGED,
             fit_columns_on_grid_load=True,
             enable_enterprise_modules=False,
             height=400,
@@ -749,16 +361,7 @@ def main():
     cov_df["abs_after"] = cov_df[after_col].abs()
 
     # Apply max_covariates limit only to data rows (non-headers), preserve order
-    data_rows = cov_df[~cov_df["is_header"]].copy()
-    header_rows = cov_df[cov_df["is_header"]].copy()
-
-    if len(data_rows) > max_covariates:
-        keep_data_idx = data_rows["abs_before"].nlargest(max_covariates).index
-        data_rows = data_rows.loc[keep_data_idx].sort_index()
-
-    combined_df = pd.concat([header_rows, data_rows], axis=0)
-    combined_df = combined_df.sort_index()
-    cov_df_plot = combined_df.copy()
+    cov_df_plot = limit_covariates(cov_df, max_covariates)
 
     plot_df = cov_df_plot[["label", before_col, after_col, "abs_before", "abs_after", "is_header"]].copy()
 
@@ -767,10 +370,8 @@ def main():
 
     if plot_df.empty:
         st.warning("No covariates with non-missing SMDs to plot after filtering.")
-        fig = None
     else:
-        fig = make_love_plot(
-            plot_df,
+        figure_kwargs = dict(
             before_col=before_col,
             after_col=after_col,
             before_label=before_label,
@@ -790,18 +391,22 @@ def main():
             x_label_fontsize=x_label_fontsize,
             shade_band=shade_band,
         )
-        st.pyplot(fig)
-
-        if fig is not None:
-            buf = BytesIO()
-            fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
-            buf.seek(0)
-            st.download_button(
-                "Download Love plot (PNG)",
-                data=buf,
-                file_name="love_plot.png",
-                mime="image/png",
-            )
+        figure = LazyFigure(partial(make_love_plot, plot_df, **figure_kwargs), figure_params_key(plot_df, **figure_kwargs))
+        show_preview(figure)
+        st.caption(format_figure_cache_stats())
+
+        figure_download_button(
+            "Download Love plot (PNG)",
+            figure,
+            file_name="love_plot.png",
+            dpi=dpi,
+        )
+        figure_download_button(
+            "Download Love plot (SVG)",
+            figure,
+            file_name="love_plot.svg",
+            fmt="svg",
+        )
 
     # ----------------- Balance metrics, summary, and diagnostics ----------------- #
     st.subheader("Balance metrics")
@@ -0,0 +1 @@
+"""Shared helpers used by the TriNetX Publication Toolkit pages."""
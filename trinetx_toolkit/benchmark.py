@@ -0,0 +1,432 @@
+"""
+Parse/build/render benchmark over synthetic TriNetX exports.
+
+Times each page's parse, table-build, and figure-render functions against a
+synthetic export set from trinetx_toolkit.synthetic, recording throughput and
+peak traced memory per step. Parsers are called directly, bypassing the parse
+cache, and the cell tokenizer's memo is cleared before every run, so every
+repeat does the full work. Workbook copies of an export are
+also checked to give the same forest row as the CSV; a mismatch exits 1.
+
+    python -m trinetx_toolkit.benchmark --outcomes 200 --covariates 5000 --json bench.json
+    python -m trinetx_toolkit.benchmark --baseline bench.json   # exit 1 on regressions
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from trinetx_toolkit.bar_graphs import PALETTES, parse_trinetx_export, plot_2cohort_outcomes
+from trinetx_toolkit.cell_values import tokenize_text
+from trinetx_toolkit.cli import STYLE_DEFAULTS, outcomes_metadata
+from trinetx_toolkit.figures import PREVIEW_DPI, figure_bytes
+from trinetx_toolkit.forest import (
+    add_effect_size_cis,
+    assemble_forest_table,
+    build_plot_table_from_trinetx,
+    compute_axis_limits,
+    create_forest_table_hybrid,
+    forest_axis_values,
+    infer_ratio_axis_label,
+    parse_uploaded_file_bytes,
+)
+from trinetx_toolkit.km import load_km_curve_csv, plot_km_curves
+from trinetx_toolkit.love_plot import find_smd_columns, load_trinetx_baseline, make_love_plot, prepare_love_data
+from trinetx_toolkit.multiple_comparisons import parse_moa_bytes
+from trinetx_toolkit.outcomes import parse_outcome_bytes
+from trinetx_toolkit.outcomes_table import build_display_records, build_html_table
+from trinetx_toolkit.power import parse_power_stats
+from trinetx_toolkit.psm_table import (
+    DOCX_AVAILABLE,
+    build_publication_rows,
+    make_docx_bytes,
+    make_html_table,
+    read_trinetx_baseline_csv,
+)
+from trinetx_toolkit.synthetic import LAYOUT_VARIANTS, generate_exports, parse_variants
+
+# Render steps encode the on-screen preview, which every rerun pays for.
+RENDER_DPI = PREVIEW_DPI
+
+# A step counts as a regression when it is this much slower than the baseline.
+DEFAULT_TOLERANCE = 0.25
+
+
+class MemoryUpload(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+
+
+@dataclass
+class BenchCase:
+    name: str
+    run: Callable[[], Any]
+    items: int
+    input_bytes: int
+
+
+@dataclass
+class BenchResult:
+    name: str
+    items: int
+    input_bytes: int
+    seconds: float
+    items_per_second: float
+    mb_per_second: float
+    peak_memory_mb: float
+
+
+# =========================
+# Cases
+# =========================
+def _render_png(fig) -> bytes:
+    png = figure_bytes(fig, "png", RENDER_DPI)
+    plt.close(fig)
+    return png
+
+
+def _run_all(parse: Callable[[str, bytes], Any], files: Dict[str, bytes]) -> Callable[[], List[Any]]:
+    def run():
+        results = []
+        for name, data in files.items():
+            try:
+                results.append(parse(name, data))
+            except Exception as exc:
+                results.append(exc)
+        return results
+    return run
+
+
+def _case(name: str, run: Callable[[], Any], files: Dict[str, bytes]) -> BenchCase:
+    return BenchCase(name, run, len(files), sum(len(data) for data in files.values()))
+
+
+def build_cases(exports: Dict[str, bytes]) -> List[BenchCase]:
+    """One case per page step. Inputs for build/render steps are parsed up front."""
+    summary = {n: b for n, b in exports.items() if n.startswith(("moa_", "km_0"))}
+    summary_csv = {n: b for n, b in summary.items() if n.endswith(".csv")}
+    readable = {n: b for n, b in summary.items() if "_tab." not in n}
+    readable_csv = {n: b for n, b in readable.items() if n.endswith(".csv")}
+    moa_files = {n: b for n, b in readable.items() if n.startswith("moa_")}
+    baseline = {"baseline_characteristics.csv": exports["baseline_characteristics.csv"]}
+    km_curve = {"km_curve.csv": exports["km_curve.csv"]}
+
+    cases = [
+        _case("forest.parse", _run_all(parse_uploaded_file_bytes_by_name, readable), readable),
+        _case("outcomes.parse", _run_all(lambda n, b: parse_outcome_bytes(b, n), readable_csv), readable_csv),
+        _case("bar_graph.parse", _run_all(lambda n, b: parse_trinetx_export(MemoryUpload(n, b)), moa_files), moa_files),
+        _case(
+            "multiple_comparisons.parse",
+            _run_all(lambda n, b: parse_moa_bytes(b, n), {n: b for n, b in readable_csv.items() if n.startswith("moa_")}),
+            {n: b for n, b in readable_csv.items() if n.startswith("moa_")},
+        ),
+        _case("power.parse", _run_all(lambda n, b: parse_power_stats(b, n), summary_csv), summary_csv),
+        _case("psm_table.parse", _run_all(lambda n, b: read_trinetx_baseline_csv(MemoryUpload(n, b)), baseline), baseline),
+        _case("love_plot.parse", _run_all(lambda n, b: load_trinetx_baseline(MemoryUpload(n, b)), baseline), baseline),
+        _case("km_curve.parse", _run_all(lambda n, b: load_km_curve_csv(b), km_curve), km_curve),
+    ]
+
+    # Parsed inputs for the build and render steps.
+    effect_rows = [row for kind, row in (parse_uploaded_file_bytes(b, n) for n, b in readable.items()) if kind == "trinetx"]
+    parsed_outcomes = [parse_outcome_bytes(b, n) for n, b in readable_csv.items()]
+    baseline_upload = lambda: MemoryUpload("baseline_characteristics.csv", exports["baseline_characteristics.csv"])
+    raw_baseline = read_trinetx_baseline_csv(baseline_upload())
+    love_source = load_trinetx_baseline(baseline_upload())
+    before_col, after_col = find_smd_columns(love_source)
+    km_df = load_km_curve_csv(exports["km_curve.csv"])
+
+    outcomes_style = STYLE_DEFAULTS["outcomes_table"]
+    psm_style = STYLE_DEFAULTS["psm_table"]
+    psm_labels = dict(
+        cohort_1_label=psm_style["cohort_1_label"],
+        cohort_2_label=psm_style["cohort_2_label"],
+        include_p_values=psm_style["include_p_values"],
+    )
+
+    def build_outcomes_table():
+        records, columns, _ = build_display_records(
+            parsed_outcomes=parsed_outcomes,
+            metadata_df=outcomes_metadata(parsed_outcomes, outcomes_style["section"]),
+            event_decimals=outcomes_style["event_decimals"],
+            rd_decimals=outcomes_style["rd_decimals"],
+            ratio_decimals=outcomes_style["ratio_decimals"],
+            p_decimals=outcomes_style["p_decimals"],
+            include_percent_symbol_in_events=False,
+            include_risk_difference=True,
+            include_odds_ratio=False,
+            include_detected_type_column=False,
+            km_event_percent_mode=outcomes_style["km_event_percent_mode"],
+            effect_column_title_override="",
+            prefix_effect_estimates=True,
+        )
+        return build_html_table(
+            title=outcomes_style["title"],
+            records=records,
+            columns=columns,
+            font_family=outcomes_style["font_family"],
+            font_size_pt=outcomes_style["font_size_pt"],
+            table_width_percent=outcomes_style["table_width_percent"],
+            show_gridlines=True,
+            compact_spacing=True,
+            shade_section_rows=False,
+        )
+
+    def build_psm_rows():
+        return build_publication_rows(
+            raw_df=raw_baseline,
+            cohort_1_label=psm_style["cohort_1_label"],
+            cohort_2_label=psm_style["cohort_2_label"],
+            pct_decimals=psm_style["pct_decimals"],
+            mean_decimals=psm_style["mean_decimals"],
+            smd_decimals=psm_style["smd_decimals"],
+            dynamic_smd_decimals=psm_style["dynamic_smd_decimals"],
+            include_p_values=psm_style["include_p_values"],
+            clean_labels=psm_style["clean_labels"],
+            simplify_open_ended_lab_bins=psm_style["simplify_open_ended_lab_bins"],
+            exclude_aggregate_lab_rows=psm_style["exclude_aggregate_lab_rows"],
+            blank_repeated_lab_codes=psm_style["blank_repeated_lab_codes"],
+        )
+
+    publication_rows = build_psm_rows()
+
+    def build_love_data():
+        love_df = prepare_love_data(love_source, before_col, after_col)
+        love_df["is_header"] = False
+        return love_df
+
+    love_df = build_love_data()
+
+    def render_forest():
+        forest_style = dict(STYLE_DEFAULTS["forest"])
+        preferred = forest_style.pop("preferred_measure")
+        x_measure = forest_style.pop("x_measure")
+        axis_padding = forest_style.pop("axis_padding")
+        for key in ("x_min", "x_max", "x_axis_label", "rows_per_page"):
+            forest_style.pop(key)
+        df = add_effect_size_cis(assemble_forest_table(effect_rows, [], preferred))
+        plot_column, ci_vals, ref_line = forest_axis_values(df, x_measure)
+        x_min, x_max = compute_axis_limits(ci_vals, x_measure, axis_padding)
+        fig = create_forest_table_hybrid(
+            df=df,
+            plot_column=plot_column,
+            x_measure=x_measure,
+            x_axis_label=infer_ratio_axis_label(df, preferred),
+            ref_line=ref_line,
+            x_min=x_min,
+            x_max=x_max,
+            **forest_style,
+        )
+        return _render_png(fig)
+
+    bar_df = [parse_trinetx_export(MemoryUpload(n, b))[0] for n, b in moa_files.items() if n.endswith(".csv")]
+
+    def render_bar_graph():
+        import pandas as pd
+
+        bar_style = dict(STYLE_DEFAULTS["bar_graph"])
+        color1, color2 = PALETTES[bar_style.pop("palette")]
+        bar_style.update(
+            cohort1="Cohort 1", cohort2="Cohort 2", color1=color1, color2=color2,
+            x_axis_label="Risk (%)", y_axis_label="Outcome",
+        )
+        return _render_png(plot_2cohort_outcomes(pd.concat(bar_df, ignore_index=True), **bar_style))
+
+    def render_love_plot():
+        love_style = dict(STYLE_DEFAULTS["love_plot"])
+        love_style.pop("include_categories")
+        love_style.pop("max_covariates")
+        return _render_png(make_love_plot(love_df, before_col=before_col, after_col=after_col, **love_style))
+
+    def render_km_curve():
+        return _render_png(plot_km_curves(km_df, **STYLE_DEFAULTS["km_curve"]))
+
+    cases += [
+        _case("forest.build", lambda: build_plot_table_from_trinetx(effect_rows, "Risk Ratio"), readable),
+        _case("outcomes_table.build", build_outcomes_table, readable_csv),
+        _case("psm_table.build", build_psm_rows, baseline),
+        _case("psm_table.html", lambda: make_html_table(
+            publication_rows, table_title=psm_style["table_title"], font_size=psm_style["font_size"],
+            table_width_percent=psm_style["table_width_percent"], **psm_labels,
+        ), baseline),
+        _case("love_plot.build", build_love_data, baseline),
+        _case("forest.render", render_forest, readable),
+        _case("bar_graph.render", render_bar_graph, moa_files),
+        _case("love_plot.render", render_love_plot, baseline),
+        _case("km_curve.render", render_km_curve, km_curve),
+    ]
+    if DOCX_AVAILABLE:
+        cases.append(_case("psm_table.docx", lambda: make_docx_bytes(
+            publication_rows, table_title=psm_style["table_title"], font_size=psm_style["font_size"], **psm_labels,
+        ), baseline))
+    return cases
+
+
+def parse_uploaded_file_bytes_by_name(name: str, data: bytes):
+    return parse_uploaded_file_bytes(data, name)
+
+
+def workbook_mismatches(exports: Dict[str, bytes]) -> List[str]:
+    """Workbooks whose forest row differs from the one parsed from their CSV twin."""
+    mismatches = []
+    for name, data in exports.items():
+        twin = name[: -len(".xlsx")] + ".csv"
+        if not name.endswith(".xlsx") or twin not in exports:
+            continue
+        book_kind, book_row = parse_uploaded_file_bytes(data, name)
+        csv_kind, csv_row = parse_uploaded_file_bytes(exports[twin], twin)
+        if book_kind != csv_kind:
+            mismatches.append(f"{name}: parsed as {book_kind}, {twin} as {csv_kind}")
+        elif book_kind == "trinetx" and not pd.Series(book_row).drop("Source File").equals(pd.Series(csv_row).drop("Source File")):
+            mismatches.append(f"{name}: effect row differs from {twin}")
+    return mismatches
+
+
+# =========================
+# Measurement
+# =========================
+def measure(case: BenchCase, repeat: int = 3) -> BenchResult:
+    """
+    Best wall time over repeat runs, then one traced run for peak memory.
+
+    Each run starts with an empty tokenize_text() memo, as a server's first
+    parse of new files does; otherwise repeats would time a warm memo.
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        tokenize_text.cache_clear()
+        start = time.perf_counter()
+        case.run()
+        best = min(best, time.perf_counter() - start)
+
+    tokenize_text.cache_clear()
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = max(best, 1e-9)
+    return BenchResult(
+        name=case.name,
+        items=case.items,
+        input_bytes=case.input_bytes,
+        seconds=round(best, 6),
+        items_per_second=round(case.items / seconds, 2),
+        mb_per_second=round(case.input_bytes / 1e6 / seconds, 3),
+        peak_memory_mb=round(peak / 1e6, 3),
+    )
+
+
+def find_regressions(results: List[BenchResult], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Compare against a saved --json report; time and memory both count."""
+    previous = {row["name"]: row for row in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result.name)
+        if before is None:
+            continue
+        if result.seconds > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{result.name}: {before['seconds']:.4f}s -> {result.seconds:.4f}s")
+        if result.peak_memory_mb > before["peak_memory_mb"] * (1 + tolerance) + 1:
+            regressions.append(f"{result.name}: peak {before['peak_memory_mb']:.1f} MB -> {result.peak_memory_mb:.1f} MB")
+    return regressions
+
+
+def format_results(results: List[BenchResult]) -> str:
+    lines = [f"{'step':<28} {'items':>6} {'seconds':>9} {'items/s':>10} {'MB/s':>8} {'peak MB':>9}"]
+    for r in results:
+        lines.append(
+            f"{r.name:<28} {r.items:>6} {r.seconds:>9.4f} {r.items_per_second:>10.1f} "
+            f"{r.mb_per_second:>8.2f} {r.peak_memory_mb:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m trinetx_toolkit.benchmark",
+        description="Benchmark the toolkit's parse, build, and render steps on synthetic exports.",
+    )
+    parser.add_argument("--outcomes", type=int, default=50)
+    parser.add_argument("--covariates", type=int, default=500)
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", default="all", help=f"Comma-separated layout variants or 'all' ({', '.join(LAYOUT_VARIANTS)}).")
+    parser.add_argument("--xlsx-every", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per step; the best is reported.")
+    parser.add_argument("--only", default="", help="Run only steps whose name contains this text.")
+    parser.add_argument("--json", type=Path, default=None, help="Write the report to this file.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier --json report to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    config = {
+        "outcomes": args.outcomes,
+        "covariates": args.covariates,
+        "days": args.days,
+        "seed": args.seed,
+        "variants": parse_variants(args.variants),
+        "xlsx_every": args.xlsx_every,
+    }
+    exports = generate_exports(
+        n_outcomes=args.outcomes,
+        n_covariates=args.covariates,
+        n_days=args.days,
+        seed=args.seed,
+        variants=config["variants"],
+        xlsx_every=args.xlsx_every,
+    )
+    mismatches = workbook_mismatches(exports)
+    for line in mismatches:
+        print(f"MISMATCH {line}", file=sys.stderr)
+
+    cases = [case for case in build_cases(exports) if args.only in case.name]
+    print(format_results([]))
+    results = []
+    for case in cases:
+        result = measure(case, args.repeat)
+        results.append(result)
+        print(format_results([result]).splitlines()[-1], flush=True)
+
+    report = {
+        "config": config,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [asdict(r) for r in results],
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("config") != config:
+            print("Warning: baseline was recorded with a different export configuration.", file=sys.stderr)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions or mismatches else 0
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+"""
+Content-hash keyed parse cache shared by the toolkit pages.
+
+Streamlit reruns a page from the top on every widget interaction, so without a
+cache every uploaded export is decoded and parsed again each time a slider
+moves. Entries are keyed on the SHA-256 of the file bytes, a parser namespace,
+PARSER_VERSION, and any extra key parts (such as the file name when the parser
+embeds it in its result). The cache lives at module level, so it is shared by
+every page and session in the Streamlit server process.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Bump whenever a parser changes what it returns for the same bytes, so stale
+# results from an older parser are never served.
+PARSER_VERSION = "3"
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def content_hash(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+# Returned by ParseCache.lookup() when a key has not been parsed yet.
+MISS = object()
+
+
+class _ParseFailure:
+    """Cached stand-in for a parser exception so bad files are not re-parsed."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class ParseCache:
+    """Bounded LRU cache of parser results with hit/miss counters."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(file_bytes: bytes, namespace: str, *key_parts: Hashable) -> Tuple[Hashable, ...]:
+        return (content_hash(file_bytes), namespace, PARSER_VERSION) + tuple(key_parts)
+
+    def lookup(self, key: Tuple[Hashable, ...]) -> Any:
+        """
+        Return a copy of the cached result for key, or MISS.
+
+        Cached parser exceptions are re-raised. Hits and misses are counted.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cached = self._entries[key]
+        if isinstance(cached, _ParseFailure):
+            raise cached.error.with_traceback(None)
+        return copy.deepcopy(cached)
+
+    def store_result(self, key: Tuple[Hashable, ...], result: Any) -> None:
+        self._store(key, copy.deepcopy(result))
+
+    def store_failure(self, key: Tuple[Hashable, ...], error: Exception) -> None:
+        self._store(key, _ParseFailure(error))
+
+    def get_or_parse(
+        self,
+        file_bytes: bytes,
+        namespace: str,
+        parse: Callable[[], Any],
+        *key_parts: Hashable,
+    ) -> Any:
+        """
+        Return the cached result for these bytes, calling parse() on a miss.
+
+        Results are deep-copied on the way in and out so a page that edits a
+        parsed table cannot change what the next rerun receives. Parser
+        exceptions are cached too and re-raised on every hit.
+        """
+        key = self.make_key(file_bytes, namespace, *key_parts)
+        cached = self.lookup(key)
+        if cached is not MISS:
+            return cached
+
+        try:
+            result = parse()
+        except Exception as exc:
+            self.store_failure(key, exc)
+            raise
+
+        self.store_result(key, result)
+        return result
+
+    def _store(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_PARSE_CACHE = ParseCache()
+
+
+def get_parse_cache() -> ParseCache:
+    return _PARSE_CACHE
+
+
+def cached_parse(file_bytes: bytes, namespace: str, parse: Callable[[], Any], *key_parts: Hashable) -> Any:
+    """Parse through the shared process-wide cache."""
+    return _PARSE_CACHE.get_or_parse(file_bytes, namespace, parse, *key_parts)
+
+
+def format_cache_stats() -> str:
+    stats = _PARSE_CACHE.stats()
+    return (
+        f"Parse cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']}/{stats['max_entries']} files cached."
+    )
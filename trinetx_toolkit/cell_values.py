@@ -0,0 +1,126 @@
+"""
+Numeric tokenizer for effect-estimate cells in TriNetX exports.
+
+A cell such as "0.76", "0.60–0.95", "(0.60, 0.95)", "p=.021" or "<.001" is
+read once by tokenize_cell(), which returns every reading the section parser
+may ask for: the cell as an estimate, as CI bounds, as a p-value, and all of
+its numeric tokens. Patterns are compiled at import and results are memoized
+per cell text, so parsing many exports costs one tokenization per distinct
+cell no matter how many heuristics look at it.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from trinetx_toolkit.sections import clean_cell
+
+# Distinct cell strings kept in the memo; exports repeat most of theirs.
+CELL_CACHE_SIZE = 65536
+
+NUMBER_PATTERN = re.compile(r"[-+]?(?:\d+\.\d+|\d+|\.\d+)(?:[eE][-+]?\d+)?")
+# A p-value token: .021, 0.021, 1, 1.0, or 2.1E-02.
+P_TOKEN_PATTERN = re.compile(r"(?<!\d)(?:0?\.\d+|1(?:\.0+)?|\d+(?:\.\d+)?[eE][-+]?\d+)(?!\d)")
+FLOAT_P_PREFIX = re.compile(r"^(p\s*[-_ ]*(value)?\s*[<=>:=]\s*)", re.IGNORECASE)
+P_VALUE_PREFIX = re.compile(r"^p\s*[-_ ]*value\s*[:=]?\s*", re.IGNORECASE)
+P_PREFIX = re.compile(r"^p\s*[:=<>≤≥]?\s*", re.IGNORECASE)
+# "p=.021", "p-value: 0.03", "P < 0.001" anywhere in a cell.
+P_LABEL_PATTERN = re.compile(r"\bp\s*[-_ ]*(value)?\s*[<=>:]", re.IGNORECASE)
+CI_LEVEL_PATTERN = re.compile(r"\b95\s*%", re.IGNORECASE)
+# In ratio tables a dash between two numbers is a range delimiter, not a sign.
+RANGE_DASH_PATTERN = re.compile(r"(?<=\d)\s*[\-–—−]\s*(?=\d|\.)")
+NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9]+")
+
+DASHES = str.maketrans({"−": "-", "–": "-", "—": "-"})
+CI_DASHES = str.maketrans({"−": "-", "–": ",", "—": ","})
+RANGE_MARKS = ("-", "–", "—", ",", "(", ")", "[", "]")
+EMPTY_FLOAT_TEXT = {"", " ", "nan", "None"}
+
+
+class CellValues(NamedTuple):
+    """Every numeric reading of one cleaned cell."""
+
+    text: str
+    # normalize_text() of the cell, used to match labels such as "p-value".
+    key: str
+    estimate: Optional[float]
+    lower: Optional[float]
+    upper: Optional[float]
+    p: Optional[float]
+    numbers: Tuple[float, ...]
+    # True for labelled p-values such as "p=.021".
+    p_label: bool
+    # True when the cell visibly holds a range, e.g. "0.60–0.95" or "(0.60, 0.95)".
+    has_range: bool
+
+
+def _number(token: str) -> float:
+    return float("0" + token if token.startswith(".") else token)
+
+
+def _strip_affixes(text: str) -> str:
+    text = text.strip().lstrip("<>=≤≥ ").rstrip("*†‡;,")
+    return "0" + text if text.startswith(".") else text
+
+
+def _estimate(text: str) -> Optional[float]:
+    text = text.replace(",", "")
+    if text in EMPTY_FLOAT_TEXT:
+        return None
+    text = _strip_affixes(FLOAT_P_PREFIX.sub("", text.translate(DASHES)))
+    try:
+        return float(text)
+    except ValueError:
+        match = NUMBER_PATTERN.search(text)
+        return _number(match.group(0)) if match else None
+
+
+def _p_value(text: str) -> Optional[float]:
+    if not text:
+        return None
+    text = text.replace(",", "").translate(DASHES)
+    text = _strip_affixes(P_PREFIX.sub("", P_VALUE_PREFIX.sub("", text)))
+    try:
+        value = float(text)
+        if 0 <= value <= 1:
+            return value
+    except ValueError:
+        pass
+    match = P_TOKEN_PATTERN.search(text)
+    if match:
+        value = _number(match.group(0))
+        if 0 <= value <= 1:
+            return value
+    return None
+
+
+def _ci_bounds(text: str) -> Tuple[Optional[float], Optional[float]]:
+    if not text:
+        return None, None
+    text = RANGE_DASH_PATTERN.sub(",", CI_LEVEL_PATTERN.sub("", text)).translate(CI_DASHES)
+    bounds = NUMBER_PATTERN.findall(text)
+    if len(bounds) >= 2:
+        return _number(bounds[0]), _number(bounds[1])
+    return None, None
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def tokenize_text(text: str) -> CellValues:
+    """tokenize_cell() for text that has already been through clean_cell()."""
+    lower, upper = _ci_bounds(text)
+    return CellValues(
+        text=text,
+        key=NON_ALNUM_PATTERN.sub("", text.lower()),
+        estimate=_estimate(text),
+        lower=lower,
+        upper=upper,
+        p=_p_value(text),
+        numbers=tuple(_number(token) for token in NUMBER_PATTERN.findall(text.translate(DASHES))),
+        p_label=bool(P_LABEL_PATTERN.search(text)),
+        has_range=any(mark in text for mark in RANGE_MARKS),
+    )
+
+
+def tokenize_cell(value) -> CellValues:
+    """Estimate, CI bounds, p-value and numeric tokens of one cell, from a single memoized pass."""
+    return tokenize_text(clean_cell(value))
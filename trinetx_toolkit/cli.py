@@ -0,0 +1,634 @@
+"""
+Headless batch renderer for a directory of TriNetX exports.
+
+    python -m trinetx_toolkit EXPORT_DIR --style style.yaml --out figures/
+
+Every CSV/XLSX file in EXPORT_DIR is classified as a Baseline Patient
+Characteristics export, a Kaplan-Meier curve export, or an MOA / Kaplan-Meier
+summary table, then rendered in one process with the same functions the
+Streamlit pages use:
+
+- summary tables -> forest plot, two-cohort bar graph, and outcomes table
+- baseline exports -> PSM Table 1 and Love plot (one set per file)
+- KM curve exports -> survival curve figure (one per file)
+
+The style file (JSON, or YAML when PyYAML is installed) holds top-level
+"dpi" and "formats" keys plus one mapping per output whose keys override the
+page defaults in STYLE_DEFAULTS, for example:
+
+    dpi: 600
+    formats: [png, pdf]
+    forest:
+      preferred_measure: Hazard Ratio
+      use_log: true
+      rows_per_page: 40       # paginated forest export
+      pool_method: reml       # pooled diamonds: fixed, dl, or reml
+    psm_table:
+      cohort_1_label: Statins
+      cohort_2_label: Control
+"""
+
+import argparse
+import copy
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+try:
+    import yaml
+
+    YAML_AVAILABLE = True
+except Exception:
+    YAML_AVAILABLE = False
+
+from trinetx_toolkit.bar_graphs import PALETTES, bar_row_from_parsed_outcome, plot_2cohort_outcomes
+from trinetx_toolkit.forest import (
+    add_effect_size_cis,
+    assemble_forest_table,
+    compute_axis_limits,
+    create_forest_table_hybrid,
+    detect_and_load_uploaded_files,
+    forest_axis_values,
+    forest_pages_pdf,
+    forest_pages_zip,
+    infer_ratio_axis_label,
+    pooled_estimates,
+)
+from trinetx_toolkit.ingest import ParseJob, cached_parse_many
+from trinetx_toolkit.km import load_km_curve_csv, plot_km_curves
+from trinetx_toolkit.love_plot import (
+    find_smd_columns,
+    limit_covariates,
+    load_trinetx_baseline,
+    make_love_plot,
+    prepare_love_data,
+)
+from trinetx_toolkit.outcomes import EXPORT_KM, EXPORT_MOA, ParsedOutcome, parse_outcome_bytes
+from trinetx_toolkit.outcomes_table import (
+    build_display_records,
+    build_html_table,
+    build_word_document_html,
+    records_to_plain_dataframe,
+)
+from trinetx_toolkit.psm_table import (
+    DOCX_AVAILABLE,
+    build_publication_rows,
+    make_docx_bytes,
+    make_html_table,
+    make_plain_export_df,
+    read_trinetx_baseline_csv,
+)
+from trinetx_toolkit.sections import decode_export_bytes
+
+
+EXPORT_SUFFIXES = {".csv", ".xlsx", ".xls"}
+
+KIND_BASELINE = "baseline"
+KIND_KM_CURVE = "km_curve"
+KIND_SUMMARY = "summary"
+
+
+# =========================
+# Style defaults
+# =========================
+# Values mirror the sidebar defaults on each page. None means "derive from the
+# data", the same way the page pre-fills that widget.
+STYLE_DEFAULTS: Dict[str, Any] = {
+    "dpi": 300,
+    "formats": ["png"],
+    "forest": {
+        "preferred_measure": "Risk Ratio",
+        "x_measure": "Risk, Odds, or Hazard Ratio",
+        "axis_padding": 10,
+        "x_min": None,
+        "x_max": None,
+        "x_axis_label": None,
+        "plot_title": "Forest Plot",
+        "use_groups": True,
+        "use_log": False,
+        "show_grid": True,
+        "font_size": 12,
+        "point_size": 9,
+        "line_width": 2,
+        "cap_height": 0.18,
+        "header_color": "#203F99",
+        "significant_color": "#1F3D99",
+        "nonsignificant_color": "#666666",
+        "rows_per_page": None,
+        # A meta_analysis.POOLING_METHODS key adds pooled rows; pool_by is "outcome" or "section".
+        "pool_method": None,
+        "pool_by": "outcome",
+    },
+    "bar_graph": {
+        "cohort1": None,
+        "cohort2": None,
+        "palette": "University of California",
+        "color1": None,
+        "color2": None,
+        "orientation": "Horizontal",
+        "font_family": "Arial",
+        "font_size": 14,
+        "tick_fontsize": 11,
+        "bar_width": 0.26,
+        "gridlines": True,
+        "show_values": True,
+        "show_legend": True,
+        "group_gap": 2.3,
+        "pair_gap": 0.32,
+        "major_tick_length": 8,
+        "minor_ticks": True,
+        "show_error_bars": True,
+        "error_bar_capsize": 4,
+        "error_bar_linewidth": 1.4,
+        "value_decimals": 4,
+        "figure_width_inches": 10.0,
+        "figure_height_inches": 6.0,
+        "x_axis_label": None,
+        "y_axis_label": None,
+        "auto_avoid_text_collisions": True,
+        "wrap_outcome_labels": True,
+        "max_label_chars": 18,
+        "vertical_tick_rotation": 30,
+        "show_significance_stars": False,
+        "significance_alpha": 0.05,
+        "manual_percent_axis": False,
+        "percent_axis_min": 0.0,
+        "percent_axis_max": None,
+        "percent_axis_tick_interval": None,
+    },
+    "outcomes_table": {
+        "title": "Table 2: Outcomes",
+        "section": "Main Analysis",
+        "event_decimals": 2,
+        "rd_decimals": 2,
+        "ratio_decimals": 2,
+        "p_decimals": 3,
+        "include_percent_symbol_in_events": False,
+        "km_event_percent_mode": "Observed events / patients in cohort",
+        "include_risk_difference": None,
+        "effect_column_title_override": "",
+        "prefix_effect_estimates": None,
+        "include_odds_ratio": False,
+        "include_detected_type_column": False,
+        "font_family": "Times New Roman, Times, serif",
+        "font_size_pt": 10,
+        "table_width_percent": 100,
+        "show_gridlines": True,
+        "compact_spacing": True,
+        "shade_section_rows": False,
+    },
+    "psm_table": {
+        "table_title": "Table 1: Main analysis cohort characteristics before and after propensity score matching.",
+        "cohort_1_label": "Cohort 1",
+        "cohort_2_label": "Cohort 2",
+        "clean_labels": True,
+        "exclude_aggregate_lab_rows": True,
+        "simplify_open_ended_lab_bins": True,
+        "blank_repeated_lab_codes": True,
+        "include_p_values": False,
+        "pct_decimals": 2,
+        "mean_decimals": 2,
+        "dynamic_smd_decimals": True,
+        "smd_decimals": 3,
+        "font_size": 8,
+        "table_width_percent": 100,
+    },
+    "love_plot": {
+        "include_categories": True,
+        "max_covariates": 60,
+        "before_label": "Before matching",
+        "after_label": "After matching",
+        "threshold": 0.1,
+        "before_color": "#1f77b4",
+        "after_color": "#ff7f0e",
+        "x_min": None,
+        "x_max": None,
+        "show_legend": True,
+        "legend_position": "Right outside",
+        "legend_fontsize": 10.0,
+        "fig_width": 8.0,
+        "height_per_row": 0.3,
+        "y_tick_fontsize": 10.0,
+        "x_tick_fontsize": 10.0,
+        "x_label_fontsize": 12.0,
+        "shade_band": False,
+    },
+    "km_curve": {
+        "plot_title": "Kaplan-Meier Survival Curve",
+        "label1": "Cohort 1",
+        "label2": "Cohort 2",
+        "x_label": "Time (Days)",
+        "y_label": "Survival Probability",
+        "style": "Color",
+        "color1": "#1f77b4",
+        "color2": "#ff7f0e",
+        "line_width": 2.0,
+        "show_ci": True,
+        "ci_alpha": 0.2,
+        "show_grid": True,
+        "fig_width": 10,
+        "fig_height": 6,
+        "y_min": 0.0,
+        "y_max": 1.05,
+        "title_fontsize": 16,
+        "label_fontsize": 12,
+        "tick_fontsize": 10,
+        "legend_fontsize": 12,
+        "max_days": None,
+        "decimate": True,
+    },
+}
+
+
+def load_style(path: Optional[Path]) -> Dict[str, Any]:
+    """Read a JSON or YAML style file and merge it over STYLE_DEFAULTS."""
+    style = copy.deepcopy(STYLE_DEFAULTS)
+    if path is None:
+        return style
+
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in {".yaml", ".yml"}:
+        if not YAML_AVAILABLE:
+            raise ValueError("Reading a YAML style file requires PyYAML. Install it or use a JSON style file.")
+        overrides = yaml.safe_load(text) or {}
+    else:
+        overrides = json.loads(text)
+
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path.name} must contain a mapping of style options.")
+
+    for key, value in overrides.items():
+        if key not in style:
+            raise ValueError(f"Unknown style section '{key}'. Expected one of: {', '.join(style)}")
+        if isinstance(style[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"Style section '{key}' must be a mapping.")
+            unknown = sorted(set(value) - set(style[key]))
+            if unknown:
+                raise ValueError(f"Unknown '{key}' style option(s): {', '.join(unknown)}")
+            style[key].update(value)
+        else:
+            style[key] = value
+    if isinstance(style["formats"], str):
+        style["formats"] = [style["formats"]]
+    return style
+
+
+# =========================
+# Export discovery
+# =========================
+class ExportFile:
+    """A file on disk with the same name/getvalue() interface as a Streamlit upload."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        self._bytes = path.read_bytes()
+
+    def getvalue(self) -> bytes:
+        return self._bytes
+
+
+def classify_export(export: ExportFile) -> str:
+    if export.path.suffix.lower() != ".csv":
+        return KIND_SUMMARY
+    head = decode_export_bytes(export.getvalue()[:4096])
+    if "Characteristic ID" in head:
+        return KIND_BASELINE
+    if "Time (Days)" in head and "Survival Probability" in head:
+        return KIND_KM_CURVE
+    return KIND_SUMMARY
+
+
+def discover_exports(export_dir: Path) -> Dict[str, List[ExportFile]]:
+    """Group the exports in a directory by kind, in file-name order."""
+    grouped: Dict[str, List[ExportFile]] = {KIND_BASELINE: [], KIND_KM_CURVE: [], KIND_SUMMARY: []}
+    for path in sorted(export_dir.iterdir()):
+        if path.is_file() and path.suffix.lower() in EXPORT_SUFFIXES:
+            export = ExportFile(path)
+            grouped[classify_export(export)].append(export)
+    return grouped
+
+
+# =========================
+# Writers
+# =========================
+def save_figure(fig, out_dir: Path, stem: str, style: Dict[str, Any]) -> List[Path]:
+    written = []
+    for fmt in style["formats"]:
+        path = out_dir / f"{stem}.{fmt}"
+        fig.savefig(path, format=fmt, dpi=style["dpi"], bbox_inches="tight")
+        written.append(path)
+    plt.close(fig)
+    return written
+
+
+def write_bytes(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+# =========================
+# Renderers
+# =========================
+def render_forest(summary_files: List[ExportFile], style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    opts = dict(style["forest"])
+    trinetx_rows, standard_tables, notes = detect_and_load_uploaded_files(summary_files)
+    df = assemble_forest_table(trinetx_rows, standard_tables, opts["preferred_measure"])
+    if df is None:
+        return [], notes + ["Forest plot skipped: no usable effect estimates were parsed."]
+    df = add_effect_size_cis(df)
+
+    x_measure = opts.pop("x_measure")
+    axis_padding = opts.pop("axis_padding")
+    preferred_measure = opts.pop("preferred_measure")
+    x_min, x_max, x_axis_label = opts.pop("x_min"), opts.pop("x_max"), opts.pop("x_axis_label")
+    rows_per_page = opts.pop("rows_per_page")
+
+    plot_column, ci_vals, ref_line = forest_axis_values(df, x_measure)
+    if ci_vals.empty:
+        return [], notes + ["Forest plot skipped: no plottable effect estimates were found."]
+    auto_x_min, auto_x_max = compute_axis_limits(ci_vals, x_measure, axis_padding, use_log=opts["use_log"])
+    if x_axis_label is None:
+        if x_measure == "Risk, Odds, or Hazard Ratio":
+            x_axis_label = infer_ratio_axis_label(df, preferred_measure)
+        else:
+            x_axis_label = plot_column
+
+    figure_kwargs = dict(
+        plot_column=plot_column,
+        x_measure=x_measure,
+        x_axis_label=x_axis_label,
+        ref_line=ref_line,
+        x_min=auto_x_min if x_min is None else x_min,
+        x_max=auto_x_max if x_max is None else x_max,
+        **opts,
+    )
+    written = []
+    if opts["pool_method"]:
+        pooled = pooled_estimates(df, use_groups=opts["use_groups"], pool_by=opts["pool_by"])
+        written.append(write_bytes(out_dir / "forest_pooled_estimates.csv", pooled.to_csv(index=False).encode("utf-8")))
+    if rows_per_page:
+        # Paginated: a multi-page PDF for "pdf", a ZIP of page images for other formats.
+        for fmt in style["formats"]:
+            if fmt == "pdf":
+                data = forest_pages_pdf(df, rows_per_page, **figure_kwargs)
+                written.append(write_bytes(out_dir / "forest_plot_pages.pdf", data))
+            else:
+                data = forest_pages_zip(df, rows_per_page, fmt=fmt, dpi=style["dpi"], **figure_kwargs)
+                written.append(write_bytes(out_dir / f"forest_plot_pages_{fmt}.zip", data))
+        return written, notes
+
+    fig = create_forest_table_hybrid(df=df, **figure_kwargs)
+    return written + save_figure(fig, out_dir, "forest_plot_table_hybrid", style), notes
+
+
+def render_bar_graph(parsed_outcomes: List[ParsedOutcome], style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    opts = dict(style["bar_graph"])
+    rows, notes = [], []
+    meta = None
+    for parsed in parsed_outcomes:
+        try:
+            row, row_meta, _ = bar_row_from_parsed_outcome(parsed)
+        except ValueError as exc:
+            notes.append(f"Bar graph skipped {parsed.source_file}: {exc}")
+            continue
+        rows.append(row)
+        meta = meta or row_meta
+    if not rows:
+        return [], notes
+
+    df = pd.concat(rows, ignore_index=True)
+    color1_default, color2_default = PALETTES[opts.pop("palette")]
+    opts["color1"] = opts["color1"] or color1_default
+    opts["color2"] = opts["color2"] or color2_default
+    opts["cohort1"] = opts["cohort1"] or meta["cohort1_name"]
+    opts["cohort2"] = opts["cohort2"] or meta["cohort2_name"]
+    vertical = opts["orientation"] == "Vertical"
+    if opts["x_axis_label"] is None:
+        opts["x_axis_label"] = "Outcome" if vertical else "Risk (%)"
+    if opts["y_axis_label"] is None:
+        opts["y_axis_label"] = "Risk (%)" if vertical else "Outcome"
+
+    fig = plot_2cohort_outcomes(df, **opts)
+    written = save_figure(fig, out_dir, "2Cohort_Bargraph", style)
+    written.append(write_bytes(out_dir / "2Cohort_Bargraph_Data.csv", df.to_csv(index=False).encode("utf-8")))
+    return written, notes
+
+
+def outcomes_metadata(parsed_outcomes: List[ParsedOutcome], section: str) -> pd.DataFrame:
+    """The Outcomes Table page's label editor, with every row kept as detected."""
+    return pd.DataFrame([
+        {
+            "Include": True,
+            "Display order": order,
+            "Section": section,
+            "Outcome": parsed.default_outcome,
+            "Cohort 1 label": parsed.cohort1_label,
+            "Cohort 2 label": parsed.cohort2_label,
+            "Detected table type": parsed.export_type,
+            "Effect measure": parsed.effect_measure_label,
+            "p value source": parsed.p_value_source,
+            "Source file": parsed.source_file,
+            "Source key": parsed.source_key,
+        }
+        for order, parsed in enumerate(parsed_outcomes, start=1)
+    ])
+
+
+def render_outcomes_table(parsed_outcomes: List[ParsedOutcome], style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    opts = dict(style["outcomes_table"])
+    has_moa = any(parsed.export_type == EXPORT_MOA for parsed in parsed_outcomes)
+    has_km = any(parsed.export_type == EXPORT_KM for parsed in parsed_outcomes)
+    if opts["include_risk_difference"] is None:
+        opts["include_risk_difference"] = has_moa
+    if opts["prefix_effect_estimates"] is None:
+        opts["prefix_effect_estimates"] = has_moa and has_km
+
+    records, columns, _ = build_display_records(
+        parsed_outcomes=parsed_outcomes,
+        metadata_df=outcomes_metadata(parsed_outcomes, opts["section"]),
+        event_decimals=int(opts["event_decimals"]),
+        rd_decimals=int(opts["rd_decimals"]),
+        ratio_decimals=int(opts["ratio_decimals"]),
+        p_decimals=int(opts["p_decimals"]),
+        include_percent_symbol_in_events=opts["include_percent_symbol_in_events"],
+        include_risk_difference=opts["include_risk_difference"],
+        include_odds_ratio=opts["include_odds_ratio"],
+        include_detected_type_column=opts["include_detected_type_column"],
+        km_event_percent_mode=opts["km_event_percent_mode"],
+        effect_column_title_override=opts["effect_column_title_override"],
+        prefix_effect_estimates=opts["prefix_effect_estimates"],
+    )
+    if not records:
+        return [], ["Outcomes table skipped: no outcomes could be displayed."]
+
+    table_html = build_html_table(
+        title=opts["title"],
+        records=records,
+        columns=columns,
+        font_family=opts["font_family"],
+        font_size_pt=int(opts["font_size_pt"]),
+        table_width_percent=int(opts["table_width_percent"]),
+        show_gridlines=opts["show_gridlines"],
+        compact_spacing=opts["compact_spacing"],
+        shade_section_rows=opts["shade_section_rows"],
+    )
+    plain_df = records_to_plain_dataframe(records, columns)
+    written = [
+        write_bytes(out_dir / "trinetx_outcomes_table2.doc", build_word_document_html(table_html).encode("utf-8")),
+        write_bytes(out_dir / "trinetx_outcomes_table2.html", table_html.encode("utf-8")),
+        write_bytes(out_dir / "trinetx_outcomes_table2.csv", plain_df.to_csv(index=False).encode("utf-8")),
+    ]
+    return written, []
+
+
+def render_psm_table(export: ExportFile, style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    opts = style["psm_table"]
+    raw_df = read_trinetx_baseline_csv(export)
+    table_df = build_publication_rows(
+        raw_df=raw_df,
+        cohort_1_label=opts["cohort_1_label"],
+        cohort_2_label=opts["cohort_2_label"],
+        pct_decimals=opts["pct_decimals"],
+        mean_decimals=opts["mean_decimals"],
+        smd_decimals=opts["smd_decimals"],
+        dynamic_smd_decimals=opts["dynamic_smd_decimals"],
+        include_p_values=opts["include_p_values"],
+        clean_labels=opts["clean_labels"],
+        simplify_open_ended_lab_bins=opts["simplify_open_ended_lab_bins"],
+        exclude_aggregate_lab_rows=opts["exclude_aggregate_lab_rows"],
+        blank_repeated_lab_codes=opts["blank_repeated_lab_codes"],
+    )
+    labels = dict(
+        cohort_1_label=opts["cohort_1_label"],
+        cohort_2_label=opts["cohort_2_label"],
+        include_p_values=opts["include_p_values"],
+    )
+    html_table = make_html_table(
+        table_df,
+        table_title=opts["table_title"],
+        font_size=opts["font_size"],
+        table_width_percent=opts["table_width_percent"],
+        **labels,
+    )
+    plain_df = make_plain_export_df(table_df, **labels)
+
+    stem = f"{export.path.stem}_table1"
+    written = [
+        write_bytes(out_dir / f"{stem}.csv", plain_df.to_csv(index=False).encode("utf-8")),
+        write_bytes(out_dir / f"{stem}.html", html_table.encode("utf-8")),
+    ]
+    notes = []
+    if DOCX_AVAILABLE:
+        docx_bytes = make_docx_bytes(table_df, table_title=opts["table_title"], font_size=opts["font_size"], **labels)
+        written.append(write_bytes(out_dir / f"{stem}.docx", docx_bytes))
+    else:
+        notes.append(f"{export.name}: DOCX export skipped because python-docx is not installed.")
+    return written, notes
+
+
+def render_love_plot(export: ExportFile, style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    opts = dict(style["love_plot"])
+    df = load_trinetx_baseline(export)
+    before_col, after_col = find_smd_columns(df)
+    if before_col is None or after_col is None:
+        return [], [f"{export.name}: Love plot skipped, no before/after standardized mean difference columns."]
+
+    love_df = prepare_love_data(df, before_col, after_col, include_categories=opts.pop("include_categories"))
+    love_df["is_header"] = False
+    plot_df = limit_covariates(love_df, opts.pop("max_covariates"))
+    plot_df = plot_df[["label", before_col, after_col, "abs_before", "abs_after", "is_header"]]
+
+    fig = make_love_plot(plot_df, before_col=before_col, after_col=after_col, **opts)
+    if fig is None:
+        return [], [f"{export.name}: Love plot skipped, no covariates with non-missing SMDs."]
+    return save_figure(fig, out_dir, f"{export.path.stem}_love_plot", style), []
+
+
+def render_km_curve(export: ExportFile, style: Dict[str, Any], out_dir: Path) -> Tuple[List[Path], List[str]]:
+    df = load_km_curve_csv(export.getvalue())
+    fig = plot_km_curves(df, **style["km_curve"])
+    return save_figure(fig, out_dir, f"{export.path.stem}_km_curve", style), []
+
+
+# =========================
+# Batch driver
+# =========================
+def run_batch(export_dir: Path, out_dir: Path, style: Dict[str, Any]) -> Tuple[List[Path], List[str]]:
+    """Render every output the exports in export_dir support. Returns (written paths, notes)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    grouped = discover_exports(export_dir)
+    written: List[Path] = []
+    notes: List[str] = []
+
+    def run(label: str, render, *args) -> None:
+        try:
+            paths, render_notes = render(*args, style, out_dir)
+        except Exception as exc:
+            notes.append(f"{label} failed: {exc}")
+            return
+        written.extend(paths)
+        notes.extend(render_notes)
+
+    summary_files = grouped[KIND_SUMMARY]
+    if summary_files:
+        run("Forest plot", render_forest, summary_files)
+
+        csv_files = [export for export in summary_files if export.path.suffix.lower() == ".csv"]
+        jobs = [ParseJob(export.getvalue(), (export.name,), (export.name,)) for export in csv_files]
+        parsed_outcomes = []
+        for export, (parsed, error) in zip(csv_files, cached_parse_many(jobs, "parsed-outcome", parse_outcome_bytes)):
+            if error is None:
+                parsed_outcomes.append(parsed)
+            else:
+                notes.append(f"Could not parse {export.name}: {error}")
+        if parsed_outcomes:
+            run("Bar graph", render_bar_graph, parsed_outcomes)
+            run("Outcomes table", render_outcomes_table, parsed_outcomes)
+
+    for export in grouped[KIND_BASELINE]:
+        run(f"{export.name} PSM table", render_psm_table, export)
+        run(f"{export.name} Love plot", render_love_plot, export)
+
+    for export in grouped[KIND_KM_CURVE]:
+        run(f"{export.name} KM curve", render_km_curve, export)
+
+    return written, notes
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m trinetx_toolkit",
+        description="Render every figure and table for a directory of TriNetX exports without the Streamlit app.",
+    )
+    parser.add_argument("export_dir", type=Path, help="Directory of TriNetX CSV/XLSX exports.")
+    parser.add_argument("--style", type=Path, default=None, help="JSON or YAML file overriding the default styles.")
+    parser.add_argument("--out", type=Path, default=Path("trinetx_output"), help="Output directory (default: trinetx_output).")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.export_dir.is_dir():
+        print(f"Not a directory: {args.export_dir}", file=sys.stderr)
+        return 2
+    try:
+        style = load_style(args.style)
+    except (OSError, ValueError) as exc:
+        print(f"Could not load style file: {exc}", file=sys.stderr)
+        return 2
+
+    written, notes = run_batch(args.export_dir, args.out, style)
+    for path in written:
+        print(path)
+    for note in notes:
+        print(f"- {note}", file=sys.stderr)
+    return 0 if written else 1
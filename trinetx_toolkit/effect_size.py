@@ -0,0 +1,42 @@
+"""
+Ratio to Cohen's d conversion for the Effect Size and Forest Plot pages.
+
+Risk, odds, and hazard ratios are converted with the logistic approximation
+d = ln(ratio) × √3/π, a whole column at a time. A ratio is only defined when it
+is positive, so zero, negative, missing, and non-numeric ratios all give NaN.
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+LOG_RATIO_TO_D = np.sqrt(3) / np.pi
+
+
+def _log_ratio_to_d(ratios: np.ndarray) -> np.ndarray:
+    d = np.full(ratios.shape, np.nan)
+    np.log(ratios, out=d, where=ratios > 0)
+    return d * LOG_RATIO_TO_D
+
+
+def ratio_to_cohens_d(values: Any) -> Any:
+    """
+    Cohen's d for every ratio in values.
+
+    A Series comes back with the same index and name; anything else comes
+    back as a float array, or a float for a single value.
+    """
+    if isinstance(values, pd.Series):
+        ratios = pd.to_numeric(values, errors="coerce").astype(float).to_numpy()
+        return pd.Series(_log_ratio_to_d(ratios), index=values.index, name=values.name)
+    raw = np.asarray(values, dtype=object)
+    ratios = pd.to_numeric(pd.Series(raw.ravel()), errors="coerce").astype(float).to_numpy()
+    d = _log_ratio_to_d(ratios).reshape(raw.shape)
+    return float(d) if d.ndim == 0 else d
+
+
+def nonpositive_ratios(values: pd.Series) -> pd.Series:
+    """True for entries that are numbers but not valid ratios (zero or negative)."""
+    ratios = pd.to_numeric(values, errors="coerce")
+    return ratios.notna() & (ratios <= 0)
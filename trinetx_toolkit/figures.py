@@ -0,0 +1,231 @@
+"""
+Screen previews, on-demand exports, and a render cache for the plotting pages.
+
+Pages describe a figure as a LazyFigure: a build callable plus a hash of the
+plotted data and every style argument. The screen-resolution preview and any
+full-resolution PNG or vector export are looked up by that hash in a
+process-wide cache of rendered bytes, so the Matplotlib figure is only built
+when some rendering is missing. Reruns caused by unrelated widgets, and
+toggling back to an earlier setting, serve cached bytes. Exports are rendered
+only when a download is requested.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from trinetx_toolkit.lazy import lazy_import
+
+# Pages that only use the download helpers (e.g. the PSM table) should not pay
+# for Matplotlib at start-up; pyplot loads when a figure is first built.
+plt = lazy_import("matplotlib.pyplot")
+
+PREVIEW_DPI = 110
+EXPORT_DPI = 300
+
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+# Rendered previews and exports kept across pages and sessions.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+# =========================
+# Hashing
+# =========================
+def _update_hash(digest, value: Any) -> None:
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((list(value.columns), list(value.dtypes.astype(str)))).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(repr((value.name, str(value.dtype))).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode("utf-8"))
+            _update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode("utf-8"))
+        for item in value:
+            _update_hash(digest, item)
+    else:
+        digest.update(repr(value).encode("utf-8"))
+    digest.update(b"\x00")
+
+
+def figure_params_key(*data: Any, **params: Any) -> str:
+    """Stable hash of a figure's input data and style arguments."""
+    digest = hashlib.sha256()
+    _update_hash(digest, data)
+    _update_hash(digest, params)
+    return digest.hexdigest()
+
+
+# =========================
+# Rendering
+# =========================
+def figure_bytes(fig, fmt: str = "png", dpi: int = EXPORT_DPI) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+class FigureCache:
+    """LRU of rendered figure bytes, bounded by their total size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Hashable, ...], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[Hashable, ...]) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get_or_render(self, key: Tuple[Hashable, ...], render: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        data = render()
+        self._store(key, data)
+        return data
+
+    def _store(self, key: Tuple[Hashable, ...], data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= len(self._entries[key])
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+_FIGURE_CACHE = FigureCache()
+
+
+def get_figure_cache() -> FigureCache:
+    return _FIGURE_CACHE
+
+
+def format_figure_cache_stats() -> str:
+    stats = _FIGURE_CACHE.stats()
+    return (
+        f"Figure cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']} renderings, {stats['bytes'] / 1e6:.1f}/{stats['max_bytes'] / 1e6:.0f} MB."
+    )
+
+
+class LazyFigure:
+    """
+    A figure that is built only when one of its renderings is not cached.
+
+    build() must return a Matplotlib figure; params_key should come from
+    figure_params_key() over everything build() depends on.
+    """
+
+    def __init__(self, build: Callable[[], Any], params_key: str):
+        self.build = build
+        self.params_key = params_key
+        self._figure = None
+        self._lock = threading.Lock()
+
+    @property
+    def figure(self):
+        with self._lock:
+            if self._figure is None:
+                self._figure = self.build()
+                # Drop pyplot's reference; savefig works on closed figures.
+                plt.close(self._figure)
+            return self._figure
+
+    def cache_key(self, fmt: str = "png", dpi: int = EXPORT_DPI) -> Tuple[Hashable, ...]:
+        return (self.params_key, fmt, int(dpi) if fmt == "png" else 0)
+
+    def render(self, fmt: str = "png", dpi: int = EXPORT_DPI) -> bytes:
+        """Rendered bytes, from the figure cache when available."""
+        return _FIGURE_CACHE.get_or_render(
+            self.cache_key(fmt, dpi),
+            lambda: figure_bytes(self.figure, fmt, dpi),
+        )
+
+
+# =========================
+# Streamlit helpers
+# =========================
+def show_preview(figure: LazyFigure, dpi: int = PREVIEW_DPI, **image_kwargs: Any) -> None:
+    """Display the figure as a screen-resolution PNG."""
+    st.image(figure.render("png", dpi), **image_kwargs)
+
+
+def deferred_download_button(
+    label: str,
+    build: Callable[[], bytes],
+    file_name: str,
+    mime: str,
+    key: str,
+    **button_kwargs: Any,
+) -> None:
+    """Download button for a non-figure export that is built only when requested."""
+    st.download_button(label, data=build, file_name=file_name, mime=mime, key=key, on_click="ignore", **button_kwargs)
+
+
+def figure_download_button(
+    label: str,
+    figure: LazyFigure,
+    file_name: str,
+    fmt: str = "png",
+    dpi: int = EXPORT_DPI,
+    key: Optional[str] = None,
+) -> None:
+    """
+    Download button whose export is rendered only when it is requested.
+
+    Streamlit calls the render callable on click (deferred downloads,
+    Streamlit >= 1.48), so the button needs no rerun and works inside a
+    one-shot "Generate" block.
+    """
+    st.download_button(
+        label,
+        data=lambda: figure.render(fmt, dpi),
+        file_name=file_name,
+        mime=IMAGE_MIME_TYPES[fmt],
+        key=key or f"figure_download_{file_name}",
+        on_click="ignore",
+    )
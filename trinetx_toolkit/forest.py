@@ -0,0 +1,1427 @@
+"""
+Forest plot parsing, table assembly, and rendering.
+
+Turns TriNetX Measures of Association and Kaplan-Meier exports (or a
+prepared effect-estimate table) into forest-plot rows and draws the hybrid
+table/plot figure. Used by the Forest Plot Generator page and the batch CLI.
+"""
+
+import io
+import pickle
+import re
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.markers import MarkerStyle
+from matplotlib.patches import Rectangle
+from matplotlib.path import Path as MarkerPath
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox, blended_transform_factory
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from trinetx_toolkit.cell_values import tokenize_cell, tokenize_text
+from trinetx_toolkit.effect_size import ratio_to_cohens_d
+from trinetx_toolkit.ingest import ParseJob, cached_parse_many, default_max_workers, discard_process_pool, get_process_pool
+from trinetx_toolkit.meta_analysis import POOLING_METHOD_LABELS, POOLING_METHODS, pool_log_ratios
+from trinetx_toolkit.sections import GENERATED_BY_LABEL, build_section_index, read_first_excel_sheet, read_text_rows
+
+
+required_cols = [
+    "Outcome",
+    "Risk, Odds, or Hazard Ratio",
+    "Effect Size (Cohen's d, approx.)",
+    "Lower CI",
+    "Upper CI",
+]
+optional_cols = ["p"]
+# Cohen's d of "Lower CI" and "Upper CI", added by add_effect_size_cis().
+effect_size_ci_cols = ["Lower CI (Cohen's d)", "Upper CI (Cohen's d)"]
+
+# Excel uploads are treated as TriNetX exports only when "Generated by TriNetX"
+# appears in these opening rows, next to the title.
+TRINETX_BANNER_ROWS = 8
+
+
+# =========================
+# Core utilities
+# =========================
+def clean_cell(value):
+    if value is None:
+        return ""
+    text = str(value).replace("\ufeff", "").strip()
+    text = text.strip('"').strip()
+    return text
+
+
+def normalize_text(value):
+    return tokenize_cell(value).key
+
+
+def parse_float(value):
+    return tokenize_cell(value).estimate
+
+
+def parse_p_value(value):
+    """Parse p-values written as .021, 0.021, <.001, p=.03, p < 0.001, or 2.1E-02."""
+    return tokenize_cell(value).p
+
+
+def extract_all_numbers(value):
+    """Return every numeric token in a cell, including values embedded in CI strings."""
+    return list(tokenize_cell(value).numbers)
+
+
+def parse_ci_bounds(value):
+    """Return lower/upper CI bounds from cells like '0.56–0.96', '(0.56, 0.96)', or '95% CI: 0.56 - 0.96'."""
+    cell = tokenize_cell(value)
+    return cell.lower, cell.upper
+
+
+# =========================
+# TriNetX parsing helpers
+# =========================
+# A "p" or "p-value" label somewhere in a row below the estimate.
+NEARBY_P_PATTERN = re.compile(r"\bp\s*[-_ ]*(value)?\b", re.IGNORECASE)
+
+
+def extract_section_triplet(index, section_name):
+    """
+    Extract point estimate, confidence interval, and p value from a TriNetX
+    effect-estimate section. This version is deliberately tolerant of the
+    two formats TriNetX commonly exports:
+
+    1) a header row followed by a data row:
+       Risk Ratio | 95% CI | z | p
+       0.76       | 0.60–0.95 | -2.39 | .017
+
+    2) CSVs in which the CI cell was split at the comma:
+       Risk Ratio | 95% CI | z | p
+       0.76       | 0.60   | 0.95 | -2.39 | .017
+
+    It also captures a labeled p-value from nearby rows when the value is not
+    aligned under the p header.
+    """
+
+    section_norm = normalize_text(section_name)
+
+    def header_role(header):
+        h = normalize_text(header)
+        if h in {"p", "pvalue", "pval", "probability", "prob"} or "pvalue" in h or h == "pvalue2sided":
+            return "p"
+        if "zstat" in h or h in {"z", "zscore", "zstatistic"}:
+            return "z"
+        if ("lower" in h or "low" in h or "lcl" in h) and ("ci" in h or "confidence" in h or "95" in h or "limit" in h):
+            return "lower"
+        if ("upper" in h or "up" in h or "ucl" in h) and ("ci" in h or "confidence" in h or "95" in h or "limit" in h):
+            return "upper"
+        if ("95" in h or "ci" in h or "confidenceinterval" in h or "confidence" in h) and "lower" not in h and "upper" not in h:
+            return "ci"
+        if h in {section_norm, "value", "estimate", "pointestimate", "ratio", "effectestimate", "measure"} or section_norm in h:
+            return "estimate"
+        return "other"
+
+    def row_has_header(row):
+        roles = [header_role(cell) for cell in row if clean_cell(cell)]
+        return any(role in roles for role in ["estimate", "ci", "lower", "upper", "p", "z"])
+
+    def row_has_numeric(row):
+        return any(tokenize_cell(cell).numbers for cell in row)
+
+    def parse_from_rows(headers, values, nearby_rows=None):
+        nearby_rows = nearby_rows or []
+        estimate = lower = upper = p_value = None
+        # Each cell is tokenized once; the heuristics below only read the tokens.
+        cells = [tokenize_cell(v) for v in values]
+        blank = tokenize_text("")
+
+        # Header-guided extraction.
+        for idx, h in enumerate(headers):
+            role = header_role(h)
+            cell = cells[idx] if idx < len(cells) else blank
+            if role == "estimate" and estimate is None:
+                estimate = cell.estimate
+            elif role == "lower" and lower is None:
+                lower = cell.estimate
+            elif role == "upper" and upper is None:
+                upper = cell.estimate
+            elif role == "ci" and (lower is None or upper is None):
+                if cell.lower is not None and cell.upper is not None:
+                    lower, upper = cell.lower, cell.upper
+                elif idx + 1 < len(cells):
+                    # Handles CSVs where a CI like "0.60,0.95" was split into
+                    # two cells under one CI header.
+                    l_tmp = cells[idx].estimate
+                    u_tmp = cells[idx + 1].estimate
+                    if l_tmp is not None and u_tmp is not None:
+                        lower, upper = l_tmp, u_tmp
+            elif role == "p" and p_value is None:
+                p_value = cell.p
+                if p_value is None and len(cells) > len(headers):
+                    # In malformed CSVs, the p value is often shifted right
+                    # because the CI cell split at its comma. The last cell is
+                    # usually the p value in TriNetX MOA rows.
+                    p_value = cells[-1].p
+
+        # Explicit p-value patterns anywhere in the row, e.g. "p=.021".
+        if p_value is None:
+            for idx, cell in enumerate(cells):
+                if cell.p_label:
+                    p_value = cell.p
+                    if p_value is not None:
+                        break
+                # Also handle two-cell "p", ".021" layouts.
+                if cell.key in {"p", "pvalue", "pval"} and idx + 1 < len(cells):
+                    p_value = cells[idx + 1].p
+                    if p_value is not None:
+                        break
+
+        # Parse CI from any cell that visibly contains a range.
+        if lower is None or upper is None:
+            for cell in cells:
+                if cell.lower is not None and cell.upper is not None and cell.has_range:
+                    lower, upper = cell.lower, cell.upper
+                    break
+
+        # Numeric fallback using every numeric token, including numbers inside a
+        # single CI cell. This is the critical p-value fix: in a row like
+        # 0.76 | 0.60 | 0.95 | -2.39 | .017, the final numeric token is the p.
+        all_numbers = [number for cell in cells for number in cell.numbers]
+
+        if estimate is None and all_numbers:
+            estimate = all_numbers[0]
+
+        if (lower is None or upper is None) and len(all_numbers) >= 3:
+            lower, upper = all_numbers[1], all_numbers[2]
+
+        if p_value is None and len(all_numbers) >= 4:
+            candidate = all_numbers[-1]
+            # Do not accept a z statistic or a ratio estimate as p. p-values
+            # must be in [0, 1]. This catches .021, 0.021, 2.1e-2, and 1.0.
+            if 0 <= candidate <= 1:
+                p_value = candidate
+
+        # Nearby-row fallback for exports that place "p-value" on a separate
+        # line after the effect-estimate row.
+        if p_value is None:
+            for near in nearby_rows:
+                near_cells = [tokenize_cell(x) for x in near]
+                near_text = " ".join(cell.text for cell in near_cells)
+                if NEARBY_P_PATTERN.search(near_text):
+                    for idx, cell in enumerate(near_cells):
+                        if cell.key in {"p", "pvalue", "pval"} and idx + 1 < len(near_cells):
+                            p_value = near_cells[idx + 1].p
+                            if p_value is not None:
+                                break
+                        if cell.p_label:
+                            p_value = cell.p
+                            if p_value is not None:
+                                break
+                    if p_value is not None:
+                        break
+
+        if estimate is not None and lower is not None and upper is not None:
+            return {
+                "estimate": estimate,
+                "lower": lower,
+                "upper": upper,
+                "p": p_value if p_value is not None else np.nan,
+            }
+        return None
+
+    # The section window runs until the next recognized section label. This is
+    # more robust than assuming a single header row and data row.
+    section_window = index.window(section_name, max_span=11)
+    if not section_window:
+        return None
+
+    # Locate a plausible header and the first numeric row after it.
+    header_idx = None
+    for local_idx, candidate in enumerate(section_window):
+        if row_has_header(candidate):
+            header_idx = local_idx
+            break
+
+    if header_idx is not None:
+        headers = [clean_cell(x) for x in section_window[header_idx]]
+        candidate_rows = section_window[header_idx + 1:] or section_window[header_idx:header_idx + 1]
+    else:
+        headers = []
+        candidate_rows = section_window
+
+    for local_idx, candidate in enumerate(candidate_rows):
+        if not row_has_numeric(candidate):
+            continue
+        values = [clean_cell(x) for x in candidate]
+        nearby = candidate_rows[local_idx + 1:local_idx + 4]
+        parsed = parse_from_rows(headers, values, nearby_rows=nearby)
+        if parsed is not None:
+            return parsed
+
+    # Last resort: flatten the entire section. This handles unusual exports
+    # where headers and values are not consistently row-delimited.
+    flattened_values = []
+    for section_row in section_window:
+        flattened_values.extend([clean_cell(x) for x in section_row if clean_cell(x)])
+    return parse_from_rows([], flattened_values, nearby_rows=[])
+
+
+def extract_section_value_map(index, section_name):
+    section_window = index.window(section_name)
+    if len(section_window) < 2:
+        return None
+    headers, values = section_window[0], section_window[1]
+    return {h: v for h, v in zip(headers, values) if h}
+
+
+def detect_trinetx_table_type(index):
+    title_clean = clean_cell(index.title)
+    if "Kaplan-Meier Table" in title_clean:
+        return "Kaplan-Meier"
+    if "Measures of Association Table" in title_clean:
+        return "Measures of Association"
+    if "Hazard Ratio" in index and "Log-Rank Test" in index:
+        return "Kaplan-Meier"
+    if "Risk Ratio" in index or "Odds Ratio" in index:
+        return "Measures of Association"
+    return "TriNetX"
+
+
+def clean_title(title):
+    title = clean_cell(title)
+    title = re.sub(r"\s*Measures of Association Table\s*$", "", title, flags=re.IGNORECASE)
+    title = re.sub(r"\s*Kaplan[- ]Meier Table\s*$", "", title, flags=re.IGNORECASE)
+    title = re.sub(r"\s+", " ", title).strip(" -_")
+    return title
+
+
+def clean_filename(name):
+    stem = Path(name).stem
+    stem = re.sub(r"(?i)_result_[a-z0-9]+_moa_table$", "", stem)
+    stem = re.sub(r"(?i)_result_[a-z0-9]+_km_table$", "", stem)
+    stem = re.sub(r"(?i)_moa_table$", "", stem)
+    stem = re.sub(r"(?i)_km_table$", "", stem)
+    stem = re.sub(r"(?i)_kaplan[-_ ]meier_table$", "", stem)
+    stem = re.sub(r"(?i)_table$", "", stem)
+    stem = stem.replace("_", " ").replace("-", " ")
+    stem = re.sub(r"\s+", " ", stem).strip()
+    return stem
+
+
+def looks_generic(label):
+    text = (label or "").strip().lower()
+    return bool(re.match(r"^outcome\s*\d+(\s+result.*)?$", text))
+
+
+def choose_outcome_label(title, filename):
+    cleaned_title = clean_title(title)
+    cleaned_filename = clean_filename(filename)
+    if cleaned_title and not looks_generic(cleaned_title):
+        return cleaned_title
+    if cleaned_filename:
+        return cleaned_filename
+    return cleaned_title or "Outcome"
+
+
+def parse_trinetx_csv_text(file_bytes):
+    text = file_bytes.decode("utf-8-sig", errors="ignore")
+    rows = read_text_rows(text)
+    return rows, text
+
+
+def parse_trinetx_excel_rows(raw_rows):
+    """
+    Cleaned rows of a TriNetX export's first worksheet, or None when the
+    opening rows carry no "Generated by TriNetX" line.
+
+    Only the opening rows are cleaned before deciding; the rest are cleaned
+    once the sheet is known to be an export.
+    """
+    head = [[clean_cell(cell) for cell in row] for row in raw_rows[:TRINETX_BANNER_ROWS]]
+    if not any(GENERATED_BY_LABEL in cell for row in head for cell in row):
+        return None
+    return head + [[clean_cell(cell) for cell in row] for row in raw_rows[TRINETX_BANNER_ROWS:]]
+
+
+def parse_trinetx_effect_rows(rows, filename):
+    index = build_section_index(rows)
+    title = index.title
+    table_type = detect_trinetx_table_type(index)
+
+    risk_difference = extract_section_triplet(index, "Risk Difference")
+    risk_ratio = extract_section_triplet(index, "Risk Ratio")
+    odds_ratio = extract_section_triplet(index, "Odds Ratio")
+    hazard_ratio = extract_section_triplet(index, "Hazard Ratio")
+
+    if not any([risk_ratio, odds_ratio, hazard_ratio]):
+        return None
+
+    log_rank = extract_section_value_map(index, "Log-Rank Test") if table_type == "Kaplan-Meier" else None
+    proportionality = extract_section_value_map(index, "Proportionality") if table_type == "Kaplan-Meier" else None
+
+    return {
+        "Outcome": choose_outcome_label(title, filename),
+        "Original Title": clean_title(title),
+        "Source File": filename,
+        "TriNetX Table Type": table_type,
+        "Risk Difference": risk_difference["estimate"] if risk_difference else np.nan,
+        "RD Lower CI": risk_difference["lower"] if risk_difference else np.nan,
+        "RD Upper CI": risk_difference["upper"] if risk_difference else np.nan,
+        "RD p": risk_difference.get("p", np.nan) if risk_difference else np.nan,
+        "Risk Ratio": risk_ratio["estimate"] if risk_ratio else np.nan,
+        "RR Lower CI": risk_ratio["lower"] if risk_ratio else np.nan,
+        "RR Upper CI": risk_ratio["upper"] if risk_ratio else np.nan,
+        "RR p": risk_ratio.get("p", np.nan) if risk_ratio else np.nan,
+        "Odds Ratio": odds_ratio["estimate"] if odds_ratio else np.nan,
+        "OR Lower CI": odds_ratio["lower"] if odds_ratio else np.nan,
+        "OR Upper CI": odds_ratio["upper"] if odds_ratio else np.nan,
+        "OR p": odds_ratio.get("p", np.nan) if odds_ratio else np.nan,
+        "Hazard Ratio": hazard_ratio["estimate"] if hazard_ratio else np.nan,
+        "HR Lower CI": hazard_ratio["lower"] if hazard_ratio else np.nan,
+        "HR Upper CI": hazard_ratio["upper"] if hazard_ratio else np.nan,
+        "HR p": hazard_ratio.get("p", np.nan) if hazard_ratio else np.nan,
+        "Log-Rank p": parse_float(log_rank.get("p")) if log_rank else np.nan,
+        "PH Assumption p": parse_float(proportionality.get("p")) if proportionality else np.nan,
+    }
+
+
+def effect_row_from_parsed_outcome(parsed):
+    """
+    The parse_trinetx_effect_rows() row of a record in the shared outcome
+    store, under the record's (possibly edited) outcome label.
+
+    The row is parsed from the export bytes the record keeps, the same way as
+    an upload on this page, so a stored file gives the same estimates, CIs,
+    and p values.
+    """
+    rows, _ = parse_trinetx_csv_text(parsed.file_bytes)
+    row = parse_trinetx_effect_rows(rows, parsed.source_file)
+    if row is not None:
+        row["Outcome"] = parsed.default_outcome
+    return row
+
+
+# =========================
+# Standard table handling
+# =========================
+def standardize_existing_forest_table(df):
+    working = df.copy()
+
+    # Preserve common p-value column names if users upload a preformatted table.
+    if "p" not in working.columns:
+        p_aliases = {"p", "p value", "p-value", "p_value", "pvalue", "P", "P value", "P-value"}
+        for col in list(working.columns):
+            if str(col).strip() in p_aliases:
+                working = working.rename(columns={col: "p"})
+                break
+
+    for col in required_cols + optional_cols:
+        if col not in working.columns:
+            working[col] = np.nan
+
+    numeric_cols = [
+        "Risk, Odds, or Hazard Ratio",
+        "Lower CI",
+        "Upper CI",
+        "Effect Size (Cohen's d, approx.)",
+        "p",
+    ]
+    for col in numeric_cols:
+        working[col] = pd.to_numeric(working[col], errors="coerce")
+
+    if working["Effect Size (Cohen's d, approx.)"].isna().all():
+        working["Effect Size (Cohen's d, approx.)"] = ratio_to_cohens_d(working["Risk, Odds, or Hazard Ratio"])
+
+    return working[required_cols + optional_cols]
+
+
+# =========================
+# Upload detection
+# =========================
+def looks_like_trinetx_text(raw_text):
+    if not raw_text:
+        return False
+    return "Generated by TriNetX" in raw_text and any(
+        x in raw_text for x in ["Risk Ratio", "Odds Ratio", "Hazard Ratio", "Kaplan-Meier Table", "Measures of Association Table"]
+    )
+
+
+def parse_uploaded_file_bytes(file_bytes, filename):
+    """Return ("trinetx", effect row) or ("standard", standardized table) for one upload."""
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".csv":
+        rows, raw_text = parse_trinetx_csv_text(file_bytes)
+        if looks_like_trinetx_text(raw_text):
+            parsed = parse_trinetx_effect_rows(rows, filename)
+            if parsed is not None:
+                return "trinetx", parsed
+        standard_df = pd.read_csv(io.BytesIO(file_bytes))
+        return "standard", standardize_existing_forest_table(standard_df)
+
+    # The workbook is read once; both the export parser and the plain-table
+    # fallback work from these rows.
+    raw_rows = read_first_excel_sheet(file_bytes, clean=False)
+    try:
+        rows = parse_trinetx_excel_rows(raw_rows)
+        if rows is not None:
+            parsed = parse_trinetx_effect_rows(rows, filename)
+            if parsed is not None:
+                return "trinetx", parsed
+    except Exception:
+        pass
+    return "standard", standardize_existing_forest_table(excel_rows_frame(raw_rows))
+
+
+def excel_rows_frame(raw_rows):
+    """DataFrame of raw worksheet rows with the first row as header, as pd.read_excel builds it."""
+    data = []
+    for row in raw_rows:
+        cells = ["" if cell is None else int(cell) if isinstance(cell, float) and cell.is_integer() else cell for cell in row]
+        while cells and cells[-1] == "":
+            cells.pop()
+        data.append(cells)
+    while data and not data[-1]:
+        data.pop()
+    if not data:
+        return pd.DataFrame()
+    width = max(len(cells) for cells in data)
+    return TextParser([cells + [""] * (width - len(cells)) for cells in data], header=0).read()
+
+
+def detect_and_load_uploaded_files(uploaded_files):
+    parsed_trinetx_rows = []
+    parsed_standard_tables = []
+    parsing_notes = []
+
+    supported = [f for f in uploaded_files if Path(f.name).suffix.lower() in {".csv", ".xlsx", ".xls"}]
+    jobs = [ParseJob(f.getvalue(), (f.name,), (f.name,)) for f in supported]
+    results = iter(cached_parse_many(jobs, "forest-upload", parse_uploaded_file_bytes))
+
+    for uploaded_file in uploaded_files:
+        filename = uploaded_file.name
+        if Path(filename).suffix.lower() not in {".csv", ".xlsx", ".xls"}:
+            parsing_notes.append(f"Skipped unsupported file type: {filename}")
+            continue
+
+        parsed_result, error = next(results)
+        if error is not None:
+            parsing_notes.append(f"Could not parse {filename}: {error}")
+            continue
+
+        kind, parsed = parsed_result
+        if kind == "trinetx":
+            parsed_trinetx_rows.append(parsed)
+        else:
+            parsed_standard_tables.append(parsed)
+
+    return parsed_trinetx_rows, parsed_standard_tables, parsing_notes
+
+
+# =========================
+# Forest plot table assembly
+# =========================
+# Schema of the effect rows produced by parse_trinetx_effect_rows() and
+# effect_row_from_parsed_outcome().
+effect_row_text_cols = ["Outcome", "Original Title", "Source File", "TriNetX Table Type"]
+effect_row_value_cols = [
+    "Risk Difference", "RD Lower CI", "RD Upper CI", "RD p",
+    "Risk Ratio", "RR Lower CI", "RR Upper CI", "RR p",
+    "Odds Ratio", "OR Lower CI", "OR Upper CI", "OR p",
+    "Hazard Ratio", "HR Lower CI", "HR Upper CI", "HR p",
+    "Log-Rank p", "PH Assumption p",
+]
+
+# Plotted measure → (estimate, lower CI, upper CI, p, fallback p, fallback p label).
+# The fallback p is used when the measure's own p value is missing.
+effect_measures = {
+    "Risk Ratio": ("Risk Ratio", "RR Lower CI", "RR Upper CI", "RR p", "RD p", "Risk Difference p fallback"),
+    "Odds Ratio": ("Odds Ratio", "OR Lower CI", "OR Upper CI", "OR p", "RD p", "Risk Difference p fallback"),
+    "Hazard Ratio": ("Hazard Ratio", "HR Lower CI", "HR Upper CI", "HR p", "Log-Rank p", "Log-Rank p"),
+}
+
+
+class EffectTable:
+    """
+    Parsed TriNetX effect rows, stored column-wise under the effect row schema.
+
+    Parsers append one row dict per export; frame() returns the whole table
+    with float columns for every estimate, CI bound, and p value.
+    """
+
+    def __init__(self, rows=()):
+        self.columns = {col: [] for col in effect_row_text_cols + effect_row_value_cols}
+        self.extend(rows)
+
+    def __len__(self):
+        return len(self.columns["Outcome"])
+
+    def append(self, row):
+        for col in effect_row_text_cols:
+            self.columns[col].append(row.get(col, ""))
+        for col in effect_row_value_cols:
+            self.columns[col].append(row.get(col, np.nan))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def frame(self):
+        data = {col: np.array(self.columns[col], dtype=object) for col in effect_row_text_cols}
+        for col in effect_row_value_cols:
+            data[col] = np.array(self.columns[col], dtype=float)
+        return pd.DataFrame(data)
+
+
+def choose_effects(effects, preferred_measure):
+    """
+    The plotted measure of every row: the preferred measure when it was
+    exported, otherwise the first of Risk Ratio, Odds Ratio, Hazard Ratio.
+
+    Returns Effect Type, estimate, lower, upper, p, and p Source columns.
+    """
+    measure_priority = [preferred_measure] + [m for m in effect_measures if m != preferred_measure]
+    size = len(effects)
+    conditions = []
+    choices = {key: [] for key in ["Effect Type", "estimate", "lower", "upper", "p", "p Source"]}
+    for measure in measure_priority:
+        if measure not in effect_measures:
+            continue
+        estimate, lower, upper, p_col, fallback_col, fallback_label = effect_measures[measure]
+        own_p = effects[p_col].to_numpy()
+        fallback_p = effects[fallback_col].to_numpy()
+        has_own_p = ~np.isnan(own_p)
+        conditions.append(effects[estimate].notna().to_numpy())
+        choices["Effect Type"].append(np.full(size, measure, dtype=object))
+        choices["estimate"].append(effects[estimate].to_numpy())
+        choices["lower"].append(effects[lower].to_numpy())
+        choices["upper"].append(effects[upper].to_numpy())
+        choices["p"].append(np.where(has_own_p, own_p, fallback_p))
+        choices["p Source"].append(
+            np.where(has_own_p, f"{measure} p", np.where(np.isnan(fallback_p), "", fallback_label)).astype(object)
+        )
+
+    defaults = {"Effect Type": None, "p Source": ""}
+    return pd.DataFrame(
+        {key: np.select(conditions, values, defaults.get(key, np.nan)) for key, values in choices.items()},
+        index=effects.index,
+    )
+
+
+def deduplicate_outcome_labels(df):
+    """Append the effect type (and table type) to outcome labels that occur more than once."""
+    df = df.copy()
+    if "Effect Type" not in df.columns:
+        return df
+    effect_type = df["Effect Type"]
+    table_type = df["TriNetX Table Type"] if "TriNetX Table Type" in df.columns else pd.Series(np.nan, index=df.index)
+    relabel = df["Outcome"].duplicated(keep=False) & effect_type.notna()
+    if not relabel.any():
+        return df
+
+    suffix = " — " + effect_type.astype(str)
+    suffix = suffix.where(table_type.isna(), suffix + " (" + table_type.astype(str) + ")")
+    outcomes = df["Outcome"].astype(object)
+    df["Outcome"] = outcomes.where(~relabel, outcomes.astype(str) + suffix)
+    return df
+
+
+def build_plot_table_from_trinetx(parsed_rows, preferred_measure):
+    effects = parsed_rows if isinstance(parsed_rows, EffectTable) else EffectTable(parsed_rows)
+    if not len(effects):
+        return pd.DataFrame()
+    effects = effects.frame()
+    chosen = choose_effects(effects, preferred_measure)
+
+    built = pd.DataFrame(
+        {
+            "Outcome": effects["Outcome"],
+            "Risk, Odds, or Hazard Ratio": chosen["estimate"].astype(float),
+            "Effect Size (Cohen's d, approx.)": ratio_to_cohens_d(chosen["estimate"]),
+            "Lower CI": chosen["lower"].astype(float),
+            "Upper CI": chosen["upper"].astype(float),
+            "p": chosen["p"].astype(float),
+            "p Source": chosen["p Source"],
+            "Effect Type": chosen["Effect Type"],
+            "RR p": effects["RR p"],
+            "OR p": effects["OR p"],
+            "RD p": effects["RD p"],
+            "HR p": effects["HR p"],
+            "TriNetX Table Type": effects["TriNetX Table Type"],
+            "Log-Rank p": effects["Log-Rank p"],
+            "PH Assumption p": effects["PH Assumption p"],
+            "Source File": effects["Source File"],
+        }
+    )
+    return deduplicate_outcome_labels(built)
+
+
+def compute_ratio_axis_limits(ci_vals, axis_padding, use_log=False):
+    numeric_vals = pd.to_numeric(ci_vals, errors="coerce")
+    numeric_vals = numeric_vals.replace([np.inf, -np.inf], np.nan).dropna()
+    numeric_vals = numeric_vals[numeric_vals > 0]
+
+    if numeric_vals.empty:
+        return 0.5, 1.5
+
+    raw_min = float(min(numeric_vals.min(), 1.0))
+    raw_max = float(max(numeric_vals.max(), 1.0))
+
+    if use_log:
+        lower_factor = 1.0 / raw_min if raw_min > 0 else raw_max
+        upper_factor = raw_max
+        factor = max(lower_factor, upper_factor, 1.25)
+        factor *= (1 + axis_padding / 100)
+        return max(1 / factor, 1e-6), factor
+
+    dist_left = max(1.0 - raw_min, 0.0)
+    dist_right = max(raw_max - 1.0, 0.0)
+    half_span = max(dist_left, dist_right)
+    if half_span == 0:
+        half_span = 0.25
+    padded_half_span = half_span * (1 + axis_padding / 100)
+    auto_min = max(0.0, 1.0 - padded_half_span)
+    auto_max = 1.0 + padded_half_span
+    if auto_min == auto_max:
+        auto_max = auto_min + 1.0
+    return auto_min, auto_max
+
+
+trinetx_detail_cols = [
+    "p Source",
+    "RR p",
+    "OR p",
+    "RD p",
+    "HR p",
+    "Effect Type",
+    "TriNetX Table Type",
+    "Log-Rank p",
+    "PH Assumption p",
+    "Source File",
+]
+
+
+def assemble_forest_table(parsed_trinetx_rows, parsed_standard_tables, preferred_measure):
+    """Stack parsed TriNetX rows and prepared tables into one editable forest table."""
+    table_cols = required_cols + optional_cols + trinetx_detail_cols
+    assembled_tables = []
+    if parsed_trinetx_rows:
+        trinetx_df = build_plot_table_from_trinetx(parsed_trinetx_rows, preferred_measure)
+        assembled_tables.append(trinetx_df[table_cols])
+    for table in parsed_standard_tables:
+        # Prepared tables have no TriNetX details; every missing column is NaN.
+        assembled_tables.append(table.drop(columns=trinetx_detail_cols, errors="ignore").reindex(columns=table_cols))
+
+    if not assembled_tables:
+        return None
+    return pd.concat(assembled_tables, ignore_index=True)
+
+
+def infer_ratio_axis_label(df, default_label="Risk Ratio"):
+    if "Effect Type" in df.columns:
+        effect_types = [str(x).strip() for x in df["Effect Type"].dropna().tolist() if str(x).strip()]
+        unique_effect_types = list(dict.fromkeys(effect_types))
+        if len(unique_effect_types) == 1:
+            return unique_effect_types[0]
+        if len(unique_effect_types) > 1:
+            return "Effect Estimate"
+    return default_label
+
+
+def add_effect_size_cis(df):
+    """
+    Copy of df with both CI bounds converted to Cohen's d.
+
+    The axis limits and the figure read these columns, so the conversion runs
+    once per dataset instead of once per use.
+    """
+    df = df.copy()
+    df[effect_size_ci_cols[0]] = ratio_to_cohens_d(numeric_column(df, "Lower CI"))
+    df[effect_size_ci_cols[1]] = ratio_to_cohens_d(numeric_column(df, "Upper CI"))
+    return df
+
+
+def effect_size_bounds(df):
+    """Lower and upper CI on the Cohen's d scale, from add_effect_size_cis() when it has run."""
+    if all(col in df.columns for col in effect_size_ci_cols):
+        return numeric_column(df, effect_size_ci_cols[0]), numeric_column(df, effect_size_ci_cols[1])
+    return ratio_to_cohens_d(numeric_column(df, "Lower CI")), ratio_to_cohens_d(numeric_column(df, "Upper CI"))
+
+
+def forest_axis_values(df, x_measure):
+    """Return the plotted column, every plotted value and CI bound, and the reference line."""
+    if x_measure == "Effect Size (Cohen's d, approx.)":
+        plot_column = "Effect Size (Cohen's d, approx.)"
+        ci_l, ci_u = effect_size_bounds(df)
+        ci_vals = pd.concat([ci_l.dropna(), ci_u.dropna(), df[plot_column].dropna()])
+        return plot_column, ci_vals, 0
+
+    plot_column = "Risk, Odds, or Hazard Ratio"
+    ci_l = pd.to_numeric(df["Lower CI"], errors="coerce")
+    ci_u = pd.to_numeric(df["Upper CI"], errors="coerce")
+    ci_vals = pd.concat([ci_l.dropna(), ci_u.dropna(), pd.to_numeric(df[plot_column], errors="coerce").dropna()])
+    return plot_column, ci_vals, 1
+
+
+def compute_axis_limits(ci_vals, x_measure, axis_padding, use_log=False):
+    if x_measure == "Risk, Odds, or Hazard Ratio":
+        return compute_ratio_axis_limits(ci_vals, axis_padding, use_log=use_log)
+    x_min, x_max = ci_vals.min(), ci_vals.max()
+    x_pad = (x_max - x_min) * (axis_padding / 100) if x_max != x_min else 0.1
+    return x_min - x_pad, x_max + x_pad
+
+
+# =========================
+# Forest plot / table hybrid helpers
+# =========================
+P_VALUE_COLUMNS = ["p", "P", "p-value", "P-value", "p value", "P value", "Log-Rank p"]
+
+
+def numeric_column(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+def row_p_values(df):
+    """First numeric p value of each row, taking the P_VALUE_COLUMNS in order."""
+    p_values = pd.Series(np.nan, index=df.index)
+    for col in reversed(P_VALUE_COLUMNS):
+        values = numeric_column(df, col)
+        p_values = values.where(values.notna(), p_values)
+    return p_values
+
+
+def format_numbers(values, decimals=2):
+    values = pd.to_numeric(pd.Series(values), errors="coerce")
+    present = values.notna()
+    return values[present].map(f"{{:.{decimals}f}}".format).reindex(values.index, fill_value="").astype(object)
+
+
+def format_cis(lower, upper, decimals=2):
+    lower_text = format_numbers(lower, decimals)
+    upper_text = format_numbers(upper, decimals)
+    both = (lower_text != "") & (upper_text != "")
+    return (lower_text + "–" + upper_text).where(both, "")
+
+
+def format_p_values(values):
+    values = pd.to_numeric(pd.Series(values), errors="coerce")
+    text = format_numbers(values, 3).str.replace("0.", ".", n=1, regex=False)
+    return text.mask(values < 0.001, "<.001")
+
+
+def infer_significance(lower, upper, p_values, ref_line):
+    """p < 0.05 where a p value is given, otherwise a CI that excludes ref_line."""
+    from_ci = lower.notna() & upper.notna() & ((upper < ref_line) | (lower > ref_line))
+    return (p_values < 0.05).where(p_values.notna(), from_ci).astype(bool)
+
+
+def ratio_column_header(axis_label):
+    label = str(axis_label).lower()
+    if "risk ratio" in label:
+        return "RR"
+    if "odds ratio" in label:
+        return "OR"
+    if "hazard ratio" in label:
+        return "HR"
+    if "effect estimate" in label:
+        return "Estimate"
+    return "Estimate"
+
+
+def row_effect_types(rows):
+    """Effect Type of every row, "" where the table has none."""
+    if "Effect Type" not in rows.columns:
+        return pd.Series("", index=rows.index, dtype=object)
+    return rows["Effect Type"].fillna("").astype(str)
+
+
+def pooling_group_keys(rows, outcomes, is_header, pool_by="outcome"):
+    """
+    Pooling group of every row, None for section headers.
+
+    "outcome" pools rows that share an outcome label, e.g. one outcome run in
+    several networks; "section" pools the rows under each "##" header. Either
+    way only rows of the same effect type are pooled together, so a section
+    that lists RRs next to HRs gets one pooled row per measure.
+    """
+    if pool_by == "section":
+        keys = is_header.cumsum().astype(str)
+    elif pool_by == "outcome":
+        keys = outcomes.astype(str)
+    else:
+        raise ValueError(f"Unknown pooling group: {pool_by!r}")
+    keys = keys + " | " + row_effect_types(rows)
+    return keys.where(~is_header, None)
+
+
+def mixed_effect_sections(rows, is_header):
+    """True for rows in a section whose data rows hold more than one effect type."""
+    section = is_header.cumsum()
+    data = ~is_header
+    type_counts = row_effect_types(rows)[data].groupby(section[data]).nunique()
+    return section.map(type_counts).fillna(0).to_numpy() > 1
+
+
+def pooled_display_rows(rows, outcomes, is_header, indented, x_measure, pool_method, pool_by="outcome"):
+    """
+    A display row for the pooled estimate of every group with at least two
+    usable ratios. "position" places each one just after its group's last row.
+    """
+    if pool_method not in POOLING_METHODS:
+        raise ValueError(f"Unknown pooling method: {pool_method!r}")
+    keys = pooling_group_keys(rows, outcomes, is_header, pool_by)
+    pooled = pool_log_ratios(
+        keys,
+        numeric_column(rows, "Risk, Odds, or Hazard Ratio"),
+        numeric_column(rows, "Lower CI"),
+        numeric_column(rows, "Upper CI"),
+    )
+    pooled = pooled[pooled["Method"] == POOLING_METHODS[pool_method]].reset_index(drop=True)
+    last_row = pd.Series(np.arange(len(rows)), index=keys.to_numpy()).groupby(level=0).max()
+    after = last_row.reindex(pooled["Group"]).to_numpy()
+
+    if pool_by == "outcome":
+        prefix = outcomes.iloc[after].reset_index(drop=True) + " — pooled"
+    else:
+        # Name the measure when the section has diamonds for more than one.
+        effect_types = row_effect_types(rows).iloc[after].reset_index(drop=True)
+        mixed = mixed_effect_sections(rows, is_header)[after]
+        prefix = ("Pooled " + effect_types).where(mixed, "Pooled")
+    # The label stays short so it fits the label column; the heterogeneity
+    # statistics go in their own table column.
+    labels = prefix + f" ({POOLING_METHOD_LABELS[pool_method]})"
+    labels = labels.where(~indented.iloc[after].to_numpy(), "   " + labels)
+    heterogeneity = "k=" + pooled["k"].astype(str) + ", I²=" + format_numbers(pooled["I² (%)"], 0) + "%"
+    if pool_method != "fixed":
+        heterogeneity = heterogeneity + ", τ²=" + format_numbers(pooled["τ²"], 3)
+
+    values = pooled[["Pooled Ratio", "Lower CI", "Upper CI", "PI Lower", "PI Upper"]].astype(float)
+    if x_measure == "Effect Size (Cohen's d, approx.)":
+        values = values.apply(ratio_to_cohens_d)
+    return pd.DataFrame(
+        {
+            "is_header": False,
+            "is_pooled": True,
+            "label": labels,
+            "effect": values["Pooled Ratio"],
+            "lower": values["Lower CI"],
+            "upper": values["Upper CI"],
+            "p": pooled["p"].astype(float),
+            "pi_lower": values["PI Lower"],
+            "pi_upper": values["PI Upper"],
+            "heterogeneity_text": heterogeneity,
+            "position": after + 0.5,
+        }
+    )
+
+
+def pooled_estimates(df, use_groups=True, pool_by="outcome"):
+    """
+    Pooled results of every method (see pool_log_ratios()) for each pooling
+    group, with groups named by outcome label or section header.
+    """
+    outcomes = df["Outcome"].map(clean_cell).astype(object) if "Outcome" in df.columns else pd.Series("", index=df.index, dtype=object)
+    keep = outcomes != ""
+    rows = df[keep]
+    outcomes = outcomes[keep]
+    is_header = outcomes.str.startswith("##") & use_groups
+    keys = pooling_group_keys(rows, outcomes, is_header, pool_by)
+    pooled = pool_log_ratios(
+        keys,
+        numeric_column(rows, "Risk, Odds, or Hazard Ratio"),
+        numeric_column(rows, "Lower CI"),
+        numeric_column(rows, "Upper CI"),
+    )
+    if pool_by == "section":
+        header_labels = np.array([""] + outcomes[is_header].str[2:].str.strip().tolist(), dtype=object)
+        headers = pd.Series(header_labels[is_header.cumsum().to_numpy()], index=outcomes.index)
+        typed = (headers + " — " + row_effect_types(rows)).str.removeprefix(" — ")
+        named = headers.where(~mixed_effect_sections(rows, is_header), typed)
+    else:
+        named = outcomes
+    names = pd.Series(named.to_numpy(), index=keys.to_numpy())
+    names = names[~names.index.duplicated()]
+    pooled["Group"] = pooled["Group"].map(names).fillna("").to_numpy()
+    return pooled
+
+
+def build_hybrid_display_table(df, x_measure, ref_line, use_groups=True, pool_method=None, pool_by="outcome"):
+    """
+    One row per plotted line, in plot order: "##" section headers and data
+    rows, with the plotted estimate, CI, p value, significance, and table text
+    computed for every row at once.
+
+    With a pool_method (a POOLING_METHODS key), each pooling group also gets
+    a pooled row, flagged is_pooled, with its prediction interval and its k,
+    I², and τ² in heterogeneity_text.
+    """
+    outcomes = df["Outcome"].map(clean_cell).astype(object) if "Outcome" in df.columns else pd.Series("", index=df.index, dtype=object)
+    keep = outcomes != ""
+    rows = df[keep]
+    outcomes = outcomes[keep]
+
+    is_header = outcomes.str.startswith("##") & use_groups
+    indented = (is_header.cumsum() > 0) & ~is_header
+    labels = outcomes.where(~is_header, outcomes.str[2:].str.strip())
+    labels = labels.where(~indented, "   " + labels)
+
+    if x_measure == "Effect Size (Cohen's d, approx.)":
+        effect = numeric_column(rows, "Effect Size (Cohen's d, approx.)")
+        lower, upper = effect_size_bounds(rows)
+    else:
+        effect = numeric_column(rows, "Risk, Odds, or Hazard Ratio")
+        lower = numeric_column(rows, "Lower CI")
+        upper = numeric_column(rows, "Upper CI")
+    effect, lower, upper = (values.astype(float).mask(is_header) for values in (effect, lower, upper))
+    p_values = row_p_values(rows).mask(is_header)
+
+    table = pd.DataFrame(
+        {
+            "is_header": is_header,
+            "is_pooled": False,
+            "label": labels,
+            "effect": effect,
+            "lower": lower,
+            "upper": upper,
+            "p": p_values,
+            "pi_lower": np.nan,
+            "pi_upper": np.nan,
+            "heterogeneity_text": "",
+        }
+    ).reset_index(drop=True)
+
+    if pool_method:
+        pooled = pooled_display_rows(rows, outcomes, is_header, indented, x_measure, pool_method, pool_by)
+        if not pooled.empty:
+            order = np.argsort(np.concatenate([np.arange(len(table)), pooled.pop("position")]), kind="stable")
+            table = pd.concat([table, pooled], ignore_index=True).iloc[order].reset_index(drop=True)
+
+    table["significant"] = infer_significance(table["lower"], table["upper"], table["p"], ref_line)
+    table["estimate_text"] = format_numbers(table["effect"], 2)
+    table["ci_text"] = format_cis(table["lower"], table["upper"], 2)
+    table["p_text"] = format_p_values(table["p"])
+    return table
+
+
+class TextColumn(Artist):
+    """
+    A column of table text drawn as one artist.
+
+    A single Text is moved to each row and drawn in turn, so a column of
+    hundreds of cells adds one artist to the axes rather than one per cell.
+    Empty strings are skipped.
+    """
+
+    def __init__(self, x, ys, texts, transform, **text_kwargs):
+        super().__init__()
+        self._text = Text(x, 0, "", transform=transform, **text_kwargs)
+        self.x = x
+        self.cells = [(y, text) for y, text in zip(ys, texts) if text]
+        self.set_transform(transform)
+        self.set_zorder(self._text.get_zorder())
+        self.set_clip_on(False)
+
+    def set_figure(self, fig):
+        super().set_figure(fig)
+        self._text.set_figure(fig)
+
+    def _iter_cells(self):
+        for y, text in self.cells:
+            self._text.set_position((self.x, y))
+            self._text.set_text(text)
+            yield self._text
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        for cell in self._iter_cells():
+            cell.draw(renderer)
+        self.stale = False
+
+    def get_window_extent(self, renderer=None):
+        boxes = [cell.get_window_extent(renderer) for cell in self._iter_cells()]
+        return Bbox.union(boxes) if boxes else Bbox.null()
+
+
+def _horizontal_segments(x_start, x_end, y):
+    return np.stack([np.column_stack([x_start, y]), np.column_stack([x_end, y])], axis=1).reshape(-1, 2, 2)
+
+
+# Open arrowheads marking a CI clipped at an axis limit, tip at the origin.
+# At markersize 8 the head is 4 pt long and 4 pt wide.
+LEFT_ARROW_MARKER = MarkerPath([(2, 1), (0, 0), (2, -1)], [MarkerPath.MOVETO, MarkerPath.LINETO, MarkerPath.LINETO])
+RIGHT_ARROW_MARKER = MarkerPath([(-2, 1), (0, 0), (-2, -1)], [MarkerPath.MOVETO, MarkerPath.LINETO, MarkerPath.LINETO])
+# Half the height of a pooled-estimate diamond, in rows.
+DIAMOND_HALF_HEIGHT = 0.3
+
+
+def create_forest_table_hybrid(
+    df,
+    plot_column,
+    x_measure,
+    x_axis_label,
+    ref_line,
+    x_min,
+    x_max,
+    use_groups=True,
+    use_log=False,
+    show_grid=False,
+    plot_title="",
+    font_size=12,
+    point_size=9,
+    line_width=1.8,
+    cap_height=0.15,
+    header_color="#203F99",
+    significant_color="#1F3D99",
+    nonsignificant_color="#666666",
+    pool_method=None,
+    pool_by="outcome",
+):
+    table = build_hybrid_display_table(df, x_measure, ref_line, use_groups=use_groups,
+                                       pool_method=pool_method, pool_by=pool_by)
+    if table.empty:
+        raise ValueError("No rows are available to plot.")
+    return draw_forest_table_hybrid(
+        table,
+        x_axis_label,
+        ref_line,
+        x_min,
+        x_max,
+        use_log=use_log,
+        show_grid=show_grid,
+        plot_title=plot_title,
+        font_size=font_size,
+        point_size=point_size,
+        line_width=line_width,
+        cap_height=cap_height,
+        header_color=header_color,
+        significant_color=significant_color,
+        nonsignificant_color=nonsignificant_color,
+    )
+
+
+def draw_forest_table_hybrid(
+    table,
+    x_axis_label,
+    ref_line,
+    x_min,
+    x_max,
+    use_log=False,
+    show_grid=False,
+    plot_title="",
+    font_size=12,
+    point_size=9,
+    line_width=1.8,
+    cap_height=0.15,
+    header_color="#203F99",
+    significant_color="#1F3D99",
+    nonsignificant_color="#666666",
+):
+    """Draw a display table from build_hybrid_display_table() as the hybrid figure."""
+    n_rows = len(table)
+    fig_height = max(3.2, 0.46 * n_rows + 1.25)
+    fig, ax = plt.subplots(figsize=(12, fig_height))
+    fig.subplots_adjust(left=0.30, right=0.76, top=0.90, bottom=0.18)
+
+    if use_log:
+        ax.set_xscale("log")
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(n_rows - 0.35, -0.90)
+    ax.set_yticks([])
+
+    for spine in ["left", "right", "top"]:
+        ax.spines[spine].set_visible(False)
+    ax.spines["bottom"].set_color("#444444")
+    ax.tick_params(axis="x", labelsize=max(font_size - 2, 8), colors="#444444")
+
+    if show_grid:
+        ax.grid(True, axis="x", linestyle=":", linewidth=0.6, alpha=0.7)
+    else:
+        ax.grid(False)
+
+    ax.axvline(ref_line, color="#333333", linewidth=1.15, zorder=1)
+
+    # Mixed transform: x as an axes fraction, y as data coordinate.
+    text_transform = blended_transform_factory(ax.transAxes, ax.transData)
+    left_x = -0.64
+    right_est_x = 1.08
+    right_ci_x = 1.28
+    right_p_x = 1.53
+    right_heterogeneity_x = 1.66
+    header_y = -0.62
+    ratio_header = ratio_column_header(x_axis_label)
+
+    ax.text(right_est_x, header_y, ratio_header, transform=text_transform, ha="center", va="center",
+            fontsize=font_size, weight="bold", clip_on=False)
+    ax.text(right_ci_x, header_y, "95% CI", transform=text_transform, ha="center", va="center",
+            fontsize=font_size, weight="bold", clip_on=False)
+    ax.text(right_p_x, header_y, r"$p$", transform=text_transform, ha="center", va="center",
+            fontsize=font_size, weight="bold", clip_on=False)
+
+    ys = np.arange(n_rows, dtype=float)
+    headers = table["is_header"].to_numpy()
+    pooled = table["is_pooled"].to_numpy(dtype=bool) if "is_pooled" in table.columns else np.zeros(n_rows, dtype=bool)
+    data = ~headers & ~pooled
+
+    # Section bars across the left labels, forest plot, and right table. These
+    # stay patches: a collection's extent is not counted by bbox_inches="tight".
+    show_heterogeneity = pooled.any() and "heterogeneity_text" in table.columns
+    bar_width = 2.70 if show_heterogeneity else 2.25
+    for y in ys[headers]:
+        ax.add_patch(Rectangle((left_x - 0.02, y - 0.38), bar_width, 0.76, transform=text_transform,
+                               facecolor=header_color, edgecolor=header_color, clip_on=False, zorder=0))
+
+    labels = table["label"].to_numpy()
+    ax.add_artist(TextColumn(left_x, ys[headers], labels[headers], text_transform, ha="left", va="center",
+                             color="white", fontsize=font_size, weight="bold", clip_on=False, zorder=2))
+    ax.add_artist(TextColumn(left_x, ys[data], labels[data], text_transform, ha="left", va="center",
+                             fontsize=font_size, color="#222222", clip_on=False))
+    ax.add_artist(TextColumn(left_x, ys[pooled], labels[pooled], text_transform, ha="left", va="center",
+                             fontsize=font_size, color="#222222", style="italic", clip_on=False))
+
+    ci_line_color = "#222222"
+    effect = table["effect"].to_numpy()
+    lower = table["lower"].to_numpy()
+    upper = table["upper"].to_numpy()
+
+    has_ci = ~np.isnan(lower) & ~np.isnan(upper) & ~pooled
+    y_ci, lower_ci, upper_ci = ys[has_ci], lower[has_ci], upper[has_ci]
+    left_cap = lower_ci >= x_min
+    right_cap = upper_ci <= x_max
+
+    # CI lines, plus a short arrow shaft inside the axis where a CI runs past it.
+    arrow_length = 0.06 * (x_max - x_min)
+    n_left, n_right = (~left_cap).sum(), (~right_cap).sum()
+    ci_segments = np.concatenate(
+        [
+            _horizontal_segments(np.maximum(lower_ci, x_min), np.minimum(upper_ci, x_max), y_ci),
+            _horizontal_segments(np.full(n_left, x_min), np.full(n_left, x_min + arrow_length), y_ci[~left_cap]),
+            _horizontal_segments(np.full(n_right, x_max - arrow_length), np.full(n_right, x_max), y_ci[~right_cap]),
+        ]
+    )
+    ax.add_collection(LineCollection(ci_segments, colors=ci_line_color, linewidths=line_width, zorder=2),
+                      autolim=False)
+
+    cap_x = np.concatenate([lower_ci[left_cap], upper_ci[right_cap]])
+    cap_y = np.concatenate([y_ci[left_cap], y_ci[right_cap]])
+    cap_segments = np.stack(
+        [np.column_stack([cap_x, cap_y - cap_height]), np.column_stack([cap_x, cap_y + cap_height])],
+        axis=1,
+    )
+    ax.add_collection(LineCollection(cap_segments, colors=ci_line_color, linewidths=line_width, zorder=2),
+                      autolim=False)
+
+    for count, x_edge, rows, marker in [
+        (n_left, x_min, ~left_cap, LEFT_ARROW_MARKER),
+        (n_right, x_max, ~right_cap, RIGHT_ARROW_MARKER),
+    ]:
+        if count:
+            ax.plot(np.full(count, x_edge), y_ci[rows], linestyle="none",
+                    marker=MarkerStyle(marker, joinstyle="round", capstyle="round"), markersize=8,
+                    markerfacecolor="none", markeredgecolor=ci_line_color, markeredgewidth=line_width,
+                    clip_on=False, zorder=2)
+
+    significant = table["significant"].to_numpy()
+    shown = ~np.isnan(effect) & (effect >= x_min) & (effect <= x_max) & ~pooled
+    if shown.any():
+        colors = np.where(significant[shown], significant_color, nonsignificant_color)
+        ax.scatter(effect[shown], ys[shown], s=point_size ** 2, marker="s", c=colors, edgecolors=colors,
+                   linewidths=1.0, zorder=3)
+
+    # Pooled estimates: a diamond spanning the CI, over a thin prediction interval line.
+    diamond = pooled & ~np.isnan(effect) & ~np.isnan(lower) & ~np.isnan(upper)
+    if diamond.any():
+        pi_lower = table["pi_lower"].to_numpy(dtype=float)
+        pi_upper = table["pi_upper"].to_numpy(dtype=float)
+        has_pi = diamond & ~np.isnan(pi_lower) & ~np.isnan(pi_upper)
+        pi_segments = _horizontal_segments(np.clip(pi_lower[has_pi], x_min, x_max),
+                                           np.clip(pi_upper[has_pi], x_min, x_max), ys[has_pi])
+        ax.add_collection(LineCollection(pi_segments, colors=ci_line_color, linewidths=max(line_width / 2, 0.6),
+                                         zorder=2), autolim=False)
+
+        d_effect, d_y = np.clip(effect[diamond], x_min, x_max), ys[diamond]
+        d_lower, d_upper = np.clip(lower[diamond], x_min, x_max), np.clip(upper[diamond], x_min, x_max)
+        vertices = np.stack(
+            [
+                np.column_stack([d_lower, d_y]),
+                np.column_stack([d_effect, d_y - DIAMOND_HALF_HEIGHT]),
+                np.column_stack([d_upper, d_y]),
+                np.column_stack([d_effect, d_y + DIAMOND_HALF_HEIGHT]),
+            ],
+            axis=1,
+        )
+        colors = np.where(significant[diamond], significant_color, nonsignificant_color)
+        ax.add_collection(PolyCollection(vertices, facecolors=colors, edgecolors=colors, linewidths=1.0, zorder=3),
+                          autolim=False)
+
+    cell_style = dict(ha="center", va="center", fontsize=font_size, color="#222222", clip_on=False)
+    for x, column in [(right_est_x, "estimate_text"), (right_ci_x, "ci_text"), (right_p_x, "p_text")]:
+        ax.add_artist(TextColumn(x, ys, table[column].to_numpy(), text_transform, **cell_style))
+    if show_heterogeneity:
+        ax.text(right_heterogeneity_x, header_y, "Heterogeneity", transform=text_transform, ha="left", va="center",
+                fontsize=font_size, weight="bold", clip_on=False)
+        ax.add_artist(TextColumn(right_heterogeneity_x, ys[pooled], table["heterogeneity_text"].to_numpy()[pooled],
+                                 text_transform, **dict(cell_style, ha="left")))
+
+    ax.set_xlabel(x_axis_label, fontsize=font_size, weight="bold", labelpad=8)
+    if plot_title:
+        ax.set_title(plot_title, fontsize=font_size + 2, weight="bold", pad=12)
+
+    legend_handles = [
+        Line2D([0], [0], marker="s", color="none", markerfacecolor=significant_color,
+               markeredgecolor=significant_color, markersize=8, label="Significant (p < 0.05)"),
+        Line2D([0], [0], marker="s", color="none", markerfacecolor=nonsignificant_color,
+               markeredgecolor=nonsignificant_color, markersize=8, label="Non-significant"),
+    ]
+    if pooled.any():
+        legend_handles.append(Line2D([0], [0], marker="D", color="none", markerfacecolor=ci_line_color,
+                                     markeredgecolor=ci_line_color, markersize=8, label="Pooled estimate"))
+        legend_handles.append(Line2D([0], [0], color=ci_line_color, linewidth=max(line_width / 2, 0.6),
+                                     label="Prediction interval"))
+    ax.legend(handles=legend_handles, loc="lower left", bbox_to_anchor=(-0.02, -0.36),
+              frameon=False, ncol=len(legend_handles), fontsize=max(font_size - 2, 8), handlelength=1.0,
+              columnspacing=2.5, handletextpad=0.4)
+
+    return fig
+
+
+# =========================
+# Paginated export
+# =========================
+FOREST_ROWS_PER_PAGE = 40
+
+# create_forest_table_hybrid() arguments that select and compute the display rows;
+# the rest style the drawing.
+_TABLE_ARGS = ("x_measure", "use_groups", "pool_method", "pool_by")
+
+
+def paginate_display_table(table, rows_per_page=FOREST_ROWS_PER_PAGE):
+    """
+    Split a display table into pages of at most rows_per_page rows.
+
+    A section header never ends a page, and a page that starts inside a
+    section repeats its header, marked "(continued)", so every data row sits
+    under its section.
+    """
+    rows_per_page = max(int(rows_per_page), 2)
+    is_header = table["is_header"].to_numpy()
+    section_start = pd.Series(np.where(is_header, np.arange(len(table)), np.nan)).ffill().to_numpy()
+
+    pages = []
+    start = 0
+    while start < len(table):
+        page = []
+        if not is_header[start] and not np.isnan(section_start[start]):
+            continued = table.iloc[[int(section_start[start])]].copy()
+            continued["label"] = continued["label"] + " (continued)"
+            page.append(continued)
+        end = min(start + rows_per_page - len(page), len(table))
+        while end < len(table) and end - 1 > start and is_header[end - 1]:
+            end -= 1
+        page.append(table.iloc[start:end])
+        pages.append(pd.concat(page, ignore_index=True))
+        start = end
+    return pages
+
+
+def forest_page_tables(df, x_measure, ref_line, use_groups=True, rows_per_page=FOREST_ROWS_PER_PAGE,
+                       pool_method=None, pool_by="outcome"):
+    table = build_hybrid_display_table(df, x_measure, ref_line, use_groups=use_groups,
+                                       pool_method=pool_method, pool_by=pool_by)
+    if table.empty:
+        raise ValueError("No rows are available to plot.")
+    return paginate_display_table(table, rows_per_page)
+
+
+def _page_draw_args(figure_kwargs, page_number, page_count):
+    draw_args = {key: value for key, value in figure_kwargs.items() if key not in _TABLE_ARGS + ("plot_column",)}
+    title = draw_args.get("plot_title", "")
+    if title and page_count > 1:
+        draw_args["plot_title"] = f"{title} ({page_number} of {page_count})"
+    return draw_args
+
+
+def _render_forest_page(table, draw_args, fmt, dpi):
+    fig = draw_forest_table_hybrid(table, **draw_args)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def render_forest_pages(df, rows_per_page=FOREST_ROWS_PER_PAGE, fmt="png", dpi=300, max_workers=None, **figure_kwargs):
+    """
+    Each page of the forest plot as image bytes, in page order.
+
+    figure_kwargs are create_forest_table_hybrid() arguments; every page uses
+    the same axis limits and styling. Pages render in the shared worker
+    process pool when there is more than one page and more than one core.
+    """
+    pages = forest_page_tables(
+        df,
+        figure_kwargs["x_measure"],
+        figure_kwargs["ref_line"],
+        use_groups=figure_kwargs.get("use_groups", True),
+        rows_per_page=rows_per_page,
+        pool_method=figure_kwargs.get("pool_method"),
+        pool_by=figure_kwargs.get("pool_by", "outcome"),
+    )
+    draw_args = [_page_draw_args(figure_kwargs, i + 1, len(pages)) for i in range(len(pages))]
+    jobs = (pages, draw_args, repeat(fmt), repeat(dpi))
+
+    max_workers = min(max_workers or default_max_workers(), len(pages))
+    if max_workers > 1:
+        try:
+            return list(get_process_pool(max_workers).map(_render_forest_page, *jobs))
+        except (BrokenProcessPool, OSError, pickle.PicklingError):
+            discard_process_pool()
+    return list(map(_render_forest_page, *jobs))
+
+
+def forest_pages_zip(df, rows_per_page=FOREST_ROWS_PER_PAGE, fmt="png", dpi=300, max_workers=None,
+                     file_stem="forest_plot", **figure_kwargs):
+    """A ZIP archive with one image per page, rendered in parallel."""
+    images = render_forest_pages(df, rows_per_page, fmt, dpi, max_workers, **figure_kwargs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for number, image in enumerate(images, start=1):
+            archive.writestr(f"{file_stem}_page{number:02d}.{fmt}", image)
+    return buffer.getvalue()
+
+
+def forest_pages_pdf(df, rows_per_page=FOREST_ROWS_PER_PAGE, **figure_kwargs):
+    """
+    One multi-page PDF with a page per display-table page.
+
+    Pages are drawn in this process: joining separately rendered PDFs would
+    need a PDF library, and vector pages of this size draw quickly.
+    """
+    pages = forest_page_tables(
+        df,
+        figure_kwargs["x_measure"],
+        figure_kwargs["ref_line"],
+        use_groups=figure_kwargs.get("use_groups", True),
+        rows_per_page=rows_per_page,
+        pool_method=figure_kwargs.get("pool_method"),
+        pool_by=figure_kwargs.get("pool_by", "outcome"),
+    )
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        for number, table in enumerate(pages, start=1):
+            fig = draw_forest_table_hybrid(table, **_page_draw_args(figure_kwargs, number, len(pages)))
+            pdf.savefig(fig, bbox_inches="tight")
+            plt.close(fig)
+    return buffer.getvalue()
@@ -0,0 +1,200 @@
+"""
+Jinja2 rendering for the HTML tables on the Effect Size, PSM Table, and
+Outcomes Table pages.
+
+Templates are compiled once per process. Cell text is escaped before
+rendering with one rule for every table (escape_cell): missing values are
+blank, text is stripped, then HTML-escaped. The Effect Size and PSM tables
+apply it a column at a time (escape_cells); the Outcomes table formats each
+outcome's cells separately and escapes them one at a time with escape_cell,
+joining its two-cohort cells with <br>. Templates only lay out markup and do
+no escaping of their own.
+Output depends only on the inputs, so equal inputs render byte-identical HTML.
+"""
+
+import html
+from functools import lru_cache
+from typing import Any, List, Sequence, Tuple
+
+import jinja2
+import pandas as pd
+
+
+EFFECT_SIZE_TEMPLATE = (
+    """
+<style>
+.ama-table { border-collapse:collapse; font-family:Arial,sans-serif; font-size:14px; }
+.ama-table th, .ama-table td { border:1px solid #222; padding:6px 12px; }
+.ama-table th { background:#f8f8f8; font-weight:bold; text-align:center; }
+.ama-table td { text-align:right; }
+.ama-table td.left { text-align:left; }
+</style>
+"""
+    '<table class="ama-table">'
+    "<tr>{% for header in headers %}<th>{{ header }}</th>{% endfor %}</tr>"
+    "{% for cells in rows %}<tr>"
+    "<td class='left'>{{ cells[0] }}</td>{% for cell in cells[1:] %}<td>{{ cell }}</td>{% endfor %}"
+    "</tr>{% endfor %}"
+    "</table>"
+)
+
+TABLE1_TEMPLATE = (
+    """
+<style>
+.table1-wrap {
+    width: {{ table_width_percent }}%;
+    overflow-x: auto;
+}
+.table1 {
+    border-collapse: collapse;
+    width: 100%;
+    font-family: Arial, Helvetica, sans-serif;
+    font-size: {{ font_size }}pt;
+    line-height: 1.18;
+}
+.table1 caption {
+    caption-side: top;
+    text-align: left;
+    font-weight: bold;
+    margin-bottom: 8px;
+}
+.table1 th, .table1 td {
+    border: 1px solid #222;
+    padding: 5px 7px;
+    vertical-align: middle;
+}
+.table1 th {
+    background: #f2f2f2;
+    font-weight: bold;
+    text-align: center;
+}
+.table1 td:first-child {
+    text-align: left;
+    min-width: 220px;
+}
+.table1 td:nth-child(2) {
+    text-align: center;
+    min-width: 82px;
+}
+.table1 td:not(:first-child):not(:nth-child(2)) {
+    text-align: center;
+    white-space: nowrap;
+}
+.table1 .group-row td {
+    background: #e8e8e8;
+    font-weight: bold;
+}
+.table1 .group-row td:first-child {
+    text-align: left;
+}
+</style>
+"""
+    '<div class="table1-wrap"><table class="table1">'
+    "{% if title %}<caption>{{ title }}</caption>{% endif %}"
+    "<thead><tr><th rowspan='2'></th><th rowspan='2'></th>"
+    "<th colspan='{{ before_span }}'>Before Propensity Score Matching</th>"
+    "<th colspan='{{ after_span }}'>After Propensity Score Matching</th></tr>"
+    "<tr>{% for header in headers %}<th>{{ header }}</th>{% endfor %}</tr></thead><tbody>"
+    "{% for group, cells in rows %}{% if group %}<tr class='group-row'>{% else %}<tr>{% endif %}"
+    "{% for cell in cells %}<td>{{ cell }}</td>{% endfor %}</tr>{% endfor %}"
+    "</tbody></table></div>"
+)
+
+OUTCOMES_TEMPLATE = (
+    """
+<style>
+.table-title {
+    font-family: {{ font_family }};
+    font-size: {{ font_size_pt + 1 }}pt;
+    font-weight: bold;
+    margin: 0 0 8px 0;
+}
+table.outcomes-table {
+    border-collapse: collapse;
+    width: {{ table_width_percent }}%;
+    font-family: {{ font_family }};
+    font-size: {{ font_size_pt }}pt;
+    line-height: 1.2;
+}
+table.outcomes-table th,
+table.outcomes-table td {
+    border: {{ border }};
+    padding: {{ padding }};
+    vertical-align: top;
+}
+table.outcomes-table th {
+    font-weight: bold;
+    text-align: center;
+}
+table.outcomes-table td {
+    text-align: center;
+}
+table.outcomes-table td.outcome-cell {
+    text-align: left;
+    width: 27%;
+}
+table.outcomes-table tr.section-row td {
+    background: {{ section_bg }};
+    font-weight: bold;
+    text-align: left;
+}
+</style>
+"""
+    "{% if title %}<div class='table-title'>{{ title }}</div>{% endif %}"
+    "<table class='outcomes-table'><thead><tr>{% for header in headers %}<th>{{ header }}</th>{% endfor %}</tr></thead><tbody>"
+    "{% for section, cells in rows %}"
+    "{% if section %}<tr class='section-row'><td colspan='{{ headers|length }}'>{{ cells[0] }}</td></tr>"
+    "{% else %}<tr>{% for cell in cells %}"
+    "<td{% if loop.index0 == outcome_column %} class='outcome-cell'{% endif %}>{{ cell }}</td>"
+    "{% endfor %}</tr>{% endif %}"
+    "{% endfor %}"
+    "</tbody></table>"
+)
+
+TEMPLATES = {
+    "effect_size.html": EFFECT_SIZE_TEMPLATE,
+    "table1.html": TABLE1_TEMPLATE,
+    "outcomes.html": OUTCOMES_TEMPLATE,
+}
+
+
+@lru_cache(maxsize=None)
+def get_environment() -> jinja2.Environment:
+    # Cells arrive escaped by escape_cell(); autoescaping would escape them twice.
+    return jinja2.Environment(
+        loader=jinja2.DictLoader(TEMPLATES),
+        autoescape=False,
+        undefined=jinja2.StrictUndefined,
+        cache_size=-1,
+    )
+
+
+def render_template(name: str, **context: Any) -> str:
+    return get_environment().get_template(name).render(**context)
+
+
+# =========================
+# Cell preformatting
+# =========================
+def escape_cell(value: Any) -> str:
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return ""
+    return html.escape(str(value).strip())
+
+
+def escape_cells(values: pd.Series) -> pd.Series:
+    """escape_cell() of every value, a column at a time."""
+    text = values.astype(object).map(str).str.strip().where(values.notna(), "")
+    return text.map(html.escape)
+
+
+def escape_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Escaped cells of df[column]; blank when the column is missing."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return escape_cells(df[column])
+
+
+def table_rows(columns: Sequence[pd.Series]) -> List[Tuple[str, ...]]:
+    """Per-row cell tuples from per-column cell Series."""
+    return list(zip(*(column.tolist() for column in columns)))
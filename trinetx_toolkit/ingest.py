@@ -0,0 +1,147 @@
+"""
+Parallel, cache-aware parsing of multi-file uploads.
+
+cached_parse_many() serves parse-cache hits in the calling thread and fans the
+remaining files out to a worker pool once there are enough of them to repay
+the pool start-up. Module-level parsers run in a process pool so large uploads
+scale with cores; parsers that cannot be pickled (page-local functions,
+lambdas) fall back to a thread pool. The process pool is created once and
+reused across reruns, so worker start-up is paid once per server process.
+Results come back in upload order with one error per failed file, so the
+pages keep their existing parsing notes.
+"""
+
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from trinetx_toolkit.cache import MISS, get_parse_cache
+
+# Below this many uncached files, dispatch overhead costs more than it saves.
+PARALLEL_MIN_FILES = 16
+
+ParseResult = Tuple[Any, Optional[Exception]]
+
+
+@dataclass
+class ParseJob:
+    """One file to parse as parse(file_bytes, *args), cached under key_parts."""
+
+    file_bytes: bytes
+    args: Tuple[Any, ...] = ()
+    key_parts: Tuple[Hashable, ...] = ()
+
+
+def default_max_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return the shared worker pool, creating or resizing it as needed."""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != max_workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            # spawn rather than fork: the Streamlit server is multi-threaded.
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _process_pool_workers = max_workers
+        return _process_pool
+
+
+def discard_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+
+def _is_picklable(obj: Any) -> bool:
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+
+def _run_job(parse: Callable[..., Any], file_bytes: bytes, args: Tuple[Any, ...]) -> ParseResult:
+    try:
+        return parse(file_bytes, *args), None
+    except Exception as exc:
+        # Exceptions travel back from worker processes, so keep only ones that pickle.
+        return None, exc if _is_picklable(exc) else ValueError(str(exc))
+
+
+def _run_serial(parse: Callable[..., Any], jobs: List[ParseJob]) -> List[ParseResult]:
+    return [_run_job(parse, job.file_bytes, job.args) for job in jobs]
+
+
+def parse_jobs(parse: Callable[..., Any], jobs: List[ParseJob], max_workers: Optional[int] = None) -> List[ParseResult]:
+    """Parse jobs in order, in parallel when there are enough of them."""
+    max_workers = max_workers or default_max_workers()
+    if len(jobs) < PARALLEL_MIN_FILES or max_workers <= 1:
+        return _run_serial(parse, jobs)
+
+    workers = min(max_workers, len(jobs))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    args = (repeat(parse), [job.file_bytes for job in jobs], [job.args for job in jobs])
+
+    if not _is_picklable(parse):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_run_job, *args))
+
+    try:
+        return list(get_process_pool(max_workers).map(_run_job, *args, chunksize=chunksize))
+    except (BrokenProcessPool, OSError, pickle.PicklingError):
+        # Hosts that forbid worker processes still get a correct, serial parse.
+        discard_process_pool()
+        return _run_serial(parse, jobs)
+
+
+def cached_parse_many(
+    jobs: List[ParseJob],
+    namespace: str,
+    parse: Callable[..., Any],
+    max_workers: Optional[int] = None,
+) -> List[ParseResult]:
+    """
+    Parse many files through the shared parse cache.
+
+    Returns one (result, error) pair per job in the order given; error is None
+    on success. Failures are cached like cached_parse() failures.
+    """
+    cache = get_parse_cache()
+    results: List[ParseResult] = [(None, None)] * len(jobs)
+    pending = []
+    for pos, job in enumerate(jobs):
+        key = cache.make_key(job.file_bytes, namespace, *job.key_parts)
+        try:
+            cached = cache.lookup(key)
+        except Exception as exc:
+            results[pos] = (None, exc)
+            continue
+        if cached is MISS:
+            pending.append((pos, key, job))
+        else:
+            results[pos] = (cached, None)
+
+    parsed = parse_jobs(parse, [job for _, _, job in pending], max_workers)
+    for (pos, key, _), (result, error) in zip(pending, parsed):
+        if error is None:
+            cache.store_result(key, result)
+        else:
+            cache.store_failure(key, error)
+        results[pos] = (result, error)
+    return results
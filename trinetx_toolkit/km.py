@@ -0,0 +1,331 @@
+"""
+Kaplan-Meier curve loading, summaries, and plotting for TriNetX survival
+curve exports.
+
+Used by the Kaplan-Meier Curve Maker page and the batch CLI.
+"""
+
+import csv
+import io
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+
+KM_CURVE_COLUMNS = [
+    'Cohort 1: Survival Probability', 'Cohort 2: Survival Probability',
+    'Cohort 1: Survival Probability 95 % CI Lower', 'Cohort 1: Survival Probability 95 % CI Upper',
+    'Cohort 2: Survival Probability 95 % CI Lower', 'Cohort 2: Survival Probability 95 % CI Upper',
+]
+
+
+# Header detection decodes only this much of the file, doubling until found.
+HEADER_SCAN_BYTES = 4096
+KM_HEADER_KEYWORDS = ("Time (Days)", "Cohort 1: Survival Probability")
+
+
+def find_km_header(file_bytes):
+    """Return (byte offset, raw column names) of the KM table header row."""
+    scan = HEADER_SCAN_BYTES
+    while True:
+        window = file_bytes[:scan]
+        complete = len(window) == len(file_bytes)
+        if not complete:
+            # Only look at whole lines.
+            window = window[:window.rfind(b"\n") + 1]
+        offset = 0
+        for line in window.splitlines(keepends=True):
+            text = line.decode("utf-8")
+            if all(k in text for k in KM_HEADER_KEYWORDS):
+                return offset, next(csv.reader([text.strip("\r\n")]))
+            offset += len(line)
+        if complete:
+            raise ValueError("No Kaplan-Meier header row (Time (Days), Cohort 1: Survival Probability) found.")
+        scan *= 2
+
+
+def load_km_curve_csv(file_bytes):
+    """
+    Parse a TriNetX KM curve export in one pass from its header row.
+
+    Survival and CI columns are float32, forward-filled across the days on
+    which a cohort had no event.
+    """
+    offset, raw_columns = find_km_header(file_bytes)
+    float_columns = {raw: "float32" for raw in raw_columns if raw.strip() in KM_CURVE_COLUMNS}
+    df = pd.read_csv(io.BytesIO(memoryview(file_bytes)[offset:]), dtype=float_columns)
+
+    # Clean data
+    df.columns = df.columns.str.strip()
+    if not df['Time (Days)'].is_monotonic_increasing:
+        df.sort_values('Time (Days)', inplace=True)
+    df[KM_CURVE_COLUMNS] = df[KM_CURVE_COLUMNS].ffill()
+    return df
+
+
+KM_COHORT_COLUMNS = {
+    1: ('Cohort 1: Survival Probability',
+        'Cohort 1: Survival Probability 95 % CI Lower', 'Cohort 1: Survival Probability 95 % CI Upper'),
+    2: ('Cohort 2: Survival Probability',
+        'Cohort 2: Survival Probability 95 % CI Lower', 'Cohort 2: Survival Probability 95 % CI Upper'),
+}
+
+
+def step_change_mask(values):
+    """
+    Rows to keep so a straight-line plot of values is unchanged.
+
+    values is (rows, series). Keeps the first and last rows, every row where
+    any series changes, and the row just before each change; the rows dropped
+    are interior samples of flat runs, which lie on the segment anyway.
+    """
+    n_rows = len(values)
+    keep = np.zeros(n_rows, dtype=bool)
+    if n_rows == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    current, previous = values[1:], values[:-1]
+    changed = ((current != previous) & ~(np.isnan(current) & np.isnan(previous))).any(axis=1)
+    keep[1:] |= changed
+    keep[:-1] |= changed
+    return keep
+
+
+def km_plot_points(df, max_days=None, decimate=False):
+    """
+    Time, survival, and CI arrays per cohort, limited to max_days.
+
+    With decimate, flat runs are reduced to their end points per cohort
+    (see step_change_mask), so the plotted lines and bands stay identical.
+    """
+    if max_days is None:
+        max_days = df['Time (Days)'].max()
+    df_limited = df[df['Time (Days)'] <= max_days]
+    time = df_limited['Time (Days)'].to_numpy()
+    points = {}
+    for cohort, columns in KM_COHORT_COLUMNS.items():
+        present = [col for col in columns if col in df_limited.columns]
+        values = df_limited[present].to_numpy(dtype=float)
+        keep = step_change_mask(values) if decimate else np.ones(len(values), dtype=bool)
+        points[cohort] = {
+            "time": time[keep],
+            **{col: values[keep, idx] for idx, col in enumerate(present)},
+        }
+    return points
+
+
+# =========================
+# Derived statistics
+# =========================
+# Landmark days offered by default: 1, 2, 3, and 5 years.
+DEFAULT_LANDMARKS = (365, 730, 1095, 1825)
+DEFAULT_AT_RISK_INTERVAL = 365
+
+
+def km_cohorts(df) -> List[int]:
+    """Cohort numbers with a survival column, in order."""
+    found = []
+    for col in df.columns:
+        match = re.fullmatch(r"Cohort (\d+): Survival Probability", col)
+        if match:
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def cohort_columns(cohort: int) -> Tuple[str, str, str]:
+    """Survival, CI lower, and CI upper column names for a cohort."""
+    return (
+        f"Cohort {cohort}: Survival Probability",
+        f"Cohort {cohort}: Survival Probability 95 % CI Lower",
+        f"Cohort {cohort}: Survival Probability 95 % CI Upper",
+    )
+
+
+def _at_risk_column(df, cohort: int) -> Optional[str]:
+    for col in df.columns:
+        if col.startswith(f"Cohort {cohort}:") and "at risk" in col.lower():
+            return col
+    return None
+
+
+def _step_lookup(times: np.ndarray, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """Value of a right-continuous step function at each time; NaN outside follow-up."""
+    at = np.asarray(at, dtype=float)
+    if not len(times):
+        return np.full(len(at), np.nan)
+    idx = np.searchsorted(times, at, side="right") - 1
+    inside = (idx >= 0) & (at <= times[-1])
+    return np.where(inside, values[np.clip(idx, 0, None)], np.nan)
+
+
+def number_at_risk(df, times: Sequence[float]) -> pd.DataFrame:
+    """
+    Number at risk per cohort (rows) at each time (columns).
+
+    Only cohorts with a "Cohort k: Number at Risk" column are listed; the
+    survival CI does not determine the count, so nothing is estimated. Counts
+    are carried forward between rows and never rise over time. The table is
+    empty when the export has no number-at-risk columns.
+    """
+    times = np.asarray(times, dtype=float)
+    t = df['Time (Days)'].to_numpy(dtype=float)
+    rows = {}
+    for cohort in km_cohorts(df):
+        at_risk_col = _at_risk_column(df, cohort)
+        if at_risk_col is None:
+            continue
+        counts = pd.to_numeric(df[at_risk_col], errors="coerce").ffill().to_numpy(dtype=float)
+        # Running minimum, so a stray larger count later in the export cannot raise the table.
+        counts = np.fmin.accumulate(np.where(np.isnan(counts), np.inf, counts))
+        counts[np.isinf(counts)] = np.nan
+        rows[f"Cohort {cohort}"] = np.round(_step_lookup(t, counts, times))
+    table = pd.DataFrame(rows, index=[int(x) if float(x).is_integer() else x for x in times]).T
+    table.columns.name = "Day"
+    return table
+
+
+def landmark_survival(df, landmarks: Sequence[float]) -> pd.DataFrame:
+    """Survival and 95% CI per cohort at each landmark day."""
+    landmarks = np.asarray(landmarks, dtype=float)
+    t = df['Time (Days)'].to_numpy(dtype=float)
+    records = []
+    for cohort in km_cohorts(df):
+        survival, lower, upper = (
+            _step_lookup(t, df[col].to_numpy(dtype=float), landmarks) if col in df.columns else np.full(len(landmarks), np.nan)
+            for col in cohort_columns(cohort)
+        )
+        for day, s, lo, hi in zip(landmarks, survival, lower, upper):
+            records.append({"Cohort": f"Cohort {cohort}", "Day": int(day), "Survival": s, "95% CI Lower": lo, "95% CI Upper": hi})
+    return pd.DataFrame(records, columns=["Cohort", "Day", "Survival", "95% CI Lower", "95% CI Upper"])
+
+
+def restricted_mean_survival(df, tau: Optional[float] = None) -> pd.DataFrame:
+    """
+    Restricted mean survival time (area under the step curve) up to tau days.
+
+    tau defaults to the last day in the export; past a cohort's follow-up the
+    RMST is NaN.
+    """
+    t = df['Time (Days)'].to_numpy(dtype=float)
+    if tau is None:
+        tau = float(t[-1]) if len(t) else 0.0
+    records = []
+    for cohort in km_cohorts(df):
+        survival = df[f"Cohort {cohort}: Survival Probability"].to_numpy(dtype=float)
+        known = ~np.isnan(survival)
+        times, values = t[known], survival[known]
+        if not len(times) or tau > times[-1]:
+            rmst = np.nan
+        else:
+            # S(t) = 1 before the first time point.
+            edges = np.concatenate(([0.0], np.clip(times, 0, tau), [tau]))
+            heights = np.concatenate(([1.0], values))
+            rmst = float(np.sum(heights * np.diff(edges)))
+        records.append({"Cohort": f"Cohort {cohort}", "Tau (Days)": tau, "RMST (Days)": rmst})
+    return pd.DataFrame(records, columns=["Cohort", "Tau (Days)", "RMST (Days)"])
+
+
+def summarize_km_curve(
+    df,
+    at_risk_times: Sequence[float],
+    landmarks: Sequence[float] = DEFAULT_LANDMARKS,
+    tau: Optional[float] = None,
+) -> Dict[str, pd.DataFrame]:
+    """All derived tables for one export; cache this per file and setting."""
+    return {
+        "number_at_risk": number_at_risk(df, at_risk_times),
+        "landmarks": landmark_survival(df, landmarks),
+        "rmst": restricted_mean_survival(df, tau),
+    }
+
+
+def at_risk_times(df, interval: float = DEFAULT_AT_RISK_INTERVAL, max_days: Optional[float] = None) -> List[int]:
+    last = df['Time (Days)'].max() if max_days is None else max_days
+    interval = max(1, int(interval))
+    return list(range(0, int(last) + 1, interval))
+
+
+def plot_km_curves(
+    df, plot_title="Kaplan-Meier Survival Curve", label1="Cohort 1", label2="Cohort 2",
+    x_label="Time (Days)", y_label="Survival Probability", style="Color", color1="#1f77b4", color2="#ff7f0e",
+    line_width=2.0, show_ci=True, ci_alpha=0.2, show_grid=True, fig_width=10, fig_height=6,
+    y_min=0.0, y_max=1.05, title_fontsize=16, label_fontsize=12, tick_fontsize=10, legend_fontsize=12,
+    max_days=None, decimate=False,
+):
+    points = km_plot_points(df, max_days, decimate)
+
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+
+    if style == 'Black & White':
+        color1_use, color2_use = 'black', 'gray'
+    else:
+        color1_use, color2_use = color1, color2
+
+    for cohort, label, color in ((1, label1, color1_use), (2, label2, color2_use)):
+        survival, lower, upper = KM_COHORT_COLUMNS[cohort]
+        cohort_points = points[cohort]
+        ax.plot(cohort_points["time"], cohort_points[survival], label=label, color=color, linewidth=line_width)
+        if show_ci and lower in df.columns:
+            ax.fill_between(cohort_points["time"], cohort_points[lower], cohort_points[upper], color=color, alpha=ci_alpha)
+
+    ax.set_title(plot_title, fontsize=title_fontsize)
+    ax.set_xlabel(x_label, fontsize=label_fontsize)
+    ax.set_ylabel(y_label, fontsize=label_fontsize)
+    ax.set_ylim(y_min, y_max)
+    ax.tick_params(axis='both', labelsize=tick_fontsize)
+    ax.legend(fontsize=legend_fontsize)
+    if show_grid:
+        ax.grid(True)
+    return fig
+
+
+def plot_km_overlay(
+    datasets, plot_title="Kaplan-Meier Survival Curve", label1="Cohort 1", label2="Cohort 2",
+    x_label="Time (Days)", y_label="Survival Probability", style="Color", color1="#1f77b4", color2="#ff7f0e",
+    line_width=2.0, show_ci=True, ci_alpha=0.2, show_grid=True, fig_width=10, fig_height=6,
+    y_min=0.0, y_max=1.05, title_fontsize=16, label_fontsize=12, tick_fontsize=10, legend_fontsize=12,
+    max_days=None, decimate=False,
+):
+    """
+    Overlay several KM exports, given as (name, df) pairs, on one axis.
+
+    The first export keeps color1/color2; later ones take the next colors of
+    the tab10 cycle (or line styles in Black & White). Labels read
+    "name: cohort label".
+    """
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+    palette = [c for c in plt.cm.tab10.colors]
+    linestyles = ['-', '--', ':', '-.']
+    cohort_labels = {1: label1, 2: label2}
+
+    for file_idx, (name, df) in enumerate(datasets):
+        points = km_plot_points(df, max_days, decimate)
+        for cohort in (1, 2):
+            if style == 'Black & White':
+                color = 'black' if cohort == 1 else 'gray'
+                linestyle = linestyles[file_idx % len(linestyles)]
+            else:
+                if file_idx == 0:
+                    color = color1 if cohort == 1 else color2
+                else:
+                    color = palette[(2 * file_idx + cohort - 1) % len(palette)]
+                linestyle = '-'
+            survival, lower, upper = KM_COHORT_COLUMNS[cohort]
+            cohort_points = points[cohort]
+            ax.plot(cohort_points["time"], cohort_points[survival], label=f"{name}: {cohort_labels[cohort]}",
+                    color=color, linewidth=line_width, linestyle=linestyle)
+            if show_ci and lower in df.columns:
+                ax.fill_between(cohort_points["time"], cohort_points[lower], cohort_points[upper], color=color, alpha=ci_alpha)
+
+    ax.set_title(plot_title, fontsize=title_fontsize)
+    ax.set_xlabel(x_label, fontsize=label_fontsize)
+    ax.set_ylabel(y_label, fontsize=label_fontsize)
+    ax.set_ylim(y_min, y_max)
+    ax.tick_params(axis='both', labelsize=tick_fontsize)
+    ax.legend(fontsize=legend_fontsize)
+    if show_grid:
+        ax.grid(True)
+    return fig
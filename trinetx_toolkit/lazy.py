@@ -0,0 +1,59 @@
+"""
+Deferred imports for heavy dependencies.
+
+Streamlit executes a page's top level on its first load in every worker
+process, so a module-level import of statsmodels, plotly, st_aggrid or
+python-docx is paid before anything is drawn, even when that code path is
+never used. Pages bind such packages with lazy_import(); the real import
+happens on first attribute access. module_available() checks for a package
+without importing it.
+"""
+
+import importlib
+import importlib.util
+import threading
+from functools import lru_cache
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        if attr in ("_name", "_module", "_lock"):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Module proxy for `name`; ImportError surfaces on first use."""
+    return LazyModule(name)
+
+
+@lru_cache(maxsize=None)
+def module_available(name: str) -> bool:
+    """True when `name` can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
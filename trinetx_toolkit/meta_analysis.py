@@ -0,0 +1,215 @@
+"""
+Inverse-variance pooling of ratio estimates for the Forest Plot Generator.
+
+Each estimate and its 95% CI are moved to the log-ratio scale, where
+log(ratio) has standard error (ln upper − ln lower) / (2 × 1.96). Every group
+of estimates, e.g. one outcome run in several networks or time windows, is
+then pooled with a fixed-effect model and with DerSimonian–Laird and REML
+random-effects models. Heterogeneity is reported as Cochran's Q, I², and τ²,
+with a prediction interval for the random-effects models.
+
+All groups are pooled at once: sums over each group's rows are taken with
+np.bincount, and REML's grid scan and Newton steps update every group's τ²
+together.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from trinetx_toolkit.lazy import lazy_import
+
+special = lazy_import("scipy.special")
+
+POOLING_METHODS: Dict[str, str] = {
+    "fixed": "Fixed effect",
+    "dl": "Random effects (DerSimonian–Laird)",
+    "reml": "Random effects (REML)",
+}
+# Short names for figure labels.
+POOLING_METHOD_LABELS: Dict[str, str] = {"fixed": "fixed effect", "dl": "DL", "reml": "REML"}
+
+CI_Z = 1.959963984540054
+REML_MAX_ITER = 100
+REML_TOLERANCE = 1e-10
+# Fractions of a group's squared log-ratio range scanned for REML starting points.
+REML_GRID = np.logspace(-6, 0, 43)
+
+POOLED_COLUMNS = [
+    "Group", "Method", "k", "Pooled Ratio", "Lower CI", "Upper CI", "p",
+    "Q", "Q p", "I² (%)", "τ²", "PI Lower", "PI Upper",
+]
+
+
+def log_ratio_inputs(estimate: Any, lower: Any, upper: Any):
+    """Log ratios, their variances, and which rows have a usable estimate and CI."""
+    estimate, lower, upper = (pd.to_numeric(pd.Series(np.asarray(x).ravel()), errors="coerce").astype(float).to_numpy()
+                              for x in (estimate, lower, upper))
+    valid = (estimate > 0) & (lower > 0) & (upper > lower) & np.isfinite(estimate) & np.isfinite(upper)
+    y = np.full(estimate.shape, np.nan)
+    v = np.full(estimate.shape, np.nan)
+    y[valid] = np.log(estimate[valid])
+    v[valid] = ((np.log(upper[valid]) - np.log(lower[valid])) / (2 * CI_Z)) ** 2
+    return y, v, valid
+
+
+def _restricted_loglik(codes: np.ndarray, y: np.ndarray, v: np.ndarray, tau2: np.ndarray) -> np.ndarray:
+    """Restricted log-likelihood of every group at its τ², up to a constant."""
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=len(tau2))
+
+    w = 1.0 / (v + tau2[codes])
+    sum_w = group_sum(w)
+    mu = group_sum(w * y) / sum_w
+    return -0.5 * (group_sum(np.log(v + tau2[codes])) + np.log(sum_w) + group_sum(w * (y - mu[codes]) ** 2))
+
+
+def _reml_newton(codes: np.ndarray, y: np.ndarray, v: np.ndarray, tau2: np.ndarray, active: np.ndarray):
+    """
+    Climb every group's restricted likelihood by Newton's method from tau2.
+
+    A step that lowers a group's restricted likelihood is halved until it
+    does not, which keeps the iteration from overshooting or bouncing off
+    τ² = 0. Iteration stops once every group's full step is negligible.
+    Returns the local maxima and their log-likelihoods.
+    """
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=len(tau2))
+
+    active = active.copy()
+    tau2 = np.where(active, tau2, 0.0)
+    loglik = _restricted_loglik(codes, y, v, tau2)
+    for _ in range(REML_MAX_ITER):
+        w = 1.0 / (v + tau2[codes])
+        sum_w = group_sum(w)
+        sum_w2 = group_sum(w ** 2)
+        mu = group_sum(w * y) / sum_w
+        r = y - mu[codes]
+        # Score, expected and observed information of the restricted likelihood in τ², all doubled.
+        score = group_sum(w ** 2 * r ** 2) - sum_w + sum_w2 / sum_w
+        expected = sum_w2 - 2 * group_sum(w ** 3) / sum_w + (sum_w2 / sum_w) ** 2
+        observed = 2 * (group_sum(w ** 3 * r ** 2) - group_sum(w ** 2 * r) ** 2 / sum_w) - expected
+        # Newton steps converge fastest near the maximum; far from it, where the
+        # likelihood is not concave, fall back to Fisher scoring.
+        information = np.where(observed > 0, observed, expected)
+        step = np.where(active & (information > 0), score / information, 0.0)
+        step = np.maximum(tau2 + step, 0.0) - tau2
+        # Groups whose step is negligible have converged and stay put.
+        tolerance = REML_TOLERANCE * np.maximum(1.0, tau2)
+        step[np.abs(step) <= tolerance] = 0.0
+        if not step.any():
+            break
+        for _ in range(30):
+            updated_loglik = _restricted_loglik(codes, y, v, tau2 + step)
+            worse = updated_loglik < loglik
+            if not worse.any():
+                break
+            step = np.where(worse, step / 2, step)
+            step[np.abs(step) <= tolerance] = 0.0
+        tau2 = np.where(worse, tau2, tau2 + step)
+        loglik = np.where(worse, loglik, updated_loglik)
+        # A group whose step was halved away is at the maximum up to rounding.
+        active &= step != 0
+    return tau2, loglik
+
+
+def _reml_tau2(codes: np.ndarray, y: np.ndarray, v: np.ndarray, tau2: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """
+    REML τ² of every group.
+
+    The restricted likelihood can have more than one local maximum, so a
+    climb from the DerSimonian–Laird value alone can stop on the wrong one.
+    Each group's likelihood is also scanned on a coarse τ² grid, from 0 up
+    to the squared range of its log ratios, and Newton's method is run from
+    both the DL value and the best grid point; the higher maximum is kept.
+    """
+    n_groups = len(tau2)
+    y_max = np.full(n_groups, -np.inf)
+    y_min = np.full(n_groups, np.inf)
+    np.maximum.at(y_max, codes, y)
+    np.minimum.at(y_min, codes, y)
+    upper = np.where(active, (y_max - y_min) ** 2, 0.0)
+
+    grid_tau2 = np.zeros(n_groups)
+    grid_loglik = _restricted_loglik(codes, y, v, grid_tau2)
+    for fraction in REML_GRID:
+        candidate = upper * fraction
+        loglik = _restricted_loglik(codes, y, v, candidate)
+        better = loglik > grid_loglik
+        grid_tau2[better] = candidate[better]
+        grid_loglik[better] = loglik[better]
+
+    dl_tau2, dl_loglik = _reml_newton(codes, y, v, tau2, active)
+    grid_tau2, grid_loglik = _reml_newton(codes, y, v, grid_tau2, active)
+    return np.where(grid_loglik > dl_loglik, grid_tau2, dl_tau2)
+
+
+def pool_log_ratios(groups: Any, estimate: Any, lower: Any, upper: Any) -> pd.DataFrame:
+    """
+    Pooled ratio, 95% CI, p value and heterogeneity for every group with at
+    least two usable estimates, one row per group and method (POOLING_METHODS).
+
+    Rows with a missing group, a non-positive estimate or bound, or an empty
+    CI are left out. Ratios, CIs and prediction intervals are back-transformed
+    from the log scale; τ² stays on the log scale. Groups appear in order of
+    first appearance.
+    """
+    codes, uniques = pd.factorize(pd.Series(np.asarray(groups, dtype=object).ravel()))
+    y, v, valid = log_ratio_inputs(estimate, lower, upper)
+    valid &= codes >= 0
+    codes, y, v = codes[valid], y[valid], v[valid]
+    n_groups = len(uniques)
+
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=n_groups)
+
+    k = np.bincount(codes, minlength=n_groups)
+    pooled = k >= 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = 1.0 / v
+        sum_w = group_sum(w)
+        mu_fixed = group_sum(w * y) / sum_w
+        q = group_sum(w * (y - mu_fixed[codes]) ** 2)
+        dof = k - 1
+        i2 = np.where(q > dof, (q - dof) / q, 0.0) * 100
+        c = sum_w - group_sum(w ** 2) / sum_w
+        tau2_dl = np.where(c > 0, np.maximum((q - dof) / c, 0.0), 0.0)
+        tau2_dl[~pooled] = 0.0
+        tau2_reml = _reml_tau2(codes, y, v, tau2_dl, pooled)
+
+        results = []
+        for method, tau2 in [("fixed", np.zeros(n_groups)), ("dl", tau2_dl), ("reml", tau2_reml)]:
+            w_re = 1.0 / (v + tau2[codes])
+            sum_w_re = group_sum(w_re)
+            mu = group_sum(w_re * y) / sum_w_re
+            se = np.sqrt(1.0 / sum_w_re)
+            pi_half = np.full(n_groups, np.nan)
+            if method != "fixed":
+                # Higgins et al. (2009): t with k - 2 degrees of freedom, defined for k >= 3.
+                has_pi = k >= 3
+                pi_half[has_pi] = special.stdtrit(k[has_pi] - 2, 0.975) * np.sqrt(tau2[has_pi] + se[has_pi] ** 2)
+            results.append(
+                pd.DataFrame(
+                    {
+                        "Group": uniques,
+                        "Method": POOLING_METHODS[method],
+                        "k": k,
+                        "Pooled Ratio": np.exp(mu),
+                        "Lower CI": np.exp(mu - CI_Z * se),
+                        "Upper CI": np.exp(mu + CI_Z * se),
+                        "p": 2 * special.ndtr(-np.abs(mu / se)),
+                        "Q": q,
+                        "Q p": special.chdtrc(np.maximum(dof, 1), q),
+                        "I² (%)": i2,
+                        "τ²": tau2,
+                        "PI Lower": np.exp(mu - pi_half),
+                        "PI Upper": np.exp(mu + pi_half),
+                        "_group": np.arange(n_groups),
+                    }
+                )[pooled]
+            )
+
+    combined = pd.concat(results, ignore_index=True)
+    combined = combined.sort_values("_group", kind="stable").drop(columns="_group")
+    return combined[POOLED_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,94 @@
+"""
+Measures of Association parsing for the Multiple Comparisons page.
+
+Kept outside the page script so cached_parse_many() can run it in worker
+processes.
+"""
+
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from trinetx_toolkit.sections import build_section_index, read_text_rows
+
+
+def safe_float(value) -> float:
+    try:
+        if value is None:
+            return np.nan
+        text = str(value).strip().replace(",", "")
+        if text == "":
+            return np.nan
+        return float(text)
+    except Exception:
+        return np.nan
+
+
+def parse_trinetx_moa_text(text: str, source_name: str) -> Dict[str, object]:
+    index = build_section_index(read_text_rows(text))
+    if not index.title:
+        raise ValueError("File appears empty.")
+
+    title = index.title
+    if "Measures of Association Table" not in title:
+        raise ValueError("This does not look like a TriNetX Measures of Association export.")
+
+    result: Dict[str, object] = {
+        "source_file": source_name,
+        "title": title,
+        "outcome": Path(source_name).stem,
+    }
+
+    cohort_stats = index.window("Cohort Statistics")
+    if len(cohort_stats) >= 3:
+        header = cohort_stats[0]
+        header_index = {h: idx for idx, h in enumerate(header)}
+        for cohort_num, data_row in ((1, cohort_stats[1]), (2, cohort_stats[2])):
+            if len(data_row) >= len(header):
+                result[f"cohort_{cohort_num}_name"] = data_row[header_index.get("Cohort Name", 1)]
+                result[f"cohort_{cohort_num}_patients"] = safe_float(data_row[header_index.get("Patients in Cohort", 2)])
+                result[f"cohort_{cohort_num}_with_outcome"] = safe_float(data_row[header_index.get("Patients with Outcome", 3)])
+                result[f"cohort_{cohort_num}_risk"] = safe_float(data_row[header_index.get("Risk", 4)])
+
+    risk_difference = index.window("Risk Difference")
+    if len(risk_difference) >= 2:
+        header, data = risk_difference[0], risk_difference[1]
+        header_index = {h: idx for idx, h in enumerate(header)}
+        result["risk_difference"] = safe_float(data[header_index.get("Risk Difference", 0)])
+        result["risk_difference_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
+        result["risk_difference_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
+        result["z_value"] = safe_float(data[header_index.get("z", 3)])
+        result["p_raw"] = safe_float(data[header_index.get("p", 4)])
+
+    risk_ratio = index.window("Risk Ratio")
+    if len(risk_ratio) >= 2:
+        header, data = risk_ratio[0], risk_ratio[1]
+        header_index = {h: idx for idx, h in enumerate(header)}
+        result["risk_ratio"] = safe_float(data[header_index.get("Risk Ratio", 0)])
+        result["risk_ratio_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
+        result["risk_ratio_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
+
+    odds_ratio = index.window("Odds Ratio")
+    if len(odds_ratio) >= 2:
+        header, data = odds_ratio[0], odds_ratio[1]
+        header_index = {h: idx for idx, h in enumerate(header)}
+        result["odds_ratio"] = safe_float(data[header_index.get("Odds Ratio", 0)])
+        result["odds_ratio_ci_lower"] = safe_float(data[header_index.get("95 % CI Lower", 1)])
+        result["odds_ratio_ci_upper"] = safe_float(data[header_index.get("95 % CI Upper", 2)])
+
+    rr = result.get("risk_ratio")
+    if rr is not None and pd.notna(rr):
+        if float(rr) < 1:
+            result["direction"] = "Lower in Cohort 1"
+        elif float(rr) > 1:
+            result["direction"] = "Higher in Cohort 1"
+        else:
+            result["direction"] = "No difference"
+
+    return result
+
+
+def parse_moa_bytes(raw_bytes: bytes, source_name: str) -> Dict[str, object]:
+    return parse_trinetx_moa_text(raw_bytes.decode("utf-8-sig", errors="ignore"), source_name)
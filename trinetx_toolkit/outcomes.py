@@ -0,0 +1,336 @@
+"""
+Canonical parsed record for TriNetX Measures of Association and Kaplan-Meier
+exports.
+
+parse_outcome_bytes() turns one export into a ParsedOutcome. The Outcomes
+Table page renders these directly, and the Home page keeps them in the shared
+outcome store so the Forest, Bar Graph, Power, and Multiple Comparisons pages
+can reuse the same record instead of parsing the upload again.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from trinetx_toolkit.cache import content_hash
+from trinetx_toolkit.sections import SectionIndex, clean_cell, index_export_bytes
+
+
+def norm_text(value: Any) -> str:
+    """Normalize labels so exported header variants can be matched reliably."""
+    value = clean_cell(value).lower()
+    value = re.sub(r"[^a-z0-9]+", " ", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+def safe_float(value: Any) -> Optional[float]:
+    text = clean_cell(value)
+    if text == "":
+        return None
+    text = text.replace(",", "").replace("%", "")
+    try:
+        return float(text)
+    except Exception:
+        return None
+
+def humanize_file_name(name: str) -> str:
+    stem = re.sub(r"\.[A-Za-z0-9]+$", "", name)
+    stem = stem.replace("_", " ").replace("-", " ")
+    stem = re.sub(r"\s+", " ", stem).strip()
+    outcome_match = re.search(r"outcome\s*(\d+)", stem, flags=re.I)
+    if outcome_match:
+        return f"Outcome {outcome_match.group(1)}"
+    return stem or "Outcome"
+
+
+def infer_compact_cohort_label(raw_name: str, cohort_number: int) -> str:
+    """Infer a compact display label while allowing the user to edit it later."""
+    lowered = clean_cell(raw_name).lower()
+    if "control" in lowered:
+        return "Control"
+    if "statin" in lowered:
+        return "Statin"
+    if cohort_number == 1 and re.search(r"\bxp\b|exposure|exposed|treated|treatment", lowered):
+        return "Statin"
+    if raw_name:
+        return raw_name
+    return f"Cohort {cohort_number}"
+
+# -----------------------------
+# TriNetX parsing functions
+# -----------------------------
+
+EXPORT_MOA = "Measures of Association"
+EXPORT_KM = "Kaplan-Meier"
+EXPORT_UNKNOWN = "Unknown"
+
+
+def detect_export_type(index: SectionIndex) -> str:
+    """
+    Classify a TriNetX export as MOA or Kaplan-Meier using its title, the
+    Notes section, and the section labels the index already found, without
+    another pass over the whole file.
+    """
+    described = [index.title] + [" ".join(row) for row in index.window("Notes")]
+    normalized = norm_text(" ".join(described))
+
+    if "kaplan meier" in normalized:
+        return EXPORT_KM
+    if "measures of association" in normalized:
+        return EXPORT_MOA
+
+    section_labels = set(index.keys)
+    if "logranktest" in section_labels or ("hazardratio" in section_labels and "proportionality" in section_labels):
+        return EXPORT_KM
+    if "riskdifference" in section_labels or "riskratio" in section_labels or "oddsratio" in section_labels:
+        return EXPORT_MOA
+    return EXPORT_UNKNOWN
+
+
+def table_rows_to_dicts(headers: List[str], rows: List[List[str]]) -> List[Dict[str, str]]:
+    normalized_headers = [norm_text(h) for h in headers]
+    output: List[Dict[str, str]] = []
+    for row in rows:
+        padded = row + [""] * max(0, len(headers) - len(row))
+        record: Dict[str, str] = {}
+        for raw_header, normalized_header, value in zip(headers, normalized_headers, padded):
+            record[normalized_header] = clean_cell(value)
+            record[clean_cell(raw_header)] = clean_cell(value)
+        output.append(record)
+    return output
+
+
+def get_record_value(record: Dict[str, str], aliases: List[str]) -> str:
+    normalized_aliases = [norm_text(alias) for alias in aliases]
+    for alias in normalized_aliases:
+        if alias in record:
+            return record[alias]
+    for alias in aliases:
+        if alias in record:
+            return record[alias]
+    return ""
+
+
+@dataclass
+class ParsedOutcome:
+    source_key: str
+    source_file: str
+    default_outcome: str
+    export_type: str = EXPORT_UNKNOWN
+    title: str = ""
+    cohort1_raw: str = ""
+    cohort2_raw: str = ""
+    cohort1_label: str = "Cohort 1"
+    cohort2_label: str = "Cohort 2"
+    patients1: Optional[float] = None
+    patients2: Optional[float] = None
+    events1: Optional[float] = None
+    events2: Optional[float] = None
+
+    # Observed event proportions from Events / N, or TriNetX MOA Risk when present.
+    risk1: Optional[float] = None
+    risk2: Optional[float] = None
+
+    # KM-specific fields.
+    median_survival1: Optional[float] = None
+    median_survival2: Optional[float] = None
+    survival_probability_end1: Optional[float] = None
+    survival_probability_end2: Optional[float] = None
+    km_event_probability_end1: Optional[float] = None
+    km_event_probability_end2: Optional[float] = None
+    proportionality_p_value: Optional[float] = None
+
+    # MOA-specific fields.
+    risk_difference: Optional[float] = None
+    risk_difference_lower: Optional[float] = None
+    risk_difference_upper: Optional[float] = None
+    z_value: Optional[float] = None
+    risk_ratio: Optional[float] = None
+    risk_ratio_lower: Optional[float] = None
+    risk_ratio_upper: Optional[float] = None
+    odds_ratio: Optional[float] = None
+    odds_ratio_lower: Optional[float] = None
+    odds_ratio_upper: Optional[float] = None
+
+    # KM effect estimate.
+    hazard_ratio: Optional[float] = None
+    hazard_ratio_lower: Optional[float] = None
+    hazard_ratio_upper: Optional[float] = None
+
+    # Main p value and effect estimate used in the manuscript table.
+    p_value: Optional[float] = None
+    p_value_source: str = ""
+    effect_measure_label: str = ""
+    effect_measure_abbrev: str = ""
+    effect_value: Optional[float] = None
+    effect_lower: Optional[float] = None
+    effect_upper: Optional[float] = None
+
+    notes: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    # The export as uploaded, so other parsers (e.g. the forest plot's) can
+    # re-read a stored record without the original upload. Bytes are
+    # immutable, so copying a record does not copy them.
+    file_bytes: bytes = field(default=b"", repr=False)
+
+
+def extract_notes(index: SectionIndex) -> List[str]:
+    section = index.get("Notes")
+    # Notes start directly under the label and run until the first blank row.
+    if section is None or section.header_row != section.label_row + 1:
+        return []
+    headers, note_rows = index.table("Notes")
+    notes: List[str] = []
+    for row in [headers] + note_rows:
+        note_text = " ".join(cell for cell in row if cell)
+        if note_text:
+            notes.append(note_text)
+    return notes
+
+
+def parse_cohort_statistics(parsed: ParsedOutcome, index: SectionIndex) -> None:
+    cohort_headers, cohort_rows = index.table("Cohort Statistics")
+    cohort_records = table_rows_to_dicts(cohort_headers, cohort_rows)
+    if len(cohort_records) < 2:
+        parsed.warnings.append("Could not find two cohort rows under 'Cohort Statistics'.")
+        return
+
+    c1, c2 = cohort_records[0], cohort_records[1]
+    parsed.cohort1_raw = get_record_value(c1, ["Cohort Name", "Name"])
+    parsed.cohort2_raw = get_record_value(c2, ["Cohort Name", "Name"])
+    parsed.cohort1_label = infer_compact_cohort_label(parsed.cohort1_raw, 1)
+    parsed.cohort2_label = infer_compact_cohort_label(parsed.cohort2_raw, 2)
+
+    parsed.patients1 = safe_float(get_record_value(c1, ["Patients in Cohort", "Patients", "Patients N", "N"]))
+    parsed.patients2 = safe_float(get_record_value(c2, ["Patients in Cohort", "Patients", "Patients N", "N"]))
+    parsed.events1 = safe_float(get_record_value(c1, ["Patients with Outcome", "Events", "Patients with Events", "Event Count"]))
+    parsed.events2 = safe_float(get_record_value(c2, ["Patients with Outcome", "Events", "Patients with Events", "Event Count"]))
+
+    parsed.risk1 = safe_float(get_record_value(c1, ["Risk", "Incidence", "Cumulative Incidence"]))
+    parsed.risk2 = safe_float(get_record_value(c2, ["Risk", "Incidence", "Cumulative Incidence"]))
+    if parsed.risk1 is None and parsed.events1 is not None and parsed.patients1:
+        parsed.risk1 = parsed.events1 / parsed.patients1
+    if parsed.risk2 is None and parsed.events2 is not None and parsed.patients2:
+        parsed.risk2 = parsed.events2 / parsed.patients2
+
+    parsed.median_survival1 = safe_float(get_record_value(c1, ["Median Survival (Days)", "Median Survival", "Median"] ))
+    parsed.median_survival2 = safe_float(get_record_value(c2, ["Median Survival (Days)", "Median Survival", "Median"] ))
+    parsed.survival_probability_end1 = safe_float(get_record_value(c1, ["Survival Probability at End of Time Window", "Survival Probability"] ))
+    parsed.survival_probability_end2 = safe_float(get_record_value(c2, ["Survival Probability at End of Time Window", "Survival Probability"] ))
+
+    if parsed.survival_probability_end1 is not None:
+        parsed.km_event_probability_end1 = 1 - parsed.survival_probability_end1
+    if parsed.survival_probability_end2 is not None:
+        parsed.km_event_probability_end2 = 1 - parsed.survival_probability_end2
+
+
+def parse_moa_sections(parsed: ParsedOutcome, index: SectionIndex) -> None:
+    rd_headers, rd_rows = index.table("Risk Difference")
+    rd_records = table_rows_to_dicts(rd_headers, rd_rows)
+    if rd_records:
+        rd = rd_records[0]
+        parsed.risk_difference = safe_float(get_record_value(rd, ["Risk Difference"]))
+        parsed.risk_difference_lower = safe_float(get_record_value(rd, ["95 % CI Lower", "95 CI Lower", "CI Lower", "Lower"]))
+        parsed.risk_difference_upper = safe_float(get_record_value(rd, ["95 % CI Upper", "95 CI Upper", "CI Upper", "Upper"]))
+        parsed.z_value = safe_float(get_record_value(rd, ["z", "z Value"]))
+        parsed.p_value = safe_float(get_record_value(rd, ["p", "p Value", "p-value", "P Value"]))
+        parsed.p_value_source = "Risk difference z test"
+    else:
+        parsed.warnings.append("Could not find a 'Risk Difference' section in this MOA export.")
+
+    rr_headers, rr_rows = index.table("Risk Ratio")
+    rr_records = table_rows_to_dicts(rr_headers, rr_rows)
+    if rr_records:
+        rr = rr_records[0]
+        parsed.risk_ratio = safe_float(get_record_value(rr, ["Risk Ratio", "RR"]))
+        parsed.risk_ratio_lower = safe_float(get_record_value(rr, ["95 % CI Lower", "95 CI Lower", "CI Lower", "Lower"]))
+        parsed.risk_ratio_upper = safe_float(get_record_value(rr, ["95 % CI Upper", "95 CI Upper", "CI Upper", "Upper"]))
+        parsed.effect_measure_label = "Risk Ratio"
+        parsed.effect_measure_abbrev = "RR"
+        parsed.effect_value = parsed.risk_ratio
+        parsed.effect_lower = parsed.risk_ratio_lower
+        parsed.effect_upper = parsed.risk_ratio_upper
+    else:
+        parsed.warnings.append("Could not find a 'Risk Ratio' section in this MOA export.")
+
+    or_headers, or_rows = index.table("Odds Ratio")
+    or_records = table_rows_to_dicts(or_headers, or_rows)
+    if or_records:
+        odds = or_records[0]
+        parsed.odds_ratio = safe_float(get_record_value(odds, ["Odds Ratio", "OR"]))
+        parsed.odds_ratio_lower = safe_float(get_record_value(odds, ["95 % CI Lower", "95 CI Lower", "CI Lower", "Lower"]))
+        parsed.odds_ratio_upper = safe_float(get_record_value(odds, ["95 % CI Upper", "95 CI Upper", "CI Upper", "Upper"]))
+
+
+def parse_km_sections(parsed: ParsedOutcome, index: SectionIndex) -> None:
+    lr_headers, lr_rows = index.table("Log-Rank Test")
+    lr_records = table_rows_to_dicts(lr_headers, lr_rows)
+    if lr_records:
+        log_rank = lr_records[0]
+        parsed.p_value = safe_float(get_record_value(log_rank, ["p", "p Value", "p-value", "P Value"]))
+        parsed.p_value_source = "Log-rank test"
+    else:
+        parsed.warnings.append("Could not find a 'Log-Rank Test' section in this Kaplan-Meier export.")
+
+    hr_headers, hr_rows = index.table("Hazard Ratio")
+    hr_records = table_rows_to_dicts(hr_headers, hr_rows)
+    if hr_records:
+        hr = hr_records[0]
+        parsed.hazard_ratio = safe_float(get_record_value(hr, ["Hazard Ratio", "HR"]))
+        parsed.hazard_ratio_lower = safe_float(get_record_value(hr, ["95 % CI Lower", "95 CI Lower", "CI Lower", "Lower"]))
+        parsed.hazard_ratio_upper = safe_float(get_record_value(hr, ["95 % CI Upper", "95 CI Upper", "CI Upper", "Upper"]))
+        parsed.effect_measure_label = "Hazard Ratio"
+        parsed.effect_measure_abbrev = "HR"
+        parsed.effect_value = parsed.hazard_ratio
+        parsed.effect_lower = parsed.hazard_ratio_lower
+        parsed.effect_upper = parsed.hazard_ratio_upper
+    else:
+        parsed.warnings.append("Could not find a 'Hazard Ratio' section in this Kaplan-Meier export.")
+
+    prop_headers, prop_rows = index.table("Proportionality")
+    prop_records = table_rows_to_dicts(prop_headers, prop_rows)
+    if prop_records:
+        prop = prop_records[0]
+        parsed.proportionality_p_value = safe_float(get_record_value(prop, ["p", "p Value", "p-value", "P Value"]))
+
+
+def outcome_source_key(file_bytes: bytes, file_name: str) -> str:
+    """
+    Key of an export in the outcome store and the label editors.
+
+    It depends only on the file's bytes and name, so removing or reordering
+    other uploads does not change it and edited labels stay with their file.
+    """
+    return f"{content_hash(file_bytes)[:12]}:{file_name}"
+
+
+def parse_outcome_bytes(file_bytes: bytes, file_name: str) -> ParsedOutcome:
+    """Parse one MOA or Kaplan-Meier CSV export into a ParsedOutcome."""
+    index = index_export_bytes(file_bytes)
+
+    parsed = ParsedOutcome(
+        source_key=outcome_source_key(file_bytes, file_name),
+        source_file=file_name,
+        default_outcome=humanize_file_name(file_name),
+        export_type=detect_export_type(index),
+        title=index.title,
+        file_bytes=file_bytes,
+    )
+
+    parsed.notes = extract_notes(index)
+    parse_cohort_statistics(parsed, index)
+
+    if parsed.export_type == EXPORT_MOA:
+        parse_moa_sections(parsed, index)
+    elif parsed.export_type == EXPORT_KM:
+        parse_km_sections(parsed, index)
+    else:
+        parsed.warnings.append("Could not confidently detect export type. Attempted to parse both MOA and KM sections.")
+        parse_moa_sections(parsed, index)
+        parse_km_sections(parsed, index)
+        if parsed.hazard_ratio is not None:
+            parsed.export_type = EXPORT_KM
+        elif parsed.risk_ratio is not None:
+            parsed.export_type = EXPORT_MOA
+
+    return parsed
@@ -0,0 +1,329 @@
+"""
+Manuscript-style outcomes table (Table 2) built from ParsedOutcome records.
+
+Formats events, risks, effect estimates, and p values into display records
+and renders them as HTML, a Word-compatible HTML document, or a plain table.
+Used by the Outcomes Table Generator page and the batch CLI.
+"""
+
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from trinetx_toolkit.html_tables import escape_cell, render_template
+from trinetx_toolkit.outcomes import EXPORT_KM, ParsedOutcome, clean_cell, safe_float
+
+
+# -----------------------------
+# Utility functions
+# -----------------------------
+
+def safe_int(value: Any) -> Optional[int]:
+    number = safe_float(value)
+    if number is None:
+        return None
+    return int(round(number))
+
+
+def br_join(values: List[Any]) -> str:
+    return "<br>".join(escape_cell(v) for v in values)
+
+
+def strip_leading_zero(text: str) -> str:
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-." + text[3:]
+    return text
+
+
+def format_int(value: Any) -> str:
+    number = safe_int(value)
+    if number is None:
+        return clean_cell(value)
+    return f"{number:,}"
+
+
+def format_percent_from_proportion(
+    value: Any,
+    decimals: int = 2,
+    include_percent_symbol: bool = True,
+    strip_zero: bool = False,
+) -> str:
+    """Format a proportion such as 0.0008 as 0.08% or 0.08."""
+    number = safe_float(value)
+    if number is None:
+        return clean_cell(value)
+    text = f"{number * 100:.{decimals}f}"
+    if strip_zero:
+        text = strip_leading_zero(text)
+    if include_percent_symbol:
+        text += "%"
+    return text
+
+
+def format_ratio(value: Any, decimals: int = 2, strip_zero: bool = False) -> str:
+    number = safe_float(value)
+    if number is None:
+        return clean_cell(value)
+    text = f"{number:.{decimals}f}"
+    if strip_zero:
+        text = strip_leading_zero(text)
+    return text
+
+
+def format_p_value(value: Any, decimals: int = 3, threshold: float = 0.001) -> str:
+    number = safe_float(value)
+    if number is None:
+        raw = clean_cell(value)
+        return raw
+    if number < threshold:
+        return "<.001"
+    text = f"{number:.{decimals}f}"
+    return strip_leading_zero(text)
+
+
+# -----------------------------
+# Formatting helpers for display records
+# -----------------------------
+
+def ratio_with_ci(value: Any, lower: Any, upper: Any, decimals: int = 2, prefix: str = "") -> str:
+    if safe_float(value) is None:
+        return ""
+    estimate = format_ratio(value, decimals)
+    if safe_float(lower) is not None and safe_float(upper) is not None:
+        estimate = f"{estimate} ({format_ratio(lower, decimals)} to {format_ratio(upper, decimals)})"
+    if prefix:
+        return f"{prefix} {estimate}"
+    return estimate
+
+
+def percent_with_ci(value: Any, lower: Any, upper: Any, decimals: int = 2) -> str:
+    if safe_float(value) is None:
+        return ""
+    if safe_float(lower) is None or safe_float(upper) is None:
+        return format_percent_from_proportion(value, decimals, include_percent_symbol=True)
+    return (
+        f"{format_percent_from_proportion(value, decimals, include_percent_symbol=True)} "
+        f"({format_percent_from_proportion(lower, decimals, include_percent_symbol=True)} to "
+        f"{format_percent_from_proportion(upper, decimals, include_percent_symbol=True)})"
+    )
+
+
+def km_probability_for_display(parsed: ParsedOutcome, cohort_number: int, km_event_percent_mode: str) -> Optional[float]:
+    if parsed.export_type != EXPORT_KM:
+        return parsed.risk1 if cohort_number == 1 else parsed.risk2
+
+    if km_event_percent_mode.startswith("1 - survival"):
+        km_prob = parsed.km_event_probability_end1 if cohort_number == 1 else parsed.km_event_probability_end2
+        if km_prob is not None:
+            return km_prob
+
+    return parsed.risk1 if cohort_number == 1 else parsed.risk2
+
+
+def events_cell(
+    parsed: ParsedOutcome,
+    event_decimals: int,
+    include_symbol: bool,
+    km_event_percent_mode: str,
+) -> str:
+    risk1 = km_probability_for_display(parsed, 1, km_event_percent_mode)
+    risk2 = km_probability_for_display(parsed, 2, km_event_percent_mode)
+    return br_join([
+        f"{format_int(parsed.events1)} ({format_percent_from_proportion(risk1, event_decimals, include_symbol)})",
+        f"{format_int(parsed.events2)} ({format_percent_from_proportion(risk2, event_decimals, include_symbol)})",
+    ])
+
+
+def determine_effect_column_title(effect_labels: List[str]) -> str:
+    unique_labels = {label for label in effect_labels if label}
+    if unique_labels == {"Risk Ratio"}:
+        return "Risk Ratio (95% CI)"
+    if unique_labels == {"Hazard Ratio"}:
+        return "Hazard Ratio (95% CI)"
+    if unique_labels == {"Odds Ratio"}:
+        return "Odds Ratio (95% CI)"
+    return "Risk/Hazard Ratio (95% CI)"
+
+
+# -----------------------------
+# Table construction functions
+# -----------------------------
+
+def build_display_records(
+    parsed_outcomes: List[ParsedOutcome],
+    metadata_df: pd.DataFrame,
+    event_decimals: int,
+    rd_decimals: int,
+    ratio_decimals: int,
+    p_decimals: int,
+    include_percent_symbol_in_events: bool,
+    include_risk_difference: bool,
+    include_odds_ratio: bool,
+    include_detected_type_column: bool,
+    km_event_percent_mode: str,
+    effect_column_title_override: str,
+    prefix_effect_estimates: bool,
+) -> Tuple[List[Dict[str, Any]], List[str], str]:
+    metadata = {}
+    for _, row in metadata_df.iterrows():
+        metadata[str(row["Source key"])] = row.to_dict()
+
+    selected: List[Tuple[int, str, ParsedOutcome, Dict[str, Any]]] = []
+    for parsed in parsed_outcomes:
+        meta = metadata.get(parsed.source_key, {})
+        include = bool(meta.get("Include", True))
+        if not include:
+            continue
+        try:
+            display_order = int(meta.get("Display order", 9999))
+        except Exception:
+            display_order = 9999
+        section = clean_cell(meta.get("Section", ""))
+        selected.append((display_order, section, parsed, meta))
+
+    selected.sort(key=lambda item: (item[0], item[1], item[2].source_file))
+
+    effect_labels = [parsed.effect_measure_label for _, _, parsed, _ in selected]
+    auto_effect_title = determine_effect_column_title(effect_labels)
+    effect_column_title = clean_cell(effect_column_title_override) or auto_effect_title
+
+    records: List[Dict[str, Any]] = []
+    active_section: Optional[str] = None
+
+    unique_effect_labels = {label for label in effect_labels if label}
+    should_prefix = prefix_effect_estimates or len(unique_effect_labels) > 1
+
+    for _, section, parsed, meta in selected:
+        if section and section != active_section:
+            records.append({"_row_type": "section", "Section": section})
+            active_section = section
+
+        outcome_label = clean_cell(meta.get("Outcome", parsed.default_outcome)) or parsed.default_outcome
+        c1_label = clean_cell(meta.get("Cohort 1 label", parsed.cohort1_label)) or parsed.cohort1_label
+        c2_label = clean_cell(meta.get("Cohort 2 label", parsed.cohort2_label)) or parsed.cohort2_label
+
+        record = {
+            "_row_type": "data",
+            "Outcome": escape_cell(outcome_label),
+            "Cohort": br_join([c1_label, c2_label]),
+            "Patients, N": br_join([format_int(parsed.patients1), format_int(parsed.patients2)]),
+            "Events, n (%)": events_cell(
+                parsed=parsed,
+                event_decimals=event_decimals,
+                include_symbol=include_percent_symbol_in_events,
+                km_event_percent_mode=km_event_percent_mode,
+            ),
+            "p Value": escape_cell(format_p_value(parsed.p_value, p_decimals)),
+            effect_column_title: escape_cell(
+                ratio_with_ci(
+                    parsed.effect_value,
+                    parsed.effect_lower,
+                    parsed.effect_upper,
+                    ratio_decimals,
+                    prefix=parsed.effect_measure_abbrev if should_prefix else "",
+                )
+            ),
+        }
+        if include_risk_difference:
+            record["Risk Difference (95% CI)"] = escape_cell(
+                percent_with_ci(
+                    parsed.risk_difference,
+                    parsed.risk_difference_lower,
+                    parsed.risk_difference_upper,
+                    rd_decimals,
+                )
+            )
+        if include_odds_ratio:
+            record["Odds Ratio (95% CI)"] = escape_cell(
+                ratio_with_ci(parsed.odds_ratio, parsed.odds_ratio_lower, parsed.odds_ratio_upper, ratio_decimals)
+            )
+        if include_detected_type_column:
+            record["Detected Table"] = escape_cell(parsed.export_type)
+        records.append(record)
+
+    columns = [
+        "Outcome",
+        "Cohort",
+        "Patients, N",
+        "Events, n (%)",
+    ]
+    if include_risk_difference:
+        columns.append("Risk Difference (95% CI)")
+    columns.extend(["p Value", effect_column_title])
+    if include_odds_ratio:
+        columns.append("Odds Ratio (95% CI)")
+    if include_detected_type_column:
+        columns.append("Detected Table")
+
+    return records, columns, effect_column_title
+
+
+def build_html_table(
+    title: str,
+    records: List[Dict[str, Any]],
+    columns: List[str],
+    font_family: str,
+    font_size_pt: int,
+    table_width_percent: int,
+    show_gridlines: bool,
+    compact_spacing: bool,
+    shade_section_rows: bool,
+) -> str:
+    border = "1px solid #000" if show_gridlines else "none"
+    padding = "4px 6px" if compact_spacing else "7px 8px"
+    section_bg = "#f2f2f2" if shade_section_rows else "#ffffff"
+
+    rows = []
+    for record in records:
+        if record.get("_row_type") == "section":
+            rows.append((True, [escape_cell(record.get("Section", ""))]))
+        else:
+            rows.append((False, [record.get(column, "") for column in columns]))
+
+    return render_template(
+        "outcomes.html",
+        font_family=font_family,
+        font_size_pt=font_size_pt,
+        table_width_percent=table_width_percent,
+        border=border,
+        padding=padding,
+        section_bg=section_bg,
+        title=escape_cell(title) if clean_cell(title) else "",
+        headers=[escape_cell(column) for column in columns],
+        outcome_column=columns.index("Outcome") if "Outcome" in columns else -1,
+        rows=rows,
+    )
+
+
+def build_word_document_html(table_html: str) -> str:
+    """Wrap table HTML in a minimal Word-compatible HTML document."""
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>TriNetX Outcomes Table</title>
+</head>
+<body>
+{table_html}
+</body>
+</html>"""
+
+
+def records_to_plain_dataframe(records: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    plain_rows: List[Dict[str, str]] = []
+    for record in records:
+        if record.get("_row_type") == "section":
+            plain_rows.append({columns[0]: record.get("Section", ""), **{col: "" for col in columns[1:]}})
+        else:
+            plain_record = {}
+            for col in columns:
+                text = str(record.get(col, ""))
+                text = text.replace("<br>", "\n")
+                text = re.sub(r"<[^>]+>", "", text)
+                plain_record[col] = html.unescape(text)
+            plain_rows.append(plain_record)
+    return pd.DataFrame(plain_rows, columns=columns)
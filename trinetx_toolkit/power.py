@@ -0,0 +1,478 @@
+"""
+Cohort statistics ingestion and the vectorized statistics engine for the
+Power & Sample Size page.
+
+The ingestion helpers are kept outside the page script so cached_parse_many()
+can run them in worker processes. The engine computes power, required sample
+size, RR and E-values, and RD and NNT/NNH for whole arrays of findings in one
+pass. Inputs that would have been rejected row by row come back as NaN.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+# Standard normal CDF and quantile; scipy.stats takes seconds to import.
+from scipy.special import ndtr, ndtri
+
+from trinetx_toolkit.sections import SectionIndex, build_section_index, decode_export_bytes, read_text_rows
+
+
+def read_export_index(file_bytes: bytes) -> SectionIndex:
+    """Index a comma- or tab-delimited export."""
+    text = decode_export_bytes(file_bytes)
+    delimiter = "\t" if text.count("\t") > text.count(",") else ","
+    return build_section_index(read_text_rows(text, delimiter=delimiter))
+
+
+def extract_trinetx_stats(index: SectionIndex, label: str = ""):
+    """
+    Reads the first two rows of the Cohort Statistics table.
+    N and Risk are looked up by header, falling back to the usual
+    TriNetX positions (N at col 2, Risk at col 4).
+    """
+    headers, data_rows = index.table("Cohort Statistics")
+    try:
+        n_col = headers.index("Patients in Cohort") if "Patients in Cohort" in headers else 2
+        risk_col = headers.index("Risk") if "Risk" in headers else 4
+        group1, group2 = data_rows[0], data_rows[1]
+        group1_n = int(float(group1[n_col]))
+        group2_n = int(float(group2[n_col]))
+        group1_risk = float(group1[risk_col])
+        group2_risk = float(group2[risk_col])
+        name = label if label else "Outcome"
+        return {
+            "Finding": name,
+            "Group 1 N": group1_n,
+            "Group 2 N": group2_n,
+            "Risk 1": group1_risk,
+            "Risk 2": group2_risk,
+        }
+    except Exception:
+        return None
+
+
+def parse_power_stats(file_bytes: bytes, label: str = ""):
+    return extract_trinetx_stats(read_export_index(file_bytes), label=label)
+
+
+# ----------------------------
+# Vectorized engine
+# ----------------------------
+# Risk differences smaller than this are treated as no difference.
+RISK_DIFF_EPS = 1e-12
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+def _z_alpha(alpha: float, two_sided: bool) -> float:
+    return ndtri(1 - alpha / 2 if two_sided else 1 - alpha)
+
+
+def valid_risks(p: np.ndarray) -> np.ndarray:
+    return (p >= 0) & (p <= 1)
+
+
+def calc_power(n1, n2, p1, p2, alpha=0.05, two_sided=True) -> np.ndarray:
+    """
+    Two-proportion power (pooled SE) for arrays of inputs.
+
+    NaN where an N is not positive or a risk is outside [0, 1]; 0.0 where the
+    risks are equal or the pooled SE is degenerate.
+    """
+    n1, n2, p1, p2 = np.broadcast_arrays(*map(_as_float_array, (n1, n2, p1, p2)))
+    valid = (n1 > 0) & (n2 > 0) & valid_risks(p1) & valid_risks(p2)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        p_bar = (p1 * n1 + p2 * n2) / (n1 + n2)
+        pooled_se = np.sqrt(p_bar * (1 - p_bar) * (1 / n1 + 1 / n2))
+        diff = np.abs(p1 - p2)
+        z_alpha = _z_alpha(alpha, two_sided)
+        z = diff / pooled_se
+        if two_sided:
+            power = ndtr(z - z_alpha) + (1 - ndtr(z + z_alpha))
+        else:
+            power = 1 - ndtr(z_alpha - z)
+    computable = (diff >= RISK_DIFF_EPS) & (pooled_se > 0) & np.isfinite(pooled_se)
+    power = np.where(computable, np.clip(power, 0, 1), 0.0)
+    return np.where(valid, power, np.nan)
+
+
+def calc_sample_size(p1, p2, alpha=0.05, power=0.8, two_sided=True, ratio=1.0):
+    """
+    Required (n1, n2) for a two-proportion test, as float arrays of whole numbers.
+
+    NaN where a risk is outside [0, 1] or the risks are equal. Non-positive
+    or non-finite ratios fall back to 1.
+    """
+    p1, p2, ratio = np.broadcast_arrays(*map(_as_float_array, (p1, p2, ratio)))
+    ratio = np.where((ratio > 0) & np.isfinite(ratio), ratio, 1.0)
+    valid = valid_risks(p1) & valid_risks(p2) & (np.abs(p1 - p2) >= RISK_DIFF_EPS)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        z_alpha = _z_alpha(alpha, two_sided)
+        z_beta = ndtri(power)
+        p_bar = (p1 + p2) / 2
+        q_bar = 1 - p_bar
+        num = (
+            z_alpha * np.sqrt(2 * p_bar * q_bar)
+            + z_beta * np.sqrt(p1 * (1 - p1) + (p2 * (1 - p2) / ratio))
+        ) ** 2
+        denom = (p1 - p2) ** 2
+        n1 = num / denom
+        n2 = n1 * ratio
+    return np.where(valid, np.ceil(n1), np.nan), np.where(valid, np.ceil(n2), np.nan)
+
+
+def e_value_from_rr(rr) -> np.ndarray:
+    """E-value for risk ratios; NaN where the RR is missing, non-finite or not positive."""
+    rr = _as_float_array(rr)
+    valid = np.isfinite(rr) & (rr > 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        rr_use = np.where(rr >= 1, rr, 1.0 / rr)
+        e_value = np.where(rr_use <= 1, 1.0, rr_use + np.sqrt(rr_use * (rr_use - 1.0)))
+    return np.where(valid, e_value, np.nan)
+
+
+def e_value_for_ci_limit(rr, lo, hi) -> np.ndarray:
+    """E-value for the CI limit closest to the null; 1.0 where the CI crosses 1."""
+    rr, lo, hi = np.broadcast_arrays(*map(_as_float_array, (rr, lo, hi)))
+    present = ~(np.isnan(rr) | np.isnan(lo) | np.isnan(hi))
+    crosses_null = (lo <= 1.0) & (1.0 <= hi)
+    limit = np.where(rr >= 1.0, lo, hi)
+    e_value = np.where(crosses_null, 1.0, e_value_from_rr(limit))
+    return np.where(present, e_value, np.nan)
+
+
+def rr_and_ci_from_risks(n_t, n_c, p_t, p_c, alpha=0.05):
+    """
+    RR = p_t / p_c with an approximate Katz/Wald CI on the log scale.
+
+    Uses a small continuity correction when an approximate event count is 0.
+    RR is NaN where undefined (invalid inputs, p_c == 0, p_t == 0); the CI is
+    NaN where the SE is not usable.
+    """
+    n_t, n_c, p_t, p_c = np.broadcast_arrays(*map(_as_float_array, (n_t, n_c, p_t, p_c)))
+    valid = (n_t > 0) & (n_c > 0) & valid_risks(p_t) & valid_risks(p_c) & (p_c != 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        rr = p_t / p_c
+        valid &= (rr > 0) & np.isfinite(rr)
+
+        # Approximate event counts from risks
+        a = p_t * n_t
+        c = p_c * n_c
+        corrected = (a <= 0) | (c <= 0)
+        a = np.where(corrected, np.maximum(a, 0) + 0.5, a)
+        c = np.where(corrected, np.maximum(c, 0) + 0.5, c)
+        n_t_cc = np.where(corrected, n_t + 1.0, n_t)
+        n_c_cc = np.where(corrected, n_c + 1.0, n_c)
+
+        se = np.sqrt((1.0 / a) - (1.0 / n_t_cc) + (1.0 / c) - (1.0 / n_c_cc))
+        has_ci = valid & np.isfinite(se) & (se > 0)
+        z = ndtri(1 - alpha / 2)
+        log_rr = np.log(rr)
+        lo = np.exp(log_rr - z * se)
+        hi = np.exp(log_rr + z * se)
+    return (
+        np.where(valid, rr, np.nan),
+        np.where(has_ci, lo, np.nan),
+        np.where(has_ci, hi, np.nan),
+    )
+
+
+def risk_diff_and_ci(n_t, n_c, p_t, p_c, alpha=0.05):
+    """RD = p_t - p_c with a Wald CI; NaN where the inputs are invalid."""
+    n_t, n_c, p_t, p_c = np.broadcast_arrays(*map(_as_float_array, (n_t, n_c, p_t, p_c)))
+    valid = (n_t > 0) & (n_c > 0) & valid_risks(p_t) & valid_risks(p_c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rd = p_t - p_c
+        se = np.sqrt((p_t * (1 - p_t) / n_t) + (p_c * (1 - p_c) / n_c))
+        has_ci = valid & np.isfinite(se) & (se >= 0)
+        z = ndtri(1 - alpha / 2)
+        lo = rd - z * se
+        hi = rd + z * se
+    return (
+        np.where(valid, rd, np.nan),
+        np.where(has_ci, lo, np.nan),
+        np.where(has_ci, hi, np.nan),
+    )
+
+
+def nnt_nnh_from_rd(rd, rd_lo, rd_hi, outcome_is_adverse=True) -> Dict[str, np.ndarray]:
+    """
+    NNT/NNH from risk differences.
+
+    outcome_is_adverse:
+      True  -> lower risk is better (benefit if RD < 0)
+      False -> higher risk is better (benefit if RD > 0)
+
+    Returns arrays: is_nnt (True for NNT, False for NNH), point (inf when
+    RD ~ 0, NaN when RD is missing), ci_lo/ci_hi (NaN when the effect CI is
+    missing or crosses the null), rd_zero and ci_crosses_null flags.
+    """
+    rd, rd_lo, rd_hi = np.broadcast_arrays(*map(_as_float_array, (rd, rd_lo, rd_hi)))
+    rd_zero = np.abs(rd) < RISK_DIFF_EPS
+
+    # Benefit magnitude (positive means benefit) and its CI
+    sign = -1.0 if outcome_is_adverse else 1.0
+    benefit = sign * rd
+    b_lo, b_hi = (-rd_hi, -rd_lo) if outcome_is_adverse else (rd_lo, rd_hi)
+    is_nnt = benefit > 0
+    eff = np.where(is_nnt, benefit, -benefit)
+    eff_lo = np.where(is_nnt, b_lo, -b_hi)
+    eff_hi = np.where(is_nnt, b_hi, -b_lo)
+    eff_lo, eff_hi = np.minimum(eff_lo, eff_hi), np.maximum(eff_lo, eff_hi)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        point = np.where(eff > 0, 1.0 / eff, np.inf)
+        ci_lo = 1.0 / eff_hi
+        ci_hi = 1.0 / eff_lo
+    point = np.where(rd_zero, np.inf, np.where(np.isnan(rd), np.nan, point))
+    ci_crosses_null = (eff_lo <= 0) & (0 <= eff_hi)
+    has_ci = ~(rd_zero | np.isnan(eff_lo) | np.isnan(eff_hi) | ci_crosses_null)
+    return {
+        "is_nnt": is_nnt,
+        "point": point,
+        "ci_lo": np.where(has_ci, ci_lo, np.nan),
+        "ci_hi": np.where(has_ci, ci_hi, np.nan),
+        "rd_zero": rd_zero,
+        "ci_crosses_null": ci_crosses_null & ~rd_zero,
+    }
+
+
+def compute_power_table(
+    n1,
+    n2,
+    p1,
+    p2,
+    alpha: float = 0.05,
+    power_goal: float = 0.80,
+    two_sided: bool = True,
+    group2_treated: bool = True,
+    outcome_is_adverse: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Every summary statistic for arrays of findings, NaN for invalid rows.
+
+    group2_treated picks the treated/exposed group for RR/E-value and RD/NNT.
+    """
+    n1, n2, p1, p2 = np.broadcast_arrays(*map(_as_float_array, (n1, n2, p1, p2)))
+    invalid_n = ~((n1 > 0) & (n2 > 0))
+    invalid_risk = ~(valid_risks(p1) & valid_risks(p2))
+    valid = ~(invalid_n | invalid_risk)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = n2 / n1
+    est_power = np.where(valid, calc_power(n1, n2, p1, p2, alpha, two_sided), np.nan)
+    req_n1, req_n2 = calc_sample_size(p1, p2, alpha, power_goal, two_sided, ratio)
+
+    # Define treated/exposed vs control to keep RR/E-value and RD/NNT consistent
+    if group2_treated:
+        n_t, n_c, p_t, p_c = n2, n1, p2, p1
+    else:
+        n_t, n_c, p_t, p_c = n1, n2, p1, p2
+
+    rr, rr_lo, rr_hi = rr_and_ci_from_risks(n_t, n_c, p_t, p_c, alpha=alpha)
+    rd, rd_lo, rd_hi = risk_diff_and_ci(n_t, n_c, p_t, p_c, alpha=alpha)
+    nnt = nnt_nnh_from_rd(rd, rd_lo, rd_hi, outcome_is_adverse=outcome_is_adverse)
+
+    with np.errstate(invalid="ignore"):
+        adequate = est_power >= power_goal
+    return {
+        "invalid_n": invalid_n,
+        "invalid_risk": invalid_risk,
+        "valid": valid,
+        "power": est_power,
+        "adequate": adequate & valid,
+        "required_n1": np.where(valid, req_n1, np.nan),
+        "required_n2": np.where(valid, req_n2, np.nan),
+        "rr": np.where(valid, rr, np.nan),
+        "rr_lo": np.where(valid, rr_lo, np.nan),
+        "rr_hi": np.where(valid, rr_hi, np.nan),
+        "e_value": np.where(valid, e_value_from_rr(rr), np.nan),
+        "e_value_ci": np.where(valid, e_value_for_ci_limit(rr, rr_lo, rr_hi), np.nan),
+        "rd": np.where(valid, rd, np.nan),
+        "rd_lo": np.where(valid, rd_lo, np.nan),
+        "rd_hi": np.where(valid, rd_hi, np.nan),
+        **{f"nnt_{key}": value for key, value in nnt.items()},
+    }
+
+
+# ----------------------------
+# Grids for power curves and minimum detectable effects
+# ----------------------------
+def power_by_risk_difference(n_c, n_t, p_c, risk_diffs, alpha=0.05, two_sided=True, increase=True) -> np.ndarray:
+    """
+    Power for each finding (rows) at each absolute risk difference (columns).
+
+    The treated risk is p_c + rd where increase is True and p_c - rd otherwise;
+    NaN where that leaves [0, 1].
+    """
+    n_c, n_t, p_c, increase = (np.reshape(v, (-1, 1)) for v in (n_c, n_t, p_c, increase))
+    rd = _as_float_array(risk_diffs)[None, :]
+    p_t = np.where(increase, p_c + rd, p_c - rd)
+    return calc_power(n_c, n_t, p_c, p_t, alpha, two_sided)
+
+
+def power_by_sample_scale(n_c, n_t, p_c, p_t, scales, alpha=0.05, two_sided=True) -> np.ndarray:
+    """Power for each finding (rows) with both cohorts scaled by each factor (columns)."""
+    n_c, n_t, p_c, p_t = (np.reshape(_as_float_array(v), (-1, 1)) for v in (n_c, n_t, p_c, p_t))
+    scales = _as_float_array(scales)[None, :]
+    return calc_power(np.floor(n_c * scales), np.floor(n_t * scales), p_c, p_t, alpha, two_sided)
+
+
+def required_n_by_risk_difference(p_c, risk_diffs, alpha=0.05, power=0.8, two_sided=True, ratio=1.0, increase=True):
+    """Required (control N, treated N) for each finding (rows) at each risk difference (columns)."""
+    p_c, ratio, increase = (np.reshape(v, (-1, 1)) for v in (p_c, ratio, increase))
+    rd = _as_float_array(risk_diffs)[None, :]
+    p_t = np.where(increase, p_c + rd, p_c - rd)
+    return calc_sample_size(p_c, p_t, alpha, power, two_sided, ratio)
+
+
+def minimum_detectable_effect(n_c, n_t, p_c, alpha=0.05, power=0.8, two_sided=True, increase=True, iterations=50) -> np.ndarray:
+    """
+    Smallest absolute risk difference reaching the target power, by bisection.
+
+    All arguments broadcast against each other, so one call covers a whole
+    grid of findings, sample sizes and alphas. NaN where even the largest
+    possible difference in that direction falls short.
+    """
+    n_c, n_t, p_c, alpha, increase = np.broadcast_arrays(
+        _as_float_array(n_c), _as_float_array(n_t), _as_float_array(p_c), _as_float_array(alpha), np.asarray(increase)
+    )
+    upper = np.where(increase, 1.0 - p_c, p_c)
+
+    def reaches_power(rd):
+        p_t = np.where(increase, p_c + rd, p_c - rd)
+        return calc_power(n_c, n_t, p_c, p_t, alpha, two_sided) >= power
+
+    achievable = reaches_power(upper) & (upper > 0)
+    lo = np.zeros_like(upper)
+    hi = upper.copy()
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        ok = reaches_power(mid)
+        hi = np.where(ok, mid, hi)
+        lo = np.where(ok, lo, mid)
+    return np.where(achievable, hi, np.nan)
+
+
+# ----------------------------
+# Summary table
+# ----------------------------
+def _numeric_column(findings: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in findings.columns:
+        return np.full(len(findings), np.nan)
+    return pd.to_numeric(findings[column], errors="coerce").to_numpy(dtype=float)
+
+
+def _finding_names(findings: pd.DataFrame):
+    if "Finding" not in findings.columns:
+        return [""] * len(findings)
+    return ["Outcome" if name is None else str(name).strip() for name in findings["Finding"].tolist()]
+
+
+def build_power_summary(
+    findings: pd.DataFrame,
+    alpha: float = 0.05,
+    power_goal: float = 0.80,
+    two_sided: bool = True,
+    group2_treated: bool = True,
+    outcome_is_adverse: bool = True,
+) -> pd.DataFrame:
+    """The page's Summary Table for a findings frame (Finding, Group 1/2 N, Risk 1/2)."""
+    if findings.empty:
+        return pd.DataFrame()
+    n1 = np.trunc(_numeric_column(findings, "Group 1 N"))
+    n2 = np.trunc(_numeric_column(findings, "Group 2 N"))
+    p1 = _numeric_column(findings, "Risk 1")
+    p2 = _numeric_column(findings, "Risk 2")
+    # Non-finite N cannot be an integer count, so it is missing.
+    n1[~np.isfinite(n1)] = np.nan
+    n2[~np.isfinite(n2)] = np.nan
+
+    stats = compute_power_table(n1, n2, p1, p2, alpha, power_goal, two_sided, group2_treated, outcome_is_adverse)
+    valid = stats["valid"]
+    na = "N/A"
+
+    def whole(values):
+        return [int(v) if not np.isnan(v) else na for v in values.tolist()]
+
+    def rounded(values, digits, mask=None):
+        mask = ~np.isnan(values) if mask is None else mask
+        return [round(v, digits) if keep else na for v, keep in zip(values.tolist(), mask.tolist())]
+
+    def interval(lo, hi, template):
+        return [
+            f"{template.format(a)}–{template.format(b)}" if not (np.isnan(a) or np.isnan(b)) else na
+            for a, b in zip(lo.tolist(), hi.tolist())
+        ]
+
+    def nnt_text(is_nnt, point, rd_zero):
+        if rd_zero:
+            label = "NNT/NNH"
+        else:
+            label = "NNT" if is_nnt else "NNH"
+        if np.isnan(point):
+            return "NNT/NNH = ∞"
+        return f"{label} = {point:.1f}" if np.isfinite(point) else f"{label} = ∞"
+
+    def nnt_ci_text(row_valid, rd_zero, crosses_null, lo, hi):
+        if not row_valid:
+            return na
+        if rd_zero:
+            return "RD≈0 → ∞"
+        if crosses_null:
+            return "CI crosses null"
+        if np.isnan(lo) or np.isnan(hi):
+            return na
+        return f"{lo:.1f}–{hi:.1f}"
+
+    notes = [
+        "; ".join(note for note, flag in (("Invalid N", bad_n), ("Invalid risk", bad_risk)) if flag)
+        for bad_n, bad_risk in zip(stats["invalid_n"].tolist(), stats["invalid_risk"].tolist())
+    ]
+    adequacy = [
+        na if not ok else ("✅ Adequate" if adequate else "❌ Not Adequate")
+        for ok, adequate in zip(valid.tolist(), stats["adequate"].tolist())
+    ]
+    # Risks are echoed whenever they parse, even when out of range.
+    risk_mask_1 = ~np.isnan(p1)
+    risk_mask_2 = ~np.isnan(p2)
+
+    return pd.DataFrame(
+        {
+            "Finding": _finding_names(findings),
+            "Group 1 N": whole(n1),
+            "Group 2 N": whole(n2),
+            "Risk 1": rounded(p1, 4, risk_mask_1),
+            "Risk 2": rounded(p2, 4, risk_mask_2),
+            "Estimated Power": rounded(stats["power"], 3),
+            "Required N1": whole(stats["required_n1"]),
+            "Required N2": whole(stats["required_n2"]),
+            "Adequacy": adequacy,
+            "RR (treated/control)": rounded(stats["rr"], 3),
+            "RR 95% CI": interval(stats["rr_lo"], stats["rr_hi"], "{:.3f}"),
+            "E-value (point)": rounded(stats["e_value"], 2),
+            "E-value (CI)": rounded(stats["e_value_ci"], 2),
+            "Risk Difference (T-C)": rounded(stats["rd"], 4),
+            "RD 95% CI": interval(stats["rd_lo"], stats["rd_hi"], "{:.4f}"),
+            "NNT/NNH": [
+                nnt_text(is_nnt, point, rd_zero)
+                for is_nnt, point, rd_zero in zip(
+                    stats["nnt_is_nnt"].tolist(), stats["nnt_point"].tolist(), stats["nnt_rd_zero"].tolist()
+                )
+            ],
+            "NNT/NNH 95% CI": [
+                nnt_ci_text(*row)
+                for row in zip(
+                    valid.tolist(),
+                    stats["nnt_rd_zero"].tolist(),
+                    stats["nnt_ci_crosses_null"].tolist(),
+                    stats["nnt_ci_lo"].tolist(),
+                    stats["nnt_ci_hi"].tolist(),
+                )
+            ],
+            "Notes": notes,
+        }
+    )
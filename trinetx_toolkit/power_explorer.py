@@ -0,0 +1,233 @@
+"""
+Power curves and minimum-detectable-effect surfaces for the Power page.
+
+Every finding is evaluated across dense grids of risk difference, sample size
+and alpha in one vectorized call per grid (see trinetx_toolkit.power). Kept
+apart from power.py so parse workers do not import Matplotlib.
+"""
+
+from dataclasses import dataclass
+from typing import List
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from trinetx_toolkit.power import (
+    minimum_detectable_effect,
+    power_by_risk_difference,
+    power_by_sample_scale,
+    required_n_by_risk_difference,
+    valid_risks,
+)
+
+RD_POINTS = 200
+SCALE_POINTS = 61
+HEATMAP_POINTS = 25
+MAX_LEGEND_ENTRIES = 12
+MAX_HEATMAP_LABELS = 40
+
+HEATMAP_AXES = {
+    "Sample size": "Cohort size (× observed)",
+    "Alpha": "Significance level (alpha)",
+}
+
+
+@dataclass
+class ExplorerFindings:
+    """Valid findings oriented as control vs treated/exposed."""
+
+    names: List[str]
+    n_c: np.ndarray
+    n_t: np.ndarray
+    p_c: np.ndarray
+    p_t: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def increase(self) -> np.ndarray:
+        """Direction of the observed effect; ties count as an increase."""
+        return self.p_t >= self.p_c
+
+    @property
+    def observed_rd(self) -> np.ndarray:
+        return np.abs(self.p_t - self.p_c)
+
+
+def explorer_findings(findings: pd.DataFrame, group2_treated: bool = True) -> ExplorerFindings:
+    """Findings with positive N and risks in [0, 1], in table order."""
+    def column(name):
+        if name not in findings.columns:
+            return np.full(len(findings), np.nan)
+        return pd.to_numeric(findings[name], errors="coerce").to_numpy(dtype=float)
+
+    n1, n2 = np.trunc(column("Group 1 N")), np.trunc(column("Group 2 N"))
+    p1, p2 = column("Risk 1"), column("Risk 2")
+    valid = np.isfinite(n1) & np.isfinite(n2) & (n1 > 0) & (n2 > 0) & valid_risks(p1) & valid_risks(p2)
+    if "Finding" in findings.columns:
+        names = ["Outcome" if name is None else str(name).strip() for name in findings["Finding"].tolist()]
+    else:
+        names = [f"Finding {i + 1}" for i in range(len(findings))]
+    names = [name for name, ok in zip(names, valid.tolist()) if ok]
+    if group2_treated:
+        return ExplorerFindings(names, n1[valid], n2[valid], p1[valid], p2[valid])
+    return ExplorerFindings(names, n2[valid], n1[valid], p2[valid], p1[valid])
+
+
+# =========================
+# Grids
+# =========================
+def risk_difference_grid(findings: ExplorerFindings, max_rd: float = 0.0, points: int = RD_POINTS) -> np.ndarray:
+    """0..max_rd; by default twice the largest observed difference, at least 0.05."""
+    if max_rd <= 0:
+        largest = float(findings.observed_rd.max()) if len(findings) else 0.0
+        max_rd = max(0.05, 2 * largest)
+    return np.linspace(0.0, max_rd, points)
+
+
+def sample_scale_grid(low: float = 0.25, high: float = 4.0, points: int = SCALE_POINTS) -> np.ndarray:
+    return np.geomspace(low, high, points)
+
+
+def alpha_grid(low: float = 0.001, high: float = 0.2, points: int = HEATMAP_POINTS) -> np.ndarray:
+    return np.geomspace(low, high, points)
+
+
+def mde_surface(
+    findings: ExplorerFindings,
+    axis: str,
+    values: np.ndarray,
+    alpha: float = 0.05,
+    power_goal: float = 0.80,
+    two_sided: bool = True,
+) -> np.ndarray:
+    """Minimum detectable |RD| for each finding (rows) along a sample-size or alpha grid (columns)."""
+    values = np.asarray(values, dtype=float)[None, :]
+    n_c, n_t, p_c = (v[:, None] for v in (findings.n_c, findings.n_t, findings.p_c))
+    increase = findings.increase[:, None]
+    if axis == "Sample size":
+        return minimum_detectable_effect(
+            np.floor(n_c * values), np.floor(n_t * values), p_c, alpha, power_goal, two_sided, increase
+        )
+    return minimum_detectable_effect(n_c, n_t, p_c, values, power_goal, two_sided, increase)
+
+
+def power_grid_table(
+    findings: ExplorerFindings,
+    risk_diffs: np.ndarray,
+    alphas: np.ndarray,
+    two_sided: bool = True,
+) -> pd.DataFrame:
+    """Long table of power at observed N for every finding × alpha × risk difference."""
+    alphas = np.asarray(alphas, dtype=float)
+    risk_diffs = np.asarray(risk_diffs, dtype=float)
+    power = np.stack(
+        [power_by_risk_difference(findings.n_c, findings.n_t, findings.p_c, risk_diffs, a, two_sided, findings.increase) for a in alphas],
+        axis=1,
+    )
+    n_findings = len(findings)
+    return pd.DataFrame(
+        {
+            "Finding": np.repeat(findings.names, len(alphas) * len(risk_diffs)),
+            "Control N": np.repeat(findings.n_c, len(alphas) * len(risk_diffs)).astype(int),
+            "Treated N": np.repeat(findings.n_t, len(alphas) * len(risk_diffs)).astype(int),
+            "Control Risk": np.repeat(findings.p_c, len(alphas) * len(risk_diffs)),
+            "Alpha": np.tile(np.repeat(alphas, len(risk_diffs)), n_findings),
+            "Absolute Risk Difference": np.tile(risk_diffs, n_findings * len(alphas)),
+            "Power": power.reshape(-1),
+        }
+    )
+
+
+# =========================
+# Plots
+# =========================
+def plot_power_curves(
+    findings: ExplorerFindings,
+    risk_diffs: np.ndarray,
+    scales: np.ndarray,
+    alpha: float = 0.05,
+    power_goal: float = 0.80,
+    two_sided: bool = True,
+    fig_width: float = 15,
+    fig_height: float = 4.8,
+    font_size: int = 10,
+):
+    """Power vs |RD| at observed N, power vs cohort size at observed risks, and required N vs |RD|."""
+    power_rd = power_by_risk_difference(findings.n_c, findings.n_t, findings.p_c, risk_diffs, alpha, two_sided, findings.increase)
+    power_n = power_by_sample_scale(findings.n_c, findings.n_t, findings.p_c, findings.p_t, scales, alpha, two_sided)
+    ratio = findings.n_t / findings.n_c
+    required_c, _ = required_n_by_risk_difference(findings.p_c, risk_diffs, alpha, power_goal, two_sided, ratio, findings.increase)
+
+    fig, axes = plt.subplots(1, 3, figsize=(fig_width, fig_height))
+    ax_rd, ax_n, ax_req = axes
+    colors = plt.cm.tab10(np.arange(len(findings)) % 10)
+    for idx, name in enumerate(findings.names):
+        label = name if len(findings) <= MAX_LEGEND_ENTRIES else None
+        ax_rd.plot(risk_diffs, power_rd[idx], color=colors[idx], linewidth=1.4, label=label)
+        ax_rd.plot(findings.observed_rd[idx], np.interp(findings.observed_rd[idx], risk_diffs, power_rd[idx]), "o", color=colors[idx], markersize=4)
+        ax_n.plot(scales * findings.n_c[idx], power_n[idx], color=colors[idx], linewidth=1.4, label=label)
+        ax_n.axvline(findings.n_c[idx], color=colors[idx], linewidth=0.6, linestyle=":")
+        ax_req.plot(risk_diffs[1:], required_c[idx, 1:], color=colors[idx], linewidth=1.4, label=label)
+
+    for ax in (ax_rd, ax_n):
+        ax.axhline(power_goal, color="gray", linestyle="--", linewidth=1)
+        ax.set_ylim(0, 1.02)
+        ax.set_ylabel("Power", fontsize=font_size)
+    ax_rd.set_xlabel("Absolute risk difference (at observed N)", fontsize=font_size)
+    ax_n.set_xscale("log")
+    ax_n.set_xlabel("Control cohort N (at observed risks)", fontsize=font_size)
+    ax_req.set_yscale("log")
+    ax_req.set_xlabel("Absolute risk difference", fontsize=font_size)
+    ax_req.set_ylabel(f"Control N for {power_goal:.0%} power", fontsize=font_size)
+
+    ax_rd.set_title("Power curve by effect size", fontsize=font_size + 1)
+    ax_n.set_title("Power curve by sample size", fontsize=font_size + 1)
+    ax_req.set_title("Required sample size", fontsize=font_size + 1)
+    for ax in axes:
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis="both", labelsize=font_size - 1)
+    if len(findings) <= MAX_LEGEND_ENTRIES:
+        ax_rd.legend(fontsize=font_size - 1)
+    fig.suptitle(f"alpha = {alpha:g}, {'two' if two_sided else 'one'}-sided", fontsize=font_size)
+    fig.tight_layout()
+    return fig
+
+
+def plot_mde_heatmap(
+    findings: ExplorerFindings,
+    mde: np.ndarray,
+    axis: str,
+    values: np.ndarray,
+    power_goal: float = 0.80,
+    fig_width: float = 10,
+    font_size: int = 10,
+    cmap: str = "viridis_r",
+):
+    """Findings (rows) × grid (columns), colored by minimum detectable |RD|."""
+    n_rows = len(findings)
+    fig_height = min(0.3 * n_rows, 24) + 2
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+    masked = np.ma.masked_invalid(mde)
+    image = ax.imshow(masked, aspect="auto", cmap=cmap, interpolation="nearest")
+    colorbar = fig.colorbar(image, ax=ax)
+    colorbar.set_label(f"Minimum detectable |RD| at {power_goal:.0%} power", fontsize=font_size)
+
+    tick_idx = np.unique(np.linspace(0, len(values) - 1, min(len(values), 9)).round().astype(int))
+    if axis == "Sample size":
+        tick_labels = [f"{values[i]:.2g}×" for i in tick_idx]
+    else:
+        tick_labels = [f"{values[i]:.3g}" for i in tick_idx]
+    ax.set_xticks(tick_idx)
+    ax.set_xticklabels(tick_labels, fontsize=font_size - 1)
+    ax.set_xlabel(HEATMAP_AXES[axis], fontsize=font_size)
+    if n_rows <= MAX_HEATMAP_LABELS:
+        ax.set_yticks(np.arange(n_rows))
+        ax.set_yticklabels(findings.names, fontsize=font_size - 1)
+    else:
+        ax.set_ylabel(f"{n_rows} findings", fontsize=font_size)
+    ax.set_title("Minimum detectable effect", fontsize=font_size + 1)
+    fig.tight_layout()
+    return fig
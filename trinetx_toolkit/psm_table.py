@@ -0,0 +1,664 @@
+"""
+Journal-style Table 1 from a TriNetX Baseline Patient Characteristics export.
+
+Reads the baseline CSV, builds the before/after propensity score matching
+rows, and renders them as HTML, a plain export table, or a Word document.
+Used by the PSM Table Generator page and the batch CLI.
+"""
+
+import csv
+import html
+import io
+import re
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from trinetx_toolkit.html_tables import escape_cell, escape_column, render_template, table_rows
+from trinetx_toolkit.lazy import module_available
+
+# python-docx is imported by the DOCX writer itself, only when it runs.
+DOCX_AVAILABLE = module_available("docx")
+
+
+REQUIRED_COLUMNS = [
+    "Characteristic ID",
+    "Characteristic Name",
+    "Category",
+    "Cohort 1 Before: Patient Count",
+    "Cohort 1 Before: % of Cohort",
+    "Cohort 2 Before: Patient Count",
+    "Cohort 2 Before: % of Cohort",
+    "Before: Standardized Mean Difference",
+    "Cohort 1 After: Patient Count",
+    "Cohort 1 After: % of Cohort",
+    "Cohort 2 After: Patient Count",
+    "Cohort 2 After: % of Cohort",
+    "After: Standardized Mean Difference",
+]
+
+DEMOGRAPHIC_IDS = {"AI", "M", "F", "2106-3", "2054-5", "2135-2", "2028-9"}
+DEMOGRAPHIC_ORDER = {
+    "AI": 10,
+    "M": 20,
+    "F": 30,
+    "2106-3": 40,  # White
+    "2054-5": 50,  # Black or African American
+    "2135-2": 60,  # Hispanic or Latino
+    "2028-9": 70,  # Asian
+}
+
+LAB_ORDER = {
+    "9083": 10,  # BMI
+    "9002": 20,  # LDL Cholesterol
+    "9004": 30,  # Triglycerides
+}
+
+MEDICATION_ORDER = {
+    "CV300": 10,  # Antiarrhythmics
+    "CV100": 20,  # Beta Blockers
+    "CV700": 30,  # Diuretics
+    "CV800": 40,  # ACE Inhibitors
+    "CV200": 50,  # Calcium Channel Blockers
+    "CV805": 60,  # Angiotensin II Inhibitors
+}
+
+SECTION_ORDER = {
+    "Demographics": 1,
+    "Diagnoses": 2,
+    "Labs": 3,
+    "Medications": 4,
+    "Other": 5,
+}
+
+SECTION_IDENTIFIER_LABEL = {
+    "Demographics": "Identifier Code",
+    "Diagnoses": "ICD-10",
+    "Labs": "LOINC",
+    "Medications": "",
+    "Other": "Identifier Code",
+}
+
+NAME_REPLACEMENTS = {
+    "ANTIARRHYTHMICS": "Antiarrhythmics",
+    "BETA BLOCKERS/RELATED": "Beta Blockers",
+    "DIURETICS": "Diuretics",
+    "ACE INHIBITORS": "ACE Inhibitors",
+    "CALCIUM CHANNEL BLOCKERS": "Calcium Channel Blockers",
+    "ANGIOTENSIN II INHIBITOR": "Angiotensin II Inhibitors",
+    "Triglyceride [Mass/volume] in Serum, Plasma or Blood": "Triglycerides",
+    "Cholesterol in LDL [Mass/volume] in Serum or Plasma": "LDL Cholesterol",
+}
+
+
+def decode_uploaded_file(uploaded_file) -> str:
+    """Decode a TriNetX CSV upload, tolerating common encodings."""
+    raw_bytes = uploaded_file.getvalue()
+    for encoding in ("utf-8-sig", "utf-8", "latin-1"):
+        try:
+            return raw_bytes.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw_bytes.decode("utf-8", errors="replace")
+
+
+def find_header_row(lines: List[str]) -> Optional[int]:
+    """Find the TriNetX header row even when the export contains title/note rows."""
+    for i, line in enumerate(lines[:75]):
+        try:
+            cols = [c.strip() for c in next(csv.reader([line]))]
+        except Exception:
+            continue
+        if {"Characteristic ID", "Characteristic Name", "Category"}.issubset(set(cols)):
+            return i
+    return None
+
+
+def read_trinetx_baseline_csv(uploaded_file) -> pd.DataFrame:
+    """Read a Baseline Patient Characteristics CSV exported by TriNetX."""
+    content = decode_uploaded_file(uploaded_file)
+    lines = content.splitlines()
+    header_row = find_header_row(lines)
+
+    if header_row is None:
+        raise ValueError(
+            "Could not find the TriNetX header row. The file must contain "
+            "'Characteristic ID', 'Characteristic Name', and 'Category'."
+        )
+
+    df = pd.read_csv(io.StringIO("\n".join(lines[header_row:])))
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.dropna(how="all").reset_index(drop=True)
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError("The file is missing required columns: " + ", ".join(missing))
+
+    for col in df.columns:
+        if col not in ["Characteristic ID", "Characteristic Name", "Category"]:
+            df[col] = pd.to_numeric(
+                df[col].astype(str).str.replace("%", "", regex=False).str.replace(",", "", regex=False),
+                errors="coerce",
+            )
+    return df
+
+
+def safe_str(value) -> str:
+    if pd.isna(value):
+        return ""
+    return str(value).strip()
+
+
+def as_float(value) -> Optional[float]:
+    if value is None or pd.isna(value):
+        return None
+    try:
+        if isinstance(value, str):
+            value = value.replace("%", "").replace(",", "").strip()
+            if not value:
+                return None
+        return float(value)
+    except Exception:
+        return None
+
+
+# Table 1 exports run to thousands of characteristic rows, so rows are
+# classified, sorted, and formatted a column at a time rather than per row.
+MEAN_SD_COLUMNS = [
+    "Cohort 1 Before: Mean",
+    "Cohort 1 Before: SD",
+    "Cohort 2 Before: Mean",
+    "Cohort 2 Before: SD",
+    "Cohort 1 After: Mean",
+    "Cohort 1 After: SD",
+    "Cohort 2 After: Mean",
+    "Cohort 2 After: SD",
+]
+
+
+def text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """safe_str() of every value; blank when the column is missing."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[column]
+    return values.astype(object).map(str).str.strip().where(values.notna(), "")
+
+
+def numeric_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """as_float() of every value, NaN where missing or unparseable."""
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    values = df[column]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    return values.map(as_float).astype(float)
+
+
+def _format_numbers(values: pd.Series, fmt: str) -> pd.Series:
+    """fmt applied to each present value; blank where missing."""
+    present = values.notna()
+    return values[present].map(fmt.format).reindex(values.index, fill_value="").astype(object)
+
+
+def format_count_percent(df: pd.DataFrame, phase: str, cohort: int, pct_decimals: int) -> pd.Series:
+    """"n (pct%)" per row, or whichever of the two is present."""
+    # Python's round() is half-to-even, as is Series.round(); + 0.0 turns -0.0 into 0.0.
+    counts = numeric_column(df, f"Cohort {cohort} {phase}: Patient Count").round() + 0.0
+    count = _format_numbers(counts, "{:,.0f}")
+    pct = _format_numbers(numeric_column(df, f"Cohort {cohort} {phase}: % of Cohort"), f"{{:.{pct_decimals}f}}%")
+    has_count, has_pct = count != "", pct != ""
+    combined = count.where(has_count, pct)
+    return combined.mask(has_count & has_pct, count + " (" + pct + ")")
+
+
+def format_mean_sd(df: pd.DataFrame, phase: str, cohort: int, mean_decimals: int) -> pd.Series:
+    fmt = f"{{:.{mean_decimals}f}}"
+    mean = _format_numbers(numeric_column(df, f"Cohort {cohort} {phase}: Mean"), fmt)
+    sd = _format_numbers(numeric_column(df, f"Cohort {cohort} {phase}: SD"), fmt)
+    return (mean + " (±" + sd + ")").where((mean != "") & (sd != ""), "")
+
+
+def format_smd(values: pd.Series, decimals: int, dynamic: bool = True) -> pd.Series:
+    if not dynamic:
+        return _format_numbers(values, f"{{:.{decimals}f}}")
+    # Matches the usual Table 1 convention: larger imbalances are easier to scan,
+    # very small post-match imbalances retain three decimals.
+    large = values.abs() >= 0.10
+    return _format_numbers(values.where(large), "{:.2f}").where(large, _format_numbers(values.where(~large), "{:.3f}"))
+
+
+def format_p_value(values: pd.Series) -> pd.Series:
+    return _format_numbers(values, "{:.3f}").mask(values < 0.001, "p<.001")
+
+
+def has_mean_sd(df: pd.DataFrame) -> pd.Series:
+    present = pd.Series(False, index=df.index)
+    for column in MEAN_SD_COLUMNS:
+        present |= numeric_column(df, column).notna()
+    return present
+
+
+def clean_name(name: str, clean_labels: bool = True) -> str:
+    name = safe_str(name)
+    if not clean_labels:
+        return name
+
+    if name in NAME_REPLACEMENTS:
+        return NAME_REPLACEMENTS[name]
+
+    if name.isupper() and any(ch.isalpha() for ch in name):
+        name = name.title()
+        name = (
+            name.replace("Ace ", "ACE ")
+            .replace("Ii ", "II ")
+            .replace("Ldl", "LDL")
+            .replace("Bmi", "BMI")
+        )
+    return name
+
+
+def clean_category(category: str, simplify_open_ended_lab_bins: bool = True) -> str:
+    category = safe_str(category)
+    if not category:
+        return ""
+
+    if simplify_open_ended_lab_bins:
+        # TriNetX often exports high lab categories as "151-500 mg/dL" or "101-500 mg/dL";
+        # journal tables are typically clearer when the upper cap is rendered as "+".
+        category = re.sub(r"^(\d+)-500\s+(mg/dL)$", r"\1+ \2", category)
+
+    return category.replace("m2", "m²")
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    """func over the distinct values only; names and lab bins repeat heavily."""
+    unique = pd.unique(values)
+    return values.map(dict(zip(unique, (func(v) for v in unique))))
+
+
+def infer_sections(codes: pd.Series, names: pd.Series) -> pd.Series:
+    """Table 1 section for each row from its characteristic ID and name."""
+    section = np.select(
+        [
+            codes.isin(DEMOGRAPHIC_IDS),
+            codes.str.upper().str.startswith("CV"),
+            codes.str.fullmatch(r"\d+"),
+            names.str.isupper() & (codes != "") & ~codes.str[:1].str.isdigit(),
+            codes != "",
+        ],
+        ["Demographics", "Medications", "Labs", "Medications", "Diagnoses"],
+        default="Other",
+    )
+    return pd.Series(section, index=codes.index, dtype=object)
+
+
+def make_display_labels(
+    codes: pd.Series,
+    names: pd.Series,
+    categories: pd.Series,
+    continuous: pd.Series,
+    clean_labels: bool,
+    simplify_open_ended_lab_bins: bool,
+) -> pd.Series:
+    names = _map_unique(names, lambda name: clean_name(name, clean_labels))
+    categories = _map_unique(categories, lambda category: clean_category(category, simplify_open_ended_lab_bins))
+    labels = names.mask(continuous, names + ", mean (SD)")
+    labels = labels.mask(categories != "", names + " (" + categories + ")")
+    return labels.mask(codes == "AI", "Age at Index, mean (SD)")
+
+
+def sort_order(sections: pd.Series, codes: pd.Series, original_index: np.ndarray) -> np.ndarray:
+    """
+    Positions that order rows by section, the curated order within it, then
+    the original row index.
+    """
+    within = original_index + 100
+    for section, order, lookup in (
+        ("Demographics", DEMOGRAPHIC_ORDER, codes),
+        ("Labs", LAB_ORDER, codes),
+        ("Medications", MEDICATION_ORDER, codes.str.upper()),
+    ):
+        curated = lookup.map(order).to_numpy(dtype=float)
+        within = np.where((sections == section).to_numpy() & ~np.isnan(curated), curated, within)
+    section_rank = sections.map(SECTION_ORDER).fillna(99).to_numpy(dtype=np.int64)
+    return np.lexsort((original_index, within.astype(np.int64), section_rank))
+
+
+def build_publication_rows(
+    raw_df: pd.DataFrame,
+    cohort_1_label: str,
+    cohort_2_label: str,
+    pct_decimals: int,
+    mean_decimals: int,
+    smd_decimals: int,
+    dynamic_smd_decimals: bool,
+    include_p_values: bool,
+    clean_labels: bool,
+    simplify_open_ended_lab_bins: bool,
+    exclude_aggregate_lab_rows: bool,
+    blank_repeated_lab_codes: bool,
+) -> pd.DataFrame:
+    original_index = np.asarray([int(label) for label in raw_df.index], dtype=np.int64)
+    raw_df = raw_df.reset_index(drop=True)
+    codes = text_column(raw_df, "Characteristic ID")
+    sections = infer_sections(codes, text_column(raw_df, "Characteristic Name"))
+    continuous = (text_column(raw_df, "Category") == "") & has_mean_sd(raw_df)
+
+    # Age at Index is part of the target Table 1. Aggregate lab rows are often excluded
+    # when the table uses clinically meaningful bins instead.
+    include = ~(continuous & (codes != "AI") & exclude_aggregate_lab_rows & (sections == "Labs"))
+    working_df = raw_df[include]
+    if working_df.empty:
+        return pd.DataFrame()
+    order = sort_order(sections[include], codes[include], original_index[include.to_numpy()])
+    working_df = working_df.iloc[order]
+    codes = codes[working_df.index]
+    sections = sections[working_df.index]
+    continuous = continuous[working_df.index]
+
+    display_codes = codes
+    if blank_repeated_lab_codes:
+        labs = sections == "Labs"
+        previous_lab_code = codes[labs].shift().reindex(codes.index)
+        display_codes = codes.mask(labs & (codes == previous_lab_code), "")
+
+    cells = {}
+    for phase in ("Before", "After"):
+        for cohort, label in ((1, cohort_1_label), (2, cohort_2_label)):
+            cells[f"{phase}: {label}"] = format_mean_sd(working_df, phase, cohort, mean_decimals).where(
+                continuous, format_count_percent(working_df, phase, cohort, pct_decimals)
+            )
+        cells[f"{phase}: SMD"] = format_smd(
+            numeric_column(working_df, f"{phase}: Standardized Mean Difference"),
+            smd_decimals,
+            dynamic_smd_decimals,
+        )
+
+    data_df = pd.DataFrame(
+        {
+            "Include": True,
+            "Order": 0,
+            "Row Type": "data",
+            "Section": sections,
+            "Characteristic": make_display_labels(
+                codes,
+                text_column(working_df, "Characteristic Name"),
+                text_column(working_df, "Category"),
+                continuous,
+                clean_labels,
+                simplify_open_ended_lab_bins,
+            ),
+            "Identifier Code": display_codes,
+            "Before: " + cohort_1_label: cells["Before: " + cohort_1_label],
+            "Before: " + cohort_2_label: cells["Before: " + cohort_2_label],
+            "Before: SMD": cells["Before: SMD"],
+            "After: " + cohort_1_label: cells["After: " + cohort_1_label],
+            "After: " + cohort_2_label: cells["After: " + cohort_2_label],
+            "After: SMD": cells["After: SMD"],
+            "Before: p-Value": format_p_value(numeric_column(working_df, "Before: p-Value")),
+            "After: p-Value": format_p_value(numeric_column(working_df, "After: p-Value")),
+        },
+        index=working_df.index,
+    )
+
+    # Sections are contiguous after sorting; each gets a group header row.
+    blocks = []
+    for section in pd.unique(sections):
+        header = {column: "" for column in data_df.columns}
+        header.update(
+            {
+                "Include": True,
+                "Row Type": "group",
+                "Section": section,
+                "Characteristic": section,
+                "Identifier Code": SECTION_IDENTIFIER_LABEL.get(section, "Identifier Code"),
+            }
+        )
+        blocks.append(pd.DataFrame([header], columns=data_df.columns))
+        blocks.append(data_df[sections == section])
+
+    table_df = pd.concat(blocks, ignore_index=True)
+    table_df["Order"] = np.arange(1, len(table_df) + 1)
+
+    if not include_p_values:
+        table_df = table_df.drop(columns=["Before: p-Value", "After: p-Value"], errors="ignore")
+
+    return table_df
+
+
+def display_columns(table_df: pd.DataFrame) -> List[str]:
+    hidden = {"Include", "Order", "Row Type", "Section"}
+    return [c for c in table_df.columns if c not in hidden]
+
+
+def phase_headers(cohort_1_label: str, cohort_2_label: str, include_p_values: bool) -> List[str]:
+    """Second header row under each of the Before and After spans."""
+    headers = [cohort_1_label + " (%)", cohort_2_label + " (%)", "SMD"]
+    if include_p_values:
+        headers.append("p-Value")
+    return headers + headers
+
+
+def value_columns(cohort_1_label: str, cohort_2_label: str, include_p_values: bool) -> List[str]:
+    """Table columns shown under the Before and After spans, in order."""
+    columns = []
+    for phase in ("Before", "After"):
+        columns += [f"{phase}: {cohort_1_label}", f"{phase}: {cohort_2_label}", f"{phase}: SMD"]
+        if include_p_values:
+            columns.append(f"{phase}: p-Value")
+    return columns
+
+
+def included_rows(table_df: pd.DataFrame) -> pd.DataFrame:
+    if "Include" not in table_df.columns:
+        return table_df
+    return table_df[table_df["Include"].astype(bool)]
+
+
+def make_html_table(
+    table_df: pd.DataFrame,
+    table_title: str,
+    cohort_1_label: str,
+    cohort_2_label: str,
+    font_size: int,
+    include_p_values: bool,
+    table_width_percent: int,
+) -> str:
+    display_df = included_rows(table_df)
+    is_group = text_column(display_df, "Row Type") == "group"
+    cells = [escape_column(display_df, "Characteristic"), escape_column(display_df, "Identifier Code")]
+    cells += [
+        escape_column(display_df, name).mask(is_group, "")
+        for name in value_columns(cohort_1_label, cohort_2_label, include_p_values)
+    ]
+
+    span = 4 if include_p_values else 3
+    return render_template(
+        "table1.html",
+        table_width_percent=table_width_percent,
+        font_size=font_size,
+        title=html.escape(table_title) if table_title else "",
+        before_span=span,
+        after_span=span,
+        headers=[escape_cell(h) for h in phase_headers(cohort_1_label, cohort_2_label, include_p_values)],
+        rows=list(zip(is_group.tolist(), table_rows(cells))),
+    )
+
+
+def make_plain_export_df(
+    table_df: pd.DataFrame,
+    cohort_1_label: str,
+    cohort_2_label: str,
+    include_p_values: bool,
+) -> pd.DataFrame:
+    rows = []
+    for _, row in table_df.iterrows():
+        if not bool(row.get("Include", True)):
+            continue
+
+        export_row = {
+            "Characteristic": row.get("Characteristic", ""),
+            "Identifier Code": row.get("Identifier Code", ""),
+            "Before Propensity Score Matching - " + cohort_1_label: row.get("Before: " + cohort_1_label, ""),
+            "Before Propensity Score Matching - " + cohort_2_label: row.get("Before: " + cohort_2_label, ""),
+            "Before Propensity Score Matching - SMD": row.get("Before: SMD", ""),
+            "After Propensity Score Matching - " + cohort_1_label: row.get("After: " + cohort_1_label, ""),
+            "After Propensity Score Matching - " + cohort_2_label: row.get("After: " + cohort_2_label, ""),
+            "After Propensity Score Matching - SMD": row.get("After: SMD", ""),
+        }
+        if include_p_values:
+            export_row["Before Propensity Score Matching - p-Value"] = row.get("Before: p-Value", "")
+            export_row["After Propensity Score Matching - p-Value"] = row.get("After: p-Value", "")
+        rows.append(export_row)
+
+    return pd.DataFrame(rows)
+
+
+DOCX_HEADER_FILL = "F2F2F2"
+DOCX_GROUP_FILL = "E8E8E8"
+WORDML_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+EMU_PER_TWIP = 635
+
+# Characters XML 1.0 cannot carry; python-docx rejects them as well.
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _docx_run_text(text: str) -> str:
+    """Run content for text; tabs and line breaks become w:tab / w:br, as in python-docx."""
+    content = []
+    for piece in re.split(r"(\t|\r\n|\n|\r)", text):
+        if piece == "\t":
+            content.append("<w:tab/>")
+        elif piece in ("\r\n", "\n", "\r"):
+            content.append("<w:br/>")
+        elif piece:
+            content.append(f'<w:t xml:space="preserve">{html.escape(piece, quote=False)}</w:t>')
+    return "".join(content)
+
+
+def _docx_cell(text, width: int, bold: bool, font_size: int, fill: Optional[str] = None, span: int = 1) -> str:
+    """One w:tc, vertically centered, holding a single run of text."""
+    props = f'<w:tcW w:type="dxa" w:w="{width * span}"/>'
+    if span > 1:
+        props += f'<w:gridSpan w:val="{span}"/>'
+    if fill:
+        props += f'<w:shd w:val="clear" w:color="auto" w:fill="{fill}"/>'
+    props += '<w:vAlign w:val="center"/>'
+    run_props = ("<w:b/>" if bold else '<w:b w:val="0"/>') + f'<w:sz w:val="{round(font_size * 2)}"/>'
+    content = _docx_run_text(_XML_INVALID_CHARS.sub("", safe_str(text)))
+    return f"<w:tc><w:tcPr>{props}</w:tcPr><w:p><w:r><w:rPr>{run_props}</w:rPr>{content}</w:r></w:p></w:tc>"
+
+
+def make_docx_table_xml(
+    table_df: pd.DataFrame,
+    cohort_1_label: str,
+    cohort_2_label: str,
+    include_p_values: bool,
+    font_size: int,
+    col_width: int,
+) -> str:
+    """
+    The Table 1 w:tbl element as one XML string, written a row at a time from
+    the table's columns. col_width is in twips.
+    """
+    before_span = 4 if include_p_values else 3
+    after_span = 4 if include_p_values else 3
+    n_cols = 2 + before_span + after_span
+
+    parts = [
+        f'<w:tbl xmlns:w="{WORDML_NAMESPACE}">',
+        '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/><w:jc w:val="center"/>'
+        '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="1" w:lastColumn="0" '
+        'w:noHBand="0" w:noVBand="1"/></w:tblPr>',
+        "<w:tblGrid>" + f'<w:gridCol w:w="{col_width}"/>' * n_cols + "</w:tblGrid>",
+    ]
+
+    # Header row 1
+    parts.append(
+        "<w:tr>"
+        + _docx_cell("", col_width, True, font_size)
+        + _docx_cell("", col_width, True, font_size)
+        + _docx_cell("Before Propensity Score Matching", col_width, True, font_size, span=before_span)
+        + _docx_cell("After Propensity Score Matching", col_width, True, font_size, span=after_span)
+        + "</w:tr>"
+    )
+
+    # Header row 2
+    headers = ["", ""] + phase_headers(cohort_1_label, cohort_2_label, include_p_values)
+    parts.append(
+        "<w:tr>" + "".join(_docx_cell(h, col_width, True, font_size, DOCX_HEADER_FILL) for h in headers) + "</w:tr>"
+    )
+
+    # Data rows
+    display_df = included_rows(table_df)
+    columns = value_columns(cohort_1_label, cohort_2_label, include_p_values)
+
+    def column(name: str) -> list:
+        if name not in display_df.columns:
+            return [""] * len(display_df)
+        return display_df[name].tolist()
+
+    is_group = [safe_str(v) == "group" for v in column("Row Type")]
+    value_lists = [column(name) for name in columns]
+    for i, (group, label, code) in enumerate(zip(is_group, column("Characteristic"), column("Identifier Code"))):
+        if group:
+            cells = [label, code] + [""] * len(columns)
+            fill = DOCX_GROUP_FILL
+        else:
+            cells = [label, code] + [values[i] for values in value_lists]
+            fill = None
+        parts.append("<w:tr>" + "".join(_docx_cell(c, col_width, group, font_size, fill) for c in cells) + "</w:tr>")
+
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def make_docx_bytes(
+    table_df: pd.DataFrame,
+    table_title: str,
+    cohort_1_label: str,
+    cohort_2_label: str,
+    include_p_values: bool,
+    font_size: int,
+) -> bytes:
+    if not DOCX_AVAILABLE:
+        raise RuntimeError("python-docx is not installed.")
+
+    from docx import Document
+    from docx.enum.section import WD_ORIENT
+    from docx.oxml import parse_xml
+    from docx.shared import Inches, Pt
+
+    document = Document()
+    section = document.sections[0]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width, section.page_height = section.page_height, section.page_width
+    section.top_margin = Inches(0.5)
+    section.bottom_margin = Inches(0.5)
+    section.left_margin = Inches(0.5)
+    section.right_margin = Inches(0.5)
+
+    if table_title:
+        p = document.add_paragraph()
+        run = p.add_run(table_title)
+        run.bold = True
+        run.font.size = Pt(10)
+
+    # Columns share the text width evenly, as document.add_table() would size them.
+    n_cols = 2 + 2 * (4 if include_p_values else 3)
+    text_width = section.page_width - section.left_margin - section.right_margin
+    col_width = round(text_width // n_cols / EMU_PER_TWIP)
+
+    table = parse_xml(
+        make_docx_table_xml(table_df, cohort_1_label, cohort_2_label, include_p_values, font_size, col_width)
+    )
+    body = document.element.body
+    if body.sectPr is not None:
+        body.sectPr.addprevious(table)
+    else:
+        body.append(table)
+
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
@@ -0,0 +1,240 @@
+"""
+Single-pass section index for TriNetX exports.
+
+MOA, Kaplan-Meier, and graph exports are stacked tables separated by one-cell
+section labels such as "Cohort Statistics", "Risk Ratio", or "Log-Rank Test".
+build_section_index() walks the rows once and records where each section's
+label, header row, and data rows are, so the pages can look sections up
+instead of rescanning the whole file for every label they need.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+SECTION_LABELS = [
+    "Notes",
+    "Cohort Statistics",
+    "Risk Difference",
+    "Risk Ratio",
+    "Odds Ratio",
+    "Hazard Ratio",
+    "Log-Rank Test",
+    "Proportionality",
+    "Graph Data Table",
+    "Summary",
+]
+
+GENERATED_BY_LABEL = "Generated by TriNetX"
+
+
+def clean_cell(value: Any) -> str:
+    """Return a stripped string with BOMs and stray quotes removed."""
+    if value is None:
+        return ""
+    return str(value).replace("\ufeff", "").strip().strip('"').strip()
+
+
+def section_key(label: Any) -> str:
+    """Normalize a section label so 'Log-Rank Test' and 'log rank test' match."""
+    return re.sub(r"[^a-z0-9]+", "", clean_cell(label).lower())
+
+
+KNOWN_SECTION_KEYS = {section_key(label) for label in SECTION_LABELS}
+
+
+def decode_export_bytes(file_bytes: bytes) -> str:
+    """Decode an uploaded export, tolerating common encodings."""
+    for encoding in ("utf-8-sig", "utf-8", "latin-1"):
+        try:
+            return file_bytes.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return file_bytes.decode("utf-8", errors="replace")
+
+
+def read_text_rows(text: str, delimiter: str = ",") -> List[List[str]]:
+    """Tokenize export text into cleaned rows without assuming a rectangular table."""
+    return [[clean_cell(cell) for cell in row] for row in csv.reader(io.StringIO(text), delimiter=delimiter)]
+
+
+def read_csv_rows(file_bytes: bytes) -> List[List[str]]:
+    return read_text_rows(decode_export_bytes(file_bytes))
+
+
+def iter_excel_sheets(file_bytes: bytes, clean: bool = True) -> Iterator[Tuple[str, Iterator[List[Any]]]]:
+    """
+    Yield (sheet name, cleaned rows) for each worksheet, opening the workbook once.
+
+    .xlsx files stream through openpyxl's read-only mode, so rows are produced
+    as the sheet XML is read and a sheet's rows can be abandoned early. The
+    stored <dimension> tag is ignored, as pd.read_excel ignores it: some
+    writers leave it stale, and trusting it truncates the sheet.
+    Legacy .xls files go through pandas. With clean=False rows hold the raw
+    cell values, None for empty cells.
+    """
+    if not zipfile.is_zipfile(io.BytesIO(file_bytes)):
+        sheets = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None, header=None, dtype=object)
+        for name, raw in sheets.items():
+            rows = raw.astype(object).where(raw.notna(), None).values.tolist()
+            yield name, ([clean_cell(cell) for cell in row] if clean else row for row in rows)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            yield sheet.title, ([clean_cell(cell) for cell in row] if clean else list(row) for row in rows)
+    finally:
+        workbook.close()
+
+
+def read_excel_sheets(file_bytes: bytes) -> Dict[str, List[List[str]]]:
+    """Cleaned rows of every worksheet, from a single read of the workbook."""
+    return {name: list(rows) for name, rows in iter_excel_sheets(file_bytes)}
+
+
+def read_first_excel_sheet(file_bytes: bytes, clean: bool = True) -> List[List[Any]]:
+    """Rows of the first worksheet, the one pd.read_excel reads by default."""
+    sheets = iter_excel_sheets(file_bytes, clean=clean)
+    try:
+        for _, rows in sheets:
+            return list(rows)
+        return []
+    finally:
+        sheets.close()
+
+
+@dataclass
+class Section:
+    """Row positions of one labelled section inside an export."""
+
+    label: str
+    label_row: int
+    # First non-blank row after the label, normally the column headers.
+    header_row: Optional[int] = None
+    # Exclusive end of the contiguous data rows under the header.
+    data_stop: Optional[int] = None
+    # Exclusive end of the section: the next section label or the end of file.
+    end_row: Optional[int] = None
+
+
+class SectionIndex:
+    """Section label → row positions, built in a single pass over the rows."""
+
+    def __init__(self, rows: List[List[str]]):
+        self.rows = rows
+        self.sections: Dict[str, Section] = {}
+        self.title = ""
+        self.generated_by_trinetx = False
+        self._build()
+
+    def _build(self) -> None:
+        current: Optional[Section] = None
+        for idx, row in enumerate(self.rows):
+            nonblank = [cell for cell in row if cell]
+            if not nonblank:
+                if current is not None and current.header_row is not None and current.data_stop is None:
+                    current.data_stop = idx
+                continue
+
+            first = nonblank[0]
+            if first == GENERATED_BY_LABEL:
+                self.generated_by_trinetx = True
+            elif not self.title and idx < 8:
+                self.title = first
+
+            key = section_key(first)
+            if len(nonblank) == 1 and key in KNOWN_SECTION_KEYS:
+                if current is not None:
+                    self._close(current, idx)
+                current = Section(label=first, label_row=idx)
+                # Keep the first occurrence, matching the old linear scans.
+                self.sections.setdefault(key, current)
+                continue
+
+            if current is not None and current.header_row is None:
+                current.header_row = idx
+
+        if current is not None:
+            self._close(current, len(self.rows))
+
+    @staticmethod
+    def _close(section: Section, stop: int) -> None:
+        section.end_row = stop
+        if section.header_row is not None and section.data_stop is None:
+            section.data_stop = stop
+
+    def __contains__(self, label: str) -> bool:
+        return section_key(label) in self.sections
+
+    def get(self, label: str) -> Optional[Section]:
+        return self.sections.get(section_key(label))
+
+    @property
+    def keys(self) -> List[str]:
+        """Normalized keys of every section present, in file order."""
+        return list(self.sections)
+
+    def table(self, label: str) -> Tuple[List[str], List[List[str]]]:
+        """Return the header row and contiguous data rows under a section label."""
+        section = self.get(label)
+        if section is None or section.header_row is None:
+            return [], []
+        headers = list(self.rows[section.header_row])
+        data_rows = [list(row) for row in self.rows[section.header_row + 1:section.data_stop]]
+        return headers, data_rows
+
+    def frame(self, label: str) -> Optional[pd.DataFrame]:
+        """Return a section table as a string DataFrame, or None when the label is absent."""
+        headers, data_rows = self.table(label)
+        if not headers:
+            return None
+        width = max([len(headers)] + [len(row) for row in data_rows])
+        columns = [
+            headers[i] if i < len(headers) and headers[i] else f"Unnamed: {i}"
+            for i in range(width)
+        ]
+        padded = [row + [""] * (width - len(row)) for row in data_rows]
+        return pd.DataFrame(padded, columns=columns)
+
+    def window(self, label: str, max_span: Optional[int] = None) -> List[List[str]]:
+        """Return every non-blank row between a section label and the next label."""
+        section = self.get(label)
+        if section is None:
+            return []
+        stop = section.end_row
+        if max_span is not None:
+            stop = min(stop, section.label_row + 1 + max_span)
+        return [row for row in self.rows[section.label_row + 1:stop] if any(row)]
+
+
+def build_section_index(rows: List[List[str]]) -> SectionIndex:
+    return SectionIndex(rows)
+
+
+def index_export_bytes(file_bytes: bytes) -> SectionIndex:
+    """Decode, tokenize, and index a CSV export in one pass."""
+    return SectionIndex(read_csv_rows(file_bytes))
+
+
+def index_excel_bytes(file_bytes: bytes) -> List[SectionIndex]:
+    """One section index per worksheet, from a single read of the workbook."""
+    return [SectionIndex(rows) for rows in read_excel_sheets(file_bytes).values()]
+
+
+def first_frame(indexes: List[SectionIndex], label: str) -> Optional[pd.DataFrame]:
+    """The section table from the first index (worksheet) that has the label."""
+    for index in indexes:
+        if label in index:
+            return index.frame(label)
+    return None
@@ -0,0 +1,198 @@
+"""
+Cold-start benchmark: per-page import and first-run time.
+
+Each page script runs in a fresh interpreter through Streamlit's AppTest with
+no uploads, as on a new worker's first load. Streamlit is imported before the
+clock starts, since the server already has it loaded. The first run minus a
+second, warm run approximates what the page spends importing; the heavy
+packages the page pulled in are listed next to it.
+
+    python -m trinetx_toolkit.startup
+    python -m trinetx_toolkit.startup --only Kaplan --repeat 5 --json startup.json
+    python -m trinetx_toolkit.startup --baseline startup.json   # exit 1 on regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Reported when a page loads them; Streamlit's own imports are excluded.
+HEAVY_PACKAGES = (
+    "docx",
+    "lifelines",
+    "matplotlib",
+    "openpyxl",
+    "plotly",
+    "scipy",
+    "st_aggrid",
+    "statsmodels",
+)
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_TOLERANCE = 0.25
+
+
+@dataclass
+class StartupResult:
+    page: str
+    cold_seconds: float
+    warm_seconds: float
+    import_seconds: float
+    modules_loaded: int
+    heavy_packages: List[str]
+    error: str = ""
+
+
+def discover_pages(root: Path = REPO_ROOT) -> List[Path]:
+    """Home.py followed by pages/ in Streamlit's sidebar order."""
+    def order(path: Path):
+        match = re.match(r"(\d+)", path.name)
+        return (int(match.group(1)) if match else float("inf"), path.name)
+
+    home = [root / "Home.py"] if (root / "Home.py").exists() else []
+    return home + sorted((root / "pages").glob("*.py"), key=order)
+
+
+# =========================
+# Measurement
+# =========================
+def _run_page(path: str, timeout: float) -> Dict[str, Any]:
+    """Child side: time a cold and a warm run of one page in this interpreter."""
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    from streamlit.testing.v1 import AppTest
+
+    before = set(sys.modules)
+    app = AppTest.from_file(path, default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    cold = time.perf_counter() - start
+    loaded = set(sys.modules) - before
+    start = time.perf_counter()
+    app.run()
+    warm = time.perf_counter() - start
+    return {
+        "cold": cold,
+        "warm": warm,
+        "modules": len(loaded),
+        "heavy": sorted({name.split(".")[0] for name in loaded} & set(HEAVY_PACKAGES)),
+        "error": "; ".join(str(e.value) for e in app.exception),
+    }
+
+
+def measure_page(page: Path, repeat: int = 1, timeout: float = DEFAULT_TIMEOUT) -> StartupResult:
+    """Fastest cold start over repeat fresh interpreters."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH", "")]))
+    env.setdefault("MPLBACKEND", "Agg")
+    best = None
+    for _ in range(max(1, repeat)):
+        proc = subprocess.run(
+            [sys.executable, "-m", "trinetx_toolkit.startup", "--child", str(page), "--timeout", str(timeout)],
+            cwd=REPO_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return StartupResult(page.stem, 0.0, 0.0, 0.0, 0, [], lines[-1] if lines else f"exit {proc.returncode}")
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or run["cold"] < best["cold"]:
+            best = run
+    return StartupResult(
+        page=page.stem,
+        cold_seconds=round(best["cold"], 4),
+        warm_seconds=round(best["warm"], 4),
+        import_seconds=round(max(best["cold"] - best["warm"], 0.0), 4),
+        modules_loaded=best["modules"],
+        heavy_packages=best["heavy"],
+        error=best["error"],
+    )
+
+
+def find_regressions(results: List[StartupResult], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    previous = {row["page"]: row for row in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result.page)
+        if before is None:
+            continue
+        if result.cold_seconds > before["cold_seconds"] * (1 + tolerance) + 0.05:
+            regressions.append(f"{result.page}: cold {before['cold_seconds']:.3f}s -> {result.cold_seconds:.3f}s")
+        added = sorted(set(result.heavy_packages) - set(before["heavy_packages"]))
+        if added:
+            regressions.append(f"{result.page}: now imports {', '.join(added)}")
+    return regressions
+
+
+def format_results(results: List[StartupResult]) -> str:
+    lines = [f"{'page':<44} {'cold s':>7} {'warm s':>7} {'import s':>8} {'modules':>7}  heavy packages"]
+    for r in results:
+        heavy = f"ERROR {r.error}" if r.error else ", ".join(r.heavy_packages) or "-"
+        lines.append(
+            f"{r.page[:44]:<44} {r.cold_seconds:>7.3f} {r.warm_seconds:>7.3f} "
+            f"{r.import_seconds:>8.3f} {r.modules_loaded:>7}  {heavy}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m trinetx_toolkit.startup",
+        description="Measure each page's cold-start import time in a fresh interpreter.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Fresh interpreters per page; the fastest is reported.")
+    parser.add_argument("--only", default="", help="Run only pages whose file name contains this text.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--json", type=Path, default=None, help="Write the report to this file.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier --json report to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.child:
+        print(json.dumps(_run_page(args.child, args.timeout)))
+        return 0
+
+    pages = [page for page in discover_pages() if args.only in page.name]
+    print(format_results([]))
+    results = []
+    for page in pages:
+        result = measure_page(page, args.repeat, args.timeout)
+        results.append(result)
+        print(format_results([result]).splitlines()[-1], flush=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [asdict(r) for r in results],
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
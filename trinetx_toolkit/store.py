@@ -0,0 +1,70 @@
+"""
+Session-wide store of parsed TriNetX outcome exports.
+
+The Home page loads MOA and Kaplan-Meier exports once into this store as
+ParsedOutcome records. The Forest, Outcomes Table, Bar Graph, Power, and
+Multiple Comparisons pages read the same records, so a file is uploaded and
+parsed once per session and outcome labels edited on the Home page carry over
+to every tool.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import streamlit as st
+
+from trinetx_toolkit.ingest import ParseJob, cached_parse_many
+from trinetx_toolkit.outcomes import ParsedOutcome, parse_outcome_bytes
+
+STORE_KEY = "trinetx_outcome_store"
+
+
+def parse_outcome_uploads(uploaded_files: List[Any]) -> Tuple[List[ParsedOutcome], List[str]]:
+    """Parse uploads in upload order, in parallel for large batches, collecting one error per failed file."""
+    jobs = [ParseJob(f.getvalue(), (f.name,), (f.name,)) for f in uploaded_files]
+    parsed_outcomes: List[ParsedOutcome] = []
+    errors: List[str] = []
+    for uploaded_file, (parsed, error) in zip(uploaded_files, cached_parse_many(jobs, "parsed-outcome", parse_outcome_bytes)):
+        if error is None:
+            parsed_outcomes.append(parsed)
+        else:
+            errors.append(f"Could not parse {uploaded_file.name}: {error}")
+    return parsed_outcomes, errors
+
+
+def get_outcome_store() -> Dict[str, ParsedOutcome]:
+    """Return the store for this session, keyed by ParsedOutcome.source_key."""
+    if STORE_KEY not in st.session_state:
+        st.session_state[STORE_KEY] = {}
+    return st.session_state[STORE_KEY]
+
+
+def stored_outcomes() -> List[ParsedOutcome]:
+    return list(get_outcome_store().values())
+
+
+def replace_stored_outcomes(parsed_outcomes: List[ParsedOutcome]) -> None:
+    st.session_state[STORE_KEY] = {parsed.source_key: parsed for parsed in parsed_outcomes}
+
+
+def clear_outcome_store() -> None:
+    st.session_state[STORE_KEY] = {}
+
+
+def set_outcome_label(source_key: str, label: str) -> None:
+    """Rename an outcome everywhere it is read from the store."""
+    store = get_outcome_store()
+    if source_key in store and label:
+        store[source_key].default_outcome = label
+
+
+def use_stored_outcomes(key: str, label: str = "Use the outcome files loaded on the Home page") -> bool:
+    """
+    Offer the stored records to a tool page.
+
+    Returns True when the store is populated and the user keeps the checkbox
+    ticked, in which case the page should skip its own upload step.
+    """
+    records = stored_outcomes()
+    if not records:
+        return False
+    return st.checkbox(f"{label} ({len(records)} file(s))", value=True, key=key)
@@ -0,0 +1,407 @@
+"""
+Synthetic TriNetX exports for benchmarking and parser regression checks.
+
+Generates Measures of Association, Kaplan-Meier summary, Kaplan-Meier curve,
+and Baseline Patient Characteristics exports at any scale, deterministically
+for a given seed. Effect-estimate sections can be written in each layout the
+parsers tolerate (see LAYOUT_VARIANTS), and any export can be wrapped as an
+.xlsx workbook.
+
+    python -m trinetx_toolkit.synthetic OUT_DIR --outcomes 200 --covariates 5000 --days 3650
+"""
+
+import argparse
+import csv
+import io
+import math
+import random
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# standard:     "Risk Ratio","95 % CI Lower","95 % CI Upper" with numeric cells
+# combined_ci:  one "95% CI" cell such as "(0.60–0.95)" and p written as "<.001"
+# split_ci:     a "95% CI" header whose value was split at its comma into two cells
+# p_label:      p moved to a separate "p-value" row under the estimate
+# bom_crlf:     standard layout with a UTF-8 BOM and Windows line endings
+# tab:          standard layout, tab-delimited (read by the Power page only)
+# Ratio sections in the non-standard layouts also carry a p value, as
+# hand-edited or re-exported tables often do.
+LAYOUT_VARIANTS = ("standard", "combined_ci", "split_ci", "p_label", "bom_crlf", "tab")
+
+COHORT_NAMES = ("Statin users", "Control")
+
+DEMOGRAPHICS = [
+    ("M", "Male"),
+    ("F", "Female"),
+    ("2106-3", "White"),
+    ("2054-5", "Black or African American"),
+    ("2135-2", "Hispanic or Latino"),
+    ("2028-9", "Asian"),
+]
+
+LABS = [
+    ("9083", "BMI", ["<18.5 kg/m2", "18.5-24.9 kg/m2", "25-29.9 kg/m2", ">=30 kg/m2"]),
+    ("9002", "Cholesterol in LDL [Mass/volume] in Serum or Plasma", ["<100 mg/dL", "100-159 mg/dL", "160-500 mg/dL"]),
+    ("9004", "Triglyceride [Mass/volume] in Serum, Plasma or Blood", ["<150 mg/dL", "150-199 mg/dL", "200-500 mg/dL"]),
+]
+
+MEDICATIONS = [
+    ("CV300", "ANTIARRHYTHMICS"),
+    ("CV100", "BETA BLOCKERS/RELATED"),
+    ("CV700", "DIURETICS"),
+    ("CV800", "ACE INHIBITORS"),
+    ("CV200", "CALCIUM CHANNEL BLOCKERS"),
+    ("CV805", "ANGIOTENSIN II INHIBITOR"),
+]
+
+KM_CURVE_HEADER = [
+    "Time (Days)",
+    "Cohort 1: Survival Probability",
+    "Cohort 1: Survival Probability 95 % CI Lower",
+    "Cohort 1: Survival Probability 95 % CI Upper",
+    "Cohort 2: Survival Probability",
+    "Cohort 2: Survival Probability 95 % CI Lower",
+    "Cohort 2: Survival Probability 95 % CI Upper",
+]
+
+
+# =========================
+# Writers
+# =========================
+def rows_to_text(rows: Sequence[Sequence[str]], delimiter: str = ",", quote_all: bool = True, line_end: str = "\n") -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(
+        buffer,
+        delimiter=delimiter,
+        quoting=csv.QUOTE_ALL if quote_all else csv.QUOTE_MINIMAL,
+        lineterminator=line_end,
+    )
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def text_to_xlsx_bytes(text: str, delimiter: str = ",", stale_dimension: bool = False) -> bytes:
+    """
+    Wrap an export in a one-sheet workbook, one CSV cell per Excel cell.
+
+    With stale_dimension=True the sheet's <dimension> tag is rewritten to
+    ref="A1", as some exporters leave it, so readers that trust the tag only
+    see the first cell.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+        sheet.append([cell for cell in row])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    if not stale_dimension:
+        return buffer.getvalue()
+
+    stale = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as source, zipfile.ZipFile(stale, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet"):
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', data, count=1)
+            target.writestr(item, data)
+    return stale.getvalue()
+
+
+def fmt(value: float, decimals: int = 4) -> str:
+    return f"{value:.{decimals}f}"
+
+
+def fmt_p(value: float) -> str:
+    return f"{value:.6f}" if value >= 1e-6 else f"{value:.2e}"
+
+
+# =========================
+# Export builders
+# =========================
+def _ratio_ci(estimate: float, se: float) -> tuple:
+    return estimate * math.exp(-1.96 * se), estimate * math.exp(1.96 * se)
+
+
+def _ratio_p(variant: str, p_value: float) -> Optional[float]:
+    return None if variant in {"standard", "bom_crlf", "tab"} else p_value
+
+
+def _p_from_z(z: float) -> float:
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def effect_section(label: str, estimate: float, lower: float, upper: float, p_value: Optional[float], variant: str) -> List[List[str]]:
+    """One effect-estimate section in the requested layout variant."""
+    rows = [[label]]
+    if variant == "combined_ci":
+        headers, values = [label, "95% CI"], [fmt(estimate), f"({lower:.2f}–{upper:.2f})"]
+        if p_value is not None:
+            headers.append("p")
+            values.append("<.001" if p_value < 0.001 else f"{p_value:.3f}".lstrip("0"))
+        return rows + [headers, values, [" "]]
+    if variant == "split_ci":
+        headers, values = [label, "95% CI"], [fmt(estimate), fmt(lower), fmt(upper)]
+        if p_value is not None:
+            headers += ["z", "p"]
+            values += [fmt(math.log(estimate) / max((math.log(upper) - math.log(lower)) / 3.92, 1e-9), 3), fmt_p(p_value)]
+        return rows + [headers, values, [" "]]
+
+    headers, values = [label, "95 % CI Lower", "95 % CI Upper"], [fmt(estimate), fmt(lower), fmt(upper)]
+    if variant == "p_label":
+        rows += [headers, values]
+        if p_value is not None:
+            rows.append(["p-value", fmt_p(p_value)])
+        return rows + [[" "]]
+    if p_value is not None:
+        headers.append("p")
+        values.append(fmt_p(p_value))
+    return rows + [headers, values, [" "]]
+
+
+def _cohort_counts(rng: random.Random, base_risk: float, ratio: float) -> tuple:
+    n1 = rng.randint(2_000, 200_000)
+    n2 = int(n1 * rng.uniform(0.95, 1.05))
+    risk2 = base_risk
+    risk1 = min(0.95, risk2 * ratio)
+    e1 = max(1, int(round(n1 * risk1)))
+    e2 = max(1, int(round(n2 * risk2)))
+    return n1, e1, n2, e2
+
+
+def moa_rows(outcome: str, rng: random.Random, variant: str = "standard") -> List[List[str]]:
+    ratio = math.exp(rng.gauss(0, 0.25))
+    n1, e1, n2, e2 = _cohort_counts(rng, rng.uniform(0.005, 0.2), ratio)
+    r1, r2 = e1 / n1, e2 / n2
+    rd = r1 - r2
+    rd_se = math.sqrt(r1 * (1 - r1) / n1 + r2 * (1 - r2) / n2)
+    rd_p = _p_from_z(rd / rd_se)
+    rr = r1 / r2
+    rr_se = math.sqrt(1 / e1 - 1 / n1 + 1 / e2 - 1 / n2)
+    odds = (e1 / (n1 - e1)) / (e2 / (n2 - e2))
+    or_se = math.sqrt(1 / e1 + 1 / (n1 - e1) + 1 / e2 + 1 / (n2 - e2))
+
+    rows = [
+        [f"{outcome} Measures of Association Table"],
+        ["Generated by TriNetX"],
+        [" "],
+        ["Notes"],
+        [f"Cohort 1: {COHORT_NAMES[0]}"],
+        [f"Cohort 2: {COHORT_NAMES[1]}"],
+        [" "],
+        ["Cohort Statistics"],
+        ["Cohort", "Cohort Name", "Patients in Cohort", "Patients with Outcome", "Risk"],
+        ["1", COHORT_NAMES[0], str(n1), str(e1), fmt(r1, 6)],
+        ["2", COHORT_NAMES[1], str(n2), str(e2), fmt(r2, 6)],
+        [" "],
+        ["Risk Difference"],
+        ["Risk Difference", "95 % CI Lower", "95 % CI Upper", "z", "p"],
+        [fmt(rd, 6), fmt(rd - 1.96 * rd_se, 6), fmt(rd + 1.96 * rd_se, 6), fmt(rd / rd_se, 3), fmt_p(rd_p)],
+        [" "],
+    ]
+    rows += effect_section("Risk Ratio", rr, *_ratio_ci(rr, rr_se), _ratio_p(variant, rd_p), variant)
+    rows += effect_section("Odds Ratio", odds, *_ratio_ci(odds, or_se), _ratio_p(variant, rd_p), variant)
+    return rows
+
+
+def km_summary_rows(outcome: str, rng: random.Random, variant: str = "standard") -> List[List[str]]:
+    hr = math.exp(rng.gauss(0, 0.25))
+    n1, e1, n2, e2 = _cohort_counts(rng, rng.uniform(0.01, 0.15), hr)
+    hr_se = math.sqrt(1 / e1 + 1 / e2)
+    chi2 = (math.log(hr) / hr_se) ** 2
+    log_rank_p = _p_from_z(math.sqrt(chi2))
+    rows = [
+        [f"{outcome} Kaplan-Meier Table"],
+        ["Generated by TriNetX"],
+        [" "],
+        ["Cohort Statistics"],
+        ["Cohort", "Cohort Name", "Patients in Cohort", "Patients with Outcome", "Median Survival (Days)", "Survival Probability at End of Time Window"],
+        ["1", COHORT_NAMES[0], str(n1), str(e1), "", fmt(1 - e1 / n1)],
+        ["2", COHORT_NAMES[1], str(n2), str(e2), "", fmt(1 - e2 / n2)],
+        [" "],
+        ["Log-Rank Test"],
+        ["χ2", "df", "p"],
+        [fmt(chi2, 3), "1", fmt_p(log_rank_p)],
+        [" "],
+    ]
+    rows += effect_section("Hazard Ratio", hr, *_ratio_ci(hr, hr_se), _ratio_p(variant, log_rank_p), variant)
+    ph_chi2 = rng.uniform(0, 4)
+    rows += [["Proportionality"], ["χ2", "df", "p"], [fmt(ph_chi2, 3), "1", fmt_p(_p_from_z(math.sqrt(ph_chi2)))]]
+    return rows
+
+
+def km_curve_text(n_days: int, rng: random.Random, event_rate: float = 0.05) -> str:
+    """
+    A survival curve export n_days long. As in real exports, rows between
+    event days are blank apart from the time column.
+    """
+    out = [rows_to_text([["Kaplan-Meier Survival Curve"], ["Generated by TriNetX"], [" "], KM_CURVE_HEADER])]
+    out.append("0,1.0000,0.9900,1.0000,1.0000,0.9900,1.0000\n")
+    survival = [1.0, 1.0]
+    hazards = [0.2 / max(n_days, 1) * rng.uniform(0.6, 1.0), 0.2 / max(n_days, 1) * rng.uniform(1.0, 1.4)]
+    for day in range(1, n_days + 1):
+        cells = [str(day)]
+        for cohort in (0, 1):
+            if rng.random() < event_rate:
+                survival[cohort] *= math.exp(-hazards[cohort] / event_rate)
+                s = survival[cohort]
+                half_width = 0.01 + 0.02 * (1 - s)
+                cells += [fmt(s), fmt(max(0.0, s - half_width)), fmt(min(1.0, s + half_width))]
+            else:
+                cells += ["", "", ""]
+        out.append(",".join(cells) + "\n")
+    return "".join(out)
+
+
+def _baseline_row(code: str, name: str, category: str, rng: random.Random, continuous: bool) -> List[str]:
+    cells = [code, name, category]
+    for phase, imbalance in (("Before", rng.gauss(0, 0.15)), ("After", rng.gauss(0, 0.02))):
+        n1 = rng.randint(500, 50_000)
+        n2 = int(n1 * rng.uniform(0.7, 1.3)) if phase == "Before" else n1
+        pct = rng.uniform(1, 60)
+        for cohort, count in ((1, n1), (2, n2)):
+            cohort_pct = pct if cohort == 1 else max(0.01, pct * (1 - imbalance))
+            cells += [str(count), fmt(cohort_pct, 3)]
+            if continuous:
+                cells += [fmt(rng.uniform(40, 70), 2), fmt(rng.uniform(8, 15), 2)]
+            else:
+                cells += ["", ""]
+        cells += [fmt_p(rng.random()), fmt(imbalance, 6)]
+    return cells
+
+
+def baseline_text(n_covariates: int, rng: random.Random) -> str:
+    """A Baseline Patient Characteristics export with n_covariates rows."""
+    header = ["Characteristic ID", "Characteristic Name", "Category"]
+    for phase in ("Before", "After"):
+        for cohort in (1, 2):
+            header += [
+                f"Cohort {cohort} {phase}: Patient Count",
+                f"Cohort {cohort} {phase}: % of Cohort",
+                f"Cohort {cohort} {phase}: Mean",
+                f"Cohort {cohort} {phase}: SD",
+            ]
+        header += [f"{phase}: p-Value", f"{phase}: Standardized Mean Difference"]
+
+    rows = [_baseline_row("AI", "Age at Index", "", rng, continuous=True)]
+    rows += [_baseline_row(code, name, "", rng, continuous=False) for code, name in DEMOGRAPHICS]
+    for code, name, bins in LABS:
+        rows.append(_baseline_row(code, name, "", rng, continuous=True))
+        rows += [_baseline_row(code, name, category, rng, continuous=False) for category in bins]
+    rows += [_baseline_row(code, name, "", rng, continuous=False) for code, name in MEDICATIONS]
+
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    while len(rows) < n_covariates:
+        idx = len(rows)
+        code = f"{letters[idx % 26]}{(idx // 26) % 100:02d}.{idx % 10}"
+        rows.append(_baseline_row(code, f"Synthetic diagnosis {idx}", "", rng, continuous=False))
+
+    preamble = rows_to_text([["Baseline Patient Characteristics"], ["Generated by TriNetX"], [" "]])
+    return preamble + rows_to_text([header] + rows[:max(n_covariates, 1)], quote_all=False)
+
+
+def render_variant(rows: List[List[str]], variant: str) -> bytes:
+    if variant == "tab":
+        return rows_to_text(rows, delimiter="\t").encode("utf-8")
+    if variant == "bom_crlf":
+        return ("\ufeff" + rows_to_text(rows, line_end="\r\n")).encode("utf-8")
+    return rows_to_text(rows).encode("utf-8")
+
+
+# =========================
+# Export sets
+# =========================
+def generate_exports(
+    n_outcomes: int = 20,
+    n_covariates: int = 500,
+    n_days: int = 3650,
+    seed: int = 0,
+    variants: Sequence[str] = ("standard",),
+    xlsx_every: int = 0,
+) -> Dict[str, bytes]:
+    """
+    Return file name -> bytes for one synthetic study.
+
+    Outcomes alternate between MOA and KM summary tables and cycle through
+    variants. With xlsx_every=k, every k-th summary table is also written as
+    a workbook; every other one of those has a stale <dimension> tag. One baseline export and one KM curve export are included.
+    """
+    unknown = [v for v in variants if v not in LAYOUT_VARIANTS]
+    if unknown:
+        raise ValueError(f"Unknown layout variant(s): {', '.join(unknown)}")
+
+    rng = random.Random(seed)
+    exports: Dict[str, bytes] = {}
+    for idx in range(n_outcomes):
+        variant = variants[idx % len(variants)]
+        outcome = f"Outcome {idx + 1:04d}"
+        if idx % 2 == 0:
+            rows, kind = moa_rows(outcome, rng, variant), "moa"
+        else:
+            rows, kind = km_summary_rows(outcome, rng, variant), "km"
+        name = f"{kind}_{idx + 1:04d}_{variant}"
+        exports[f"{name}.csv"] = render_variant(rows, variant)
+        if xlsx_every and idx % xlsx_every == 0 and variant != "tab":
+            stale = (idx // xlsx_every) % 2 == 1
+            exports[f"{name}.xlsx"] = text_to_xlsx_bytes(rows_to_text(rows), stale_dimension=stale)
+
+    exports["baseline_characteristics.csv"] = baseline_text(n_covariates, rng).encode("utf-8")
+    exports["km_curve.csv"] = km_curve_text(n_days, rng).encode("utf-8")
+    return exports
+
+
+def write_exports(out_dir: Path, exports: Dict[str, bytes]) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, data in exports.items():
+        path = out_dir / name
+        path.write_bytes(data)
+        written.append(path)
+    return written
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m trinetx_toolkit.synthetic",
+        description="Write a synthetic set of TriNetX exports.",
+    )
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--outcomes", type=int, default=20, help="Number of MOA/KM summary tables.")
+    parser.add_argument("--covariates", type=int, default=500, help="Rows in the baseline characteristics export.")
+    parser.add_argument("--days", type=int, default=3650, help="Length of the KM curve export in days.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--variants",
+        default="standard",
+        help=f"Comma-separated layout variants to cycle through, or 'all'. Choices: {', '.join(LAYOUT_VARIANTS)}.",
+    )
+    parser.add_argument("--xlsx-every", type=int, default=0, help="Also write every k-th summary table as .xlsx.")
+    return parser
+
+
+def parse_variants(value: str) -> List[str]:
+    if value == "all":
+        return list(LAYOUT_VARIANTS)
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    exports = generate_exports(
+        n_outcomes=args.outcomes,
+        n_covariates=args.covariates,
+        n_days=args.days,
+        seed=args.seed,
+        variants=parse_variants(args.variants),
+        xlsx_every=args.xlsx_every,
+    )
+    for path in write_exports(args.out_dir, exports):
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())